@@ -392,10 +392,89 @@ CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 
+from celery.schedules import crontab
+CELERY_BEAT_SCHEDULE = {
+    'analytics-daily-rollups': {
+        'task': 'analytics.tasks.build_daily_rollups',
+        'schedule': crontab(minute=15),
+    },
+    'analytics-enrich-locations': {
+        'task': 'analytics.tasks.enrich_page_view_locations',
+        'schedule': crontab(minute='*/10'),
+    },
+    'analytics-archive-page-views': {
+        'task': 'analytics.tasks.archive_page_views',
+        'schedule': crontab(hour=3, minute=30),
+    },
+    'media-reconcile-library': {
+        'task': 'media_manager.tasks.reconcile_media_library',
+        'schedule': crontab(minute=45),
+    },
+}
+
 import platform
 if platform.system() == 'Windows':
     CELERY_POOL = 'solo'
 
+# Shared by every web and Celery worker: cache invalidation (analytics
+# versions, blog page tags, renditions), rate limits and task progress
+# only work when all processes see the same cache
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('CACHE_URL', 'redis://localhost:6379/1'),
+        'KEY_PREFIX': 'doclumina',
+    }
+}
+
+# Analytics ingestion
+ANALYTICS_BUFFER_ENABLED = True
+ANALYTICS_BUFFER_SIZE = 100  # Flush once this many page views are queued
+ANALYTICS_BUFFER_FLUSH_INTERVAL = 5  # Seconds between background flushes
+ANALYTICS_BUFFER_MAX_SIZE = 1000  # Most page views a crashed worker can lose
+ANALYTICS_CACHE_TTLS = {  # Seconds dashboard payloads are cached per period
+    'today': 60,
+    'week': 300,
+    'month': 600,
+    'year': 1800,
+    'closed': 60 * 60 * 24,  # Custom ranges that ended before today
+}
+ANALYTICS_RETENTION_DAYS = 90  # Raw page views older than this are archived
+# Archives hold IP addresses, so keep them out of the publicly served MEDIA_ROOT
+ANALYTICS_ARCHIVE_ROOT = BASE_DIR / 'analytics_archive'
+# Compiled with `manage.py build_geoip_db <ranges.csv>`; lookups never hit the network
+ANALYTICS_GEOIP_DATABASE = BASE_DIR / 'geoip' / 'ip-locations.bin'
+ANALYTICS_GEOIP_CACHE_SIZE = 4096  # Recently resolved IPs kept in memory
+ANALYTICS_USER_AGENT_CACHE_SIZE = 1024  # UA string -> UserAgent id, per process
+ANALYTICS_FILTERS = [  # Checked in order; the first match drops the page view
+    'analytics.filters.UserAgentFilter',
+    'analytics.filters.PrefetchFilter',
+    'analytics.filters.RateLimitFilter',
+]
+ANALYTICS_RATE_LIMIT = 60  # Tracked pages per IP per window before it is treated as a bot
+ANALYTICS_RATE_LIMIT_WINDOW = 60  # Seconds
+
+# Blog post view counts
+BLOG_VIEW_FLUSH_INTERVAL = 10  # Seconds between batched writes of counted views
+BLOG_VIEW_MAX_PENDING = 10000  # Post/day pairs held in memory before views are dropped
+BLOG_VIEW_TOTALS_TTL = 300  # Seconds today/week/year totals stay cached per post
+BLOG_PAGE_CACHE_TTL = 300  # Seconds a page cached for anonymous readers is served as is
+BLOG_PAGE_CACHE_STALE_TTL = 60 * 60  # Then served stale for this long while one request rebuilds it
+
+# Media library
+MEDIA_RENDITION_WIDTHS = [320, 640, 960, 1280, 1920]  # Responsive sizes generated per uploaded image
+MEDIA_RENDITION_FORMATS = ['avif', 'webp']  # Formats Pillow can't write are skipped
+MEDIA_SRCSET_CACHE_TTL = 60 * 60 * 24  # Seconds an image's srcset stays cached
+MEDIA_SRCSET_EMPTY_CACHE_TTL = 60  # Images without renditions yet are looked up again after this
+MEDIA_PDF_TARGET_DPI = 150  # Embedded PDF images are downsampled to this resolution
+MEDIA_PDF_JPEG_QUALITY = 75
+MEDIA_LIBRARY_SOURCES = {  # Model file fields whose uploads are added to the media library
+    'blog.Post': ['featured_image'],
+    'blog.Page': ['featured_image'],
+    'blog.UserProfile': ['profile_image'],
+    'main.MentorApplication': ['professional_picture', 'cv', 'certificate'],
+}
+
 
 SITE_ID = 1
 # SITE_URL = 'https://yourdomain.com'
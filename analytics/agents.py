@@ -0,0 +1,108 @@
+# analytics/agents.py
+import hashlib
+import threading
+from collections import defaultdict
+
+from cachetools import LRUCache
+from django.conf import settings
+
+from .models import PageView, UserAgent
+from .utils import UserAgentParser
+
+# UA string -> UserAgent id. A site sees a few hundred distinct strings, so
+# after warm-up ingestion resolves agents without touching the database.
+_cache = LRUCache(maxsize=getattr(settings, 'ANALYTICS_USER_AGENT_CACHE_SIZE', 1024))
+_lock = threading.Lock()
+
+
+def hash_user_agent(user_agent):
+    return hashlib.sha256(user_agent.encode('utf-8', 'surrogateescape')).hexdigest()
+
+
+def get_agent_ids(user_agents):
+    """Map UA strings to UserAgent ids, creating rows for new strings
+
+    Empty strings map to None. Unknown strings are looked up by hash in a
+    single query and any still missing are bulk created; ignore_conflicts
+    lets two processes insert the same agent without failing.
+    """
+    ids = {'': None}
+    missing = set()
+    with _lock:
+        for user_agent in user_agents:
+            if user_agent in ids:
+                continue
+            agent_id = _cache.get(user_agent)
+            if agent_id is None:
+                missing.add(user_agent)
+            else:
+                ids[user_agent] = agent_id
+
+    if missing:
+        hashes = {hash_user_agent(user_agent): user_agent for user_agent in missing}
+        found = dict(UserAgent.objects.filter(ua_hash__in=hashes).values_list('ua_hash', 'id'))
+
+        new = [
+            UserAgent(ua_hash=ua_hash, user_agent=user_agent, **UserAgentParser.parse(user_agent))
+            for ua_hash, user_agent in hashes.items()
+            if ua_hash not in found
+        ]
+        if new:
+            UserAgent.objects.bulk_create(new, ignore_conflicts=True)
+            # ignore_conflicts doesn't give back primary keys on every backend
+            found.update(
+                UserAgent.objects.filter(ua_hash__in=[agent.ua_hash for agent in new])
+                .values_list('ua_hash', 'id')
+            )
+
+        with _lock:
+            for ua_hash, agent_id in found.items():
+                _cache[hashes[ua_hash]] = agent_id
+                ids[hashes[ua_hash]] = agent_id
+
+    return ids
+
+
+def get_agent_id(user_agent):
+    return get_agent_ids([user_agent])[user_agent]
+
+
+def link_agents(records):
+    """Copies of page view field dicts with user_agent swapped for agent_id"""
+    ids = get_agent_ids({record.get('user_agent', '') for record in records})
+    return [
+        {**record, 'user_agent': '', 'agent_id': ids[record.get('user_agent', '')]}
+        for record in records
+    ]
+
+
+def backfill_agents(batch_size=5000):
+    """Link page views that still carry raw user_agent text to UserAgent
+
+    Works through unlinked rows in id order with one UPDATE per distinct
+    agent per batch and clears the text as it goes. Returns rows updated.
+    """
+    updated = 0
+    last_id = 0
+    while True:
+        rows = list(
+            PageView.objects
+            .filter(agent__isnull=True, id__gt=last_id)
+            .exclude(user_agent='')
+            .order_by('id')
+            .values_list('id', 'user_agent')[:batch_size]
+        )
+        if not rows:
+            break
+
+        ids = get_agent_ids({user_agent for _, user_agent in rows})
+        by_agent = defaultdict(list)
+        for page_view_id, user_agent in rows:
+            by_agent[ids[user_agent]].append(page_view_id)
+
+        for agent_id, page_view_ids in by_agent.items():
+            PageView.objects.filter(id__in=page_view_ids).update(agent_id=agent_id, user_agent='')
+
+        updated += len(rows)
+        last_id = rows[-1][0]
+    return updated
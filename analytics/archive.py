@@ -0,0 +1,132 @@
+# analytics/archive.py
+import csv
+import gzip
+import os
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import PageView, RollupDay
+
+# Written in place of NULL so it survives the round trip through CSV
+NULL = r'\N'
+
+
+def get_archive_root():
+    return Path(getattr(settings, 'ANALYTICS_ARCHIVE_ROOT', Path(settings.BASE_DIR) / 'analytics_archive'))
+
+
+def get_archive_files(day):
+    """Archive files for a day, oldest first"""
+    directory = get_archive_root() / f'{day:%Y}' / f'{day:%m}'
+    return sorted(directory.glob(f'pageviews-{day.isoformat()}.*.csv.gz'))
+
+
+def _archived_ids(day):
+    ids = set()
+    for path in get_archive_files(day):
+        with gzip.open(path, 'rt', newline='') as f:
+            reader = csv.reader(f)
+            id_index = next(reader).index('id')
+            ids.update(int(row[id_index]) for row in reader)
+    return ids
+
+
+def archive_day(day, batch_size=5000):
+    """Move one rolled-up day of PageView rows into a gzip'd CSV file
+
+    Rows are written to a temporary file which is renamed into place, and
+    only deleted (in batches of `batch_size`) once the file is complete.
+    Re-running after a crash skips ids that already made it to disk.
+    Returns the number of rows deleted.
+    """
+    rollup = RollupDay.objects.filter(date=day).first()
+    if rollup is None:
+        raise ValueError(f'{day} has not been rolled up yet')
+
+    fields = [field.attname for field in PageView._meta.concrete_fields]
+    id_index = fields.index('id')
+    rows = PageView.objects.filter(date=day).order_by('id').values_list(*fields)
+
+    existing = get_archive_files(day)
+    already_archived = _archived_ids(day) if existing else set()
+
+    directory = get_archive_root() / f'{day:%Y}' / f'{day:%m}'
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f'pageviews-{day.isoformat()}.{len(existing)}.csv.gz'
+    tmp_path = path.with_suffix('.tmp')
+
+    written = 0
+    with gzip.open(tmp_path, 'wt', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(fields)
+        for row in rows.iterator(chunk_size=batch_size):
+            if row[id_index] in already_archived:
+                continue
+            writer.writerow([NULL if value is None else value for value in row])
+            written += 1
+
+    if written:
+        os.replace(tmp_path, path)
+    else:
+        os.remove(tmp_path)
+
+    deleted = 0
+    while True:
+        ids = list(PageView.objects.filter(date=day).values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        deleted += PageView.objects.filter(id__in=ids).delete()[0]
+
+    rollup.archived_at = timezone.now()
+    rollup.save(update_fields=['archived_at'])
+    return deleted
+
+
+def archive_old_page_views(days=None, batch_size=5000):
+    """Archive every rolled-up day older than `days` (ANALYTICS_RETENTION_DAYS)"""
+    if days is None:
+        days = getattr(settings, 'ANALYTICS_RETENTION_DAYS', 90)
+    cutoff = timezone.now().date() - timedelta(days=days)
+
+    archived = {}
+    pending = RollupDay.objects.filter(date__lt=cutoff, archived_at__isnull=True).order_by('date')
+    for day in pending.values_list('date', flat=True):
+        archived[day] = archive_day(day, batch_size)
+    return archived
+
+
+def restore_day(day, batch_size=5000):
+    """Load a day's archived rows back into PageView
+
+    Rows keep their original ids and ids that are already present are
+    skipped, so restoring twice is harmless. Returns the rows read.
+    """
+    fields = {field.attname: field for field in PageView._meta.concrete_fields}
+    restored = 0
+
+    for path in get_archive_files(day):
+        with gzip.open(path, 'rt', newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            batch = []
+            for row in reader:
+                values = {
+                    name: None if value == NULL else fields[name].to_python(value)
+                    for name, value in zip(header, row)
+                    if name in fields
+                }
+                batch.append(PageView(**values))
+                if len(batch) >= batch_size:
+                    PageView.objects.bulk_create(batch, ignore_conflicts=True)
+                    restored += len(batch)
+                    batch = []
+            if batch:
+                PageView.objects.bulk_create(batch, ignore_conflicts=True)
+                restored += len(batch)
+
+    # The raw rows are back, so the day can be rebuilt and archived again
+    RollupDay.objects.filter(date=day).update(archived_at=None)
+    return restored
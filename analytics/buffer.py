@@ -0,0 +1,101 @@
+# analytics/buffer.py
+import atexit
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .agents import link_agents
+from .models import PageView
+
+logger = logging.getLogger(__name__)
+
+
+class PageViewBuffer:
+    """Batches page views in memory and writes them with bulk_create.
+
+    Requests only append a small dict. A daemon thread flushes the buffer
+    when it holds `size` records or every `interval` seconds, whichever
+    comes first. The buffer never holds more than `max_size` records, so
+    that is the most a crashed process can lose.
+    """
+
+    def __init__(self, size=None, interval=None, max_size=None):
+        self.size = size or getattr(settings, 'ANALYTICS_BUFFER_SIZE', 100)
+        self.interval = interval or getattr(settings, 'ANALYTICS_BUFFER_FLUSH_INTERVAL', 5)
+        self.max_size = max_size or getattr(settings, 'ANALYTICS_BUFFER_MAX_SIZE', 1000)
+        self.dropped = 0
+        self._records = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def add(self, **record):
+        """Queue one PageView worth of fields; never touches the database"""
+        with self._lock:
+            if len(self._records) >= self.max_size:
+                self.dropped += 1
+                return
+            self._records.append(record)
+            full = len(self._records) >= self.size
+        self._ensure_worker()
+        if full:
+            self._wakeup.set()
+
+    def flush(self):
+        """Write everything buffered so far, returns the number of rows"""
+        with self._lock:
+            records, self._records = self._records, []
+        if not records:
+            return 0
+
+        try:
+            PageView.objects.bulk_create(
+                [PageView(**record) for record in link_agents(records)],
+                batch_size=self.size,
+            )
+        except Exception:
+            # Put the batch back (bounded by max_size) so a short database
+            # outage doesn't lose everything that was queued
+            with self._lock:
+                self._records = (records + self._records)[:self.max_size]
+            raise
+        return len(records)
+
+    def __len__(self):
+        return len(self._records)
+
+    def _ensure_worker(self):
+        # After a fork (gunicorn/celery prefork) the thread doesn't exist in
+        # the child, so start one per process
+        if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name='pageview-buffer', daemon=True
+            )
+            self._thread.start()
+        atexit.register(self._flush_quietly)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            self._flush_quietly()
+
+    def _flush_quietly(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Failed to flush %d buffered page views', len(self))
+        finally:
+            close_old_connections()
+
+
+page_view_buffer = PageViewBuffer()
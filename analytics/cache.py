@@ -0,0 +1,112 @@
+# analytics/cache.py
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+VERSION_KEY = 'analytics:version'
+
+# Seconds a cached payload stays valid. Periods that include today change
+# with every page view flush; ranges that ended before today only change
+# when a rollup is rebuilt, which bumps the version anyway.
+DEFAULT_TTLS = {
+    'today': 60,
+    'week': 300,
+    'month': 600,
+    'year': 1800,
+    'closed': 60 * 60 * 24,
+}
+
+
+def incr(name, delta=1):
+    """Increment a shared counter, creating it if needed"""
+    key = f'analytics:counter:{name}'
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        if cache.add(key, delta, None):
+            return delta
+        return cache.incr(key, delta)
+
+
+def get_counters(*names):
+    values = cache.get_many([f'analytics:counter:{name}' for name in names])
+    return {name: values.get(f'analytics:counter:{name}', 0) for name in names}
+
+
+def get_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, 1, None)
+        version = cache.get(VERSION_KEY, 1)
+    return version
+
+
+def bump_version():
+    """Invalidate every cached analytics payload, e.g. after new rollups land"""
+    try:
+        return cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 2, None)
+        return 2
+
+
+def get_ttl(period):
+    ttls = {**DEFAULT_TTLS, **getattr(settings, 'ANALYTICS_CACHE_TTLS', {})}
+    if isinstance(period, (tuple, list)):
+        if period[1] < timezone.now().date():
+            return ttls['closed']
+        return ttls['today']
+    return ttls.get(period, ttls['today'])
+
+
+def get_cached_payload(name, period, builder, *extra):
+    """Cached JSON body for `builder()` with its ETag and build time
+
+    The key includes the analytics version, so bump_version() drops every
+    entry at once without having to know the keys.
+    """
+    if isinstance(period, (tuple, list)):
+        period_key = '_'.join(str(day) for day in period)
+    else:
+        period_key = period
+    key = ':'.join(str(part) for part in ('analytics', name, get_version(), period_key, *extra))
+
+    entry = cache.get(key)
+    if entry is not None:
+        incr('cache_hits')
+        return entry
+
+    incr('cache_misses')
+    body = json.dumps(builder(), cls=DjangoJSONEncoder).encode()
+    entry = {
+        'body': body,
+        'etag': quote_etag(hashlib.md5(body).hexdigest()),
+        'last_modified': int(time.time()),
+    }
+    cache.set(key, entry, get_ttl(period))
+    return entry
+
+
+def cached_json_response(request, name, period, builder, *extra):
+    """JsonResponse from the cache, or 304 when the browser's copy is current"""
+    entry = get_cached_payload(name, period, builder, *extra)
+
+    response = get_conditional_response(
+        request, etag=entry['etag'], last_modified=entry['last_modified']
+    )
+    if response is None:
+        response = HttpResponse(entry['body'], content_type='application/json')
+
+    response.headers['ETag'] = entry['etag']
+    response.headers['Last-Modified'] = http_date(entry['last_modified'])
+    # Make the browser revalidate on every poll so it gets cheap 304s
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
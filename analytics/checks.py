@@ -0,0 +1,23 @@
+# analytics/checks.py
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Tags, Warning, register
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """Rate limits, counters, cache versions and page cache tags need one cache for all workers"""
+    if isinstance(caches['default'], (LocMemCache, DummyCache)):
+        return [Warning(
+            'The default cache is local to each process.',
+            hint=(
+                'ANALYTICS_RATE_LIMIT is enforced per worker, page view counters '
+                'and post view totals are per worker, rollups never invalidate the '
+                'web workers\' cached dashboards, and a post saved in one process '
+                'leaves its cached blog pages stale in the others. Point CACHES at '
+                'Redis or Memcached.'
+            ),
+            id='analytics.W001',
+        )]
+    return []
@@ -0,0 +1,54 @@
+# analytics/enrichment.py
+import time
+from collections import defaultdict
+
+from .geoip import get_database
+from .models import PageView, RollupDay
+from .rollups import build_rollups
+
+
+def enrich_locations(batch_size=1000, limit=None, database=None):
+    """Fill country/region/city on page views that haven't been looked up
+
+    Rows are read in id order, `batch_size` at a time, and updated with one
+    UPDATE per distinct location in the batch. IPs that aren't in the
+    database get '' so they aren't retried; NULL country means "not looked
+    up yet". Location rollups of days that were already built are rebuilt.
+    Returns (rows processed, seconds taken).
+    """
+    database = database or get_database()
+    if database is None:
+        raise RuntimeError('ANALYTICS_GEOIP_DATABASE is not set or the file is missing')
+
+    started = time.perf_counter()
+    processed = 0
+    last_id = 0
+    touched_days = set()
+
+    while limit is None or processed < limit:
+        size = batch_size if limit is None else min(batch_size, limit - processed)
+        rows = list(
+            PageView.objects
+            .filter(country__isnull=True, id__gt=last_id)
+            .order_by('id')
+            .values_list('id', 'ip_address', 'date')[:size]
+        )
+        if not rows:
+            break
+
+        by_location = defaultdict(list)
+        for page_view_id, ip_address, day in rows:
+            by_location[database.lookup(ip_address) or ('', '', '')].append(page_view_id)
+            touched_days.add(day)
+
+        for (country, region, city), ids in by_location.items():
+            PageView.objects.filter(id__in=ids).update(country=country, region=region, city=city)
+
+        processed += len(rows)
+        last_id = rows[-1][0]
+
+    stale = RollupDay.objects.filter(date__in=touched_days, archived_at__isnull=True)
+    for day in stale.values_list('date', flat=True):
+        build_rollups(day)
+
+    return processed, time.perf_counter() - started
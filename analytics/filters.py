@@ -0,0 +1,102 @@
+# analytics/filters.py
+"""Checks run on a tracked request before a page view is recorded
+
+Each filter has a `name` and a `matches(request)` method; the first one
+that matches drops the page view and bumps the `filtered:<name>` counter.
+The chain is the ANALYTICS_FILTERS setting, a list of dotted paths, so a
+rule can be added or switched off without touching the middleware.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+from .cache import get_counters, incr
+from .utils import UserAgentParser, get_client_ip
+
+DEFAULT_FILTERS = [
+    'analytics.filters.UserAgentFilter',
+    'analytics.filters.PrefetchFilter',
+    'analytics.filters.RateLimitFilter',
+]
+
+
+class PageViewFilter:
+    name = None
+
+    def matches(self, request):
+        raise NotImplementedError
+
+
+class UserAgentFilter(PageViewFilter):
+    """Crawlers, uptime checkers, HTTP libraries and empty user agents"""
+    name = 'user_agent'
+
+    def matches(self, request):
+        user_agent = request.META.get('HTTP_USER_AGENT', '')
+        return not user_agent or bool(UserAgentParser.BOT_PATTERN.search(user_agent))
+
+
+class PrefetchFilter(PageViewFilter):
+    """Speculative loads the visitor may never look at"""
+    name = 'prefetch'
+    HEADERS = ['HTTP_SEC_PURPOSE', 'HTTP_PURPOSE', 'HTTP_X_PURPOSE', 'HTTP_X_MOZ']
+
+    def matches(self, request):
+        return any('prefetch' in request.META.get(header, '').lower() for header in self.HEADERS)
+
+
+class RateLimitFilter(PageViewFilter):
+    """More tracked pages from one IP in a window than a person would read
+
+    Counts live in the default cache. Every worker sees the same totals
+    only when that cache is shared (CACHES); with a per-process cache the
+    limit is effectively ANALYTICS_RATE_LIMIT per worker, which the
+    analytics.W001 deploy check warns about.
+    """
+    name = 'rate_limit'
+
+    def __init__(self):
+        self.limit = getattr(settings, 'ANALYTICS_RATE_LIMIT', 60)
+        self.window = getattr(settings, 'ANALYTICS_RATE_LIMIT_WINDOW', 60)
+
+    def matches(self, request):
+        key = f'analytics:rate:{get_client_ip(request)}'
+        cache.add(key, 0, self.window)
+        try:
+            count = cache.incr(key)
+        except ValueError:
+            # Expired between add() and incr()
+            cache.set(key, 1, self.window)
+            count = 1
+        return count > self.limit
+
+
+_filters = None
+
+
+def get_filters():
+    """Filter instances from ANALYTICS_FILTERS, built once per process"""
+    global _filters
+    if _filters is None:
+        paths = getattr(settings, 'ANALYTICS_FILTERS', DEFAULT_FILTERS)
+        _filters = [import_string(path)() for path in paths]
+    return _filters
+
+
+def should_drop(request):
+    """Name of the first filter matching `request`, counted, or None"""
+    for page_view_filter in get_filters():
+        if page_view_filter.matches(request):
+            incr(f'filtered:{page_view_filter.name}')
+            return page_view_filter.name
+    return None
+
+
+def get_filter_counters():
+    """Recorded page views and drops per filter since the cache was cleared"""
+    names = [page_view_filter.name for page_view_filter in get_filters()]
+    counters = get_counters('recorded', *(f'filtered:{name}' for name in names))
+    return {
+        'recorded': counters['recorded'],
+        'filtered': {name: counters[f'filtered:{name}'] for name in names},
+    }
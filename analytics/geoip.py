@@ -0,0 +1,125 @@
+# analytics/geoip.py
+"""Offline IP -> location lookups against a memory-mapped range file
+
+The file is compiled from a DB-IP style CSV with `manage.py build_geoip_db`:
+
+    header     8s magic, then uint32 ipv4 count, ipv6 count, location count, 0
+    ipv4       (start uint32, end uint32, location uint32) per range
+    ipv6       (start 16s, end 16s, location uint32) per range
+    locations  one "country\\tregion\\tcity" line per location
+
+Ranges are sorted by start address and binary searched in place, so only
+the small location table is loaded into memory.
+"""
+import ipaddress
+import mmap
+import struct
+from functools import lru_cache
+
+from django.conf import settings
+
+MAGIC = b'DGEOIP1\0'
+HEADER = struct.Struct('>8sIIII')
+IPV4_RANGE = struct.Struct('>III')
+IPV6_RANGE = struct.Struct('>16s16sI')
+
+
+class GeoIPDatabase:
+
+    def __init__(self, path, cache_size=4096):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.ipv4_count, self.ipv6_count, location_count, _ = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not a compiled GeoIP database')
+
+        self._ipv4_offset = HEADER.size
+        self._ipv6_offset = self._ipv4_offset + self.ipv4_count * IPV4_RANGE.size
+        locations_offset = self._ipv6_offset + self.ipv6_count * IPV6_RANGE.size
+        lines = self._map[locations_offset:].decode('utf-8').split('\n')
+        self.locations = [tuple(line.split('\t')) for line in lines[:location_count]]
+
+        # Visitors come back, so most lookups are for IPs seen recently
+        self.lookup = lru_cache(maxsize=cache_size)(self._lookup)
+
+    def close(self):
+        self._map.close()
+
+    def _lookup(self, ip):
+        """(country, region, city) for an IP address, None if unknown"""
+        try:
+            address = ipaddress.ip_address(ip)
+        except ValueError:
+            return None
+
+        if address.version == 6 and address.ipv4_mapped:
+            address = address.ipv4_mapped
+
+        if address.version == 4:
+            key, record, offset, count = int(address), IPV4_RANGE, self._ipv4_offset, self.ipv4_count
+        else:
+            key, record, offset, count = address.packed, IPV6_RANGE, self._ipv6_offset, self.ipv6_count
+
+        # Last range whose start is <= key
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            if record.unpack_from(self._map, offset + middle * record.size)[0] <= key:
+                low = middle + 1
+            else:
+                high = middle
+        if low == 0:
+            return None
+
+        start, end, location = record.unpack_from(self._map, offset + (low - 1) * record.size)
+        if key > end:
+            return None
+        return self.locations[location]
+
+
+def write_database(path, ranges):
+    """Compile (start_ip, end_ip, country, region, city) tuples into `path`"""
+    ipv4, ipv6, locations = [], [], {}
+
+    for start, end, country, region, city in ranges:
+        start, end = ipaddress.ip_address(start), ipaddress.ip_address(end)
+        location = locations.setdefault((country, region, city), len(locations))
+        if start.version == 4:
+            ipv4.append((int(start), int(end), location))
+        else:
+            ipv6.append((start.packed, end.packed, location))
+
+    ipv4.sort()
+    ipv6.sort()
+
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(ipv4), len(ipv6), len(locations), 0))
+        for row in ipv4:
+            f.write(IPV4_RANGE.pack(*row))
+        for row in ipv6:
+            f.write(IPV6_RANGE.pack(*row))
+        f.write('\n'.join(
+            '\t'.join(value.replace('\t', ' ').replace('\n', ' ') for value in location)
+            for location in locations
+        ).encode('utf-8'))
+
+    return len(ipv4) + len(ipv6)
+
+
+_database = None
+
+
+def get_database():
+    """The database at ANALYTICS_GEOIP_DATABASE, or None if there isn't one"""
+    global _database
+    if _database is None:
+        path = getattr(settings, 'ANALYTICS_GEOIP_DATABASE', None)
+        try:
+            _database = GeoIPDatabase(
+                path, getattr(settings, 'ANALYTICS_GEOIP_CACHE_SIZE', 4096)
+            ) if path else None
+        except FileNotFoundError:
+            return None
+    return _database
@@ -0,0 +1,63 @@
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from analytics.archive import archive_old_page_views, get_archive_root, restore_day
+from analytics.models import RollupDay
+
+
+class Command(BaseCommand):
+    help = 'Archive rolled-up page views older than N days to gzip\'d CSV files, or restore them'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=getattr(settings, 'ANALYTICS_RETENTION_DAYS', 90),
+            help='Archive raw page views older than this many days',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Rows deleted (or restored) per query',
+        )
+        parser.add_argument(
+            '--restore',
+            metavar='YYYY-MM-DD',
+            help='Load an archived day back into the PageView table',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='List the days that would be archived without touching them',
+        )
+
+    def handle(self, *args, **options):
+        if options['restore']:
+            try:
+                day = date.fromisoformat(options['restore'])
+            except ValueError:
+                raise CommandError('--restore expects a YYYY-MM-DD date')
+            restored = restore_day(day, options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Restored {restored} page views for {day}'))
+            return
+
+        if options['dry_run']:
+            cutoff = timezone.now().date() - timedelta(days=options['days'])
+            days = RollupDay.objects.filter(
+                date__lt=cutoff, archived_at__isnull=True
+            ).order_by('date').values_list('date', flat=True)
+            self.stdout.write(self.style.WARNING(f'DRY RUN: Would archive {len(days)} day(s) to {get_archive_root()}'))
+            for day in days:
+                self.stdout.write(f'  - {day}')
+            return
+
+        archived = archive_old_page_views(options['days'], options['batch_size'])
+        for day, count in archived.items():
+            self.stdout.write(f'  - {day}: {count} page views')
+        self.stdout.write(
+            self.style.SUCCESS(f'Archived {sum(archived.values())} page views from {len(archived)} day(s)')
+        )
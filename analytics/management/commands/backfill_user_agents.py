@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from analytics.agents import backfill_agents
+from analytics.models import UserAgent
+
+
+class Command(BaseCommand):
+    help = 'Link existing page views to the UserAgent table and drop their raw user agent text'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Page views updated per batch',
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        updated = backfill_agents(options['batch_size'])
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Linked {updated} page views to {UserAgent.objects.count()} user agents in {elapsed:.2f}s'
+        ))
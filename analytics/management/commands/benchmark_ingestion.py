@@ -0,0 +1,79 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from analytics.buffer import PageViewBuffer
+from analytics.middleware import AnalyticsMiddleware
+from analytics.models import PageView
+
+
+class Command(BaseCommand):
+    help = 'Compare per-request INSERT against buffered page view ingestion'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=2000,
+            help='Number of tracked requests to simulate per mode',
+        )
+        parser.add_argument(
+            '--buffer-size',
+            type=int,
+            default=100,
+            help='Flush threshold for the buffered mode',
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Keep the page views written by the benchmark',
+        )
+
+    def handle(self, *args, **options):
+        total = options['requests']
+        factory = RequestFactory()
+        requests = [
+            factory.get('/', HTTP_REFERER='https://www.google.com/search?q=doclumina',
+                        HTTP_USER_AGENT='Mozilla/5.0 (benchmark)')
+            for _ in range(total)
+        ]
+        last_id = PageView.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+        direct = AnalyticsMiddleware(lambda request: HttpResponse('ok'))
+        direct.use_buffer = False
+
+        buffered = AnalyticsMiddleware(lambda request: HttpResponse('ok'))
+        buffered.use_buffer = True
+        buffered.buffer = PageViewBuffer(size=options['buffer_size'], max_size=total)
+
+        try:
+            for label, middleware in (('per-request INSERT', direct), ('buffered bulk_create', buffered)):
+                self.report(label, *self.run(middleware, requests))
+        finally:
+            if not options['keep']:
+                PageView.objects.filter(id__gt=last_id).delete()
+
+    def run(self, middleware, requests):
+        before = PageView.objects.count()
+        latencies = []
+        started = time.perf_counter()
+        for request in requests:
+            tick = time.perf_counter()
+            middleware(request)
+            latencies.append(time.perf_counter() - tick)
+        if middleware.use_buffer:
+            # Whatever the background thread hasn't written yet
+            middleware.buffer.flush()
+        elapsed = time.perf_counter() - started
+        written = PageView.objects.count() - before
+        return latencies, written, elapsed
+
+    def report(self, label, latencies, written, elapsed):
+        cuts = statistics.quantiles(latencies, n=100)
+        self.stdout.write(self.style.SUCCESS(label))
+        self.stdout.write(f'  p50 latency: {cuts[49] * 1000:.3f} ms')
+        self.stdout.write(f'  p99 latency: {cuts[98] * 1000:.3f} ms')
+        self.stdout.write(f'  rows written: {written} in {elapsed:.2f}s ({written / elapsed:.0f} inserts/s)')
@@ -0,0 +1,72 @@
+import random
+import re
+import time
+from urllib.parse import urlparse
+
+from django.core.management.base import BaseCommand
+
+from analytics.utils import TrafficSourceDetector
+
+REFERRERS = [
+    '',
+    'https://www.google.com/',
+    'https://www.google.com.ng/search?q=house+job+nigeria',
+    'https://news.google.com/articles/abc',
+    'https://www.bing.com/search?q=doclumina',
+    'https://duckduckgo.com/?q=plab',
+    'https://l.facebook.com/l.php?u=https%3A%2F%2Fdoclumina.com',
+    'https://m.facebook.com/',
+    'https://t.co/xyz123',
+    'https://www.linkedin.com/feed/',
+    'https://www.youtube.com/watch?v=abc',
+    'https://web.whatsapp.com/',
+    'https://notgoogle.com.evil.io/landing',
+    'https://medical-forum.example.org/thread/42',
+    'https://blog.example.com/best-resources',
+]
+
+
+def legacy_detect_source(referrer):
+    """TrafficSourceDetector.detect_source before the domain index"""
+    if not referrer:
+        return 'direct'
+    try:
+        domain = urlparse(referrer).netloc.lower()
+        domain = re.sub(r'^www\.', '', domain)
+        if any(search in domain for search in TrafficSourceDetector.SEARCH_ENGINES):
+            return 'search'
+        elif any(social in domain for social in TrafficSourceDetector.SOCIAL_PLATFORMS):
+            return 'social'
+        else:
+            return 'referral'
+    except:
+        return 'direct'
+
+
+class Command(BaseCommand):
+    help = 'Measure traffic source classifications per second, old vs new'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=200000,
+            help='Number of referrers to classify per implementation',
+        )
+
+    def handle(self, *args, **options):
+        referrers = random.choices(REFERRERS, k=options['iterations'])
+
+        for label, detect in (('substring scan', legacy_detect_source),
+                              ('domain index + LRU', TrafficSourceDetector.detect_source)):
+            started = time.perf_counter()
+            for referrer in referrers:
+                detect(referrer)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f'{label}: {len(referrers) / elapsed:,.0f} classifications/s')
+
+        self.stdout.write(self.style.SUCCESS('Referrers classified differently:'))
+        for referrer in REFERRERS:
+            old, new = legacy_detect_source(referrer), TrafficSourceDetector.detect_source(referrer)
+            if old != new:
+                self.stdout.write(f'  {referrer}: {old} -> {new}')
@@ -0,0 +1,41 @@
+import csv
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from analytics.geoip import write_database
+
+
+class Command(BaseCommand):
+    help = 'Compile an IP range CSV into the memory-mapped GeoIP database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'source',
+            help='CSV of IP ranges: either DB-IP city lite (ip_start, ip_end, continent, '
+                 'country, region, city, ...) or ip_start, ip_end, country, region, city',
+        )
+        parser.add_argument(
+            '--output',
+            default=getattr(settings, 'ANALYTICS_GEOIP_DATABASE', None),
+            help='Where to write the compiled database (default: ANALYTICS_GEOIP_DATABASE)',
+        )
+
+    def handle(self, *args, **options):
+        if not options['output']:
+            raise CommandError('Pass --output or set ANALYTICS_GEOIP_DATABASE')
+
+        def ranges():
+            with open(options['source'], newline='', encoding='utf-8') as f:
+                for row in csv.reader(f):
+                    if len(row) >= 6:
+                        yield row[0], row[1], row[3], row[4], row[5]
+                    elif len(row) == 5:
+                        yield row[0], row[1], row[2], row[3], row[4]
+
+        try:
+            count = write_database(options['output'], ranges())
+        except ValueError as e:
+            raise CommandError(f'Invalid row in {options["source"]}: {e}')
+
+        self.stdout.write(self.style.SUCCESS(f'Wrote {count} ranges to {options["output"]}'))
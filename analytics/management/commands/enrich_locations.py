@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from analytics.enrichment import enrich_locations
+
+
+class Command(BaseCommand):
+    help = 'Resolve country/region/city for page views from the local GeoIP database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Page views read and updated per batch',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=None,
+            help='Stop after this many page views',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            processed, elapsed = enrich_locations(options['batch_size'], options['limit'])
+        except RuntimeError as e:
+            raise CommandError(str(e))
+
+        rate = processed / elapsed if elapsed else 0
+        self.stdout.write(
+            self.style.SUCCESS(f'Enriched {processed} page views in {elapsed:.2f}s ({rate:.0f} rows/s)')
+        )
@@ -1,19 +1,25 @@
 # analytics/middleware.py
+from django.conf import settings
+from django.utils import timezone
 from django.utils.deprecation import MiddlewareMixin
-from django.urls import resolve
+from .agents import link_agents
+from .buffer import page_view_buffer
+from .cache import incr
+from .filters import should_drop
 from .models import PageView
-from .utils import TrafficSourceDetector, TRACKED_PAGES
+from .utils import TrackedPageResolver, TrafficSourceDetector, get_client_ip
 
 class AnalyticsMiddleware(MiddlewareMixin):
+    # Buffer page views and bulk insert them off the request path. Set
+    # ANALYTICS_BUFFER_ENABLED = False to write one row per request.
+    use_buffer = getattr(settings, 'ANALYTICS_BUFFER_ENABLED', True)
+    buffer = page_view_buffer
+
     def process_response(self, request, response):
         # Only track GET requests with 200 status
         if request.method != 'GET' or response.status_code != 200:
             return response
         
-        # Skip admin, static files, and API endpoints
-        if any(skip in request.path for skip in ['/admin/', '/static/', '/media/', '/api/']):
-            return response
-        
         try:
             self.track_page_view(request)
         except Exception:
@@ -23,38 +29,37 @@ class AnalyticsMiddleware(MiddlewareMixin):
         return response
     
     def track_page_view(self, request):
-        referrer = request.META.get('HTTP_REFERER', '')
-        traffic_source = TrafficSourceDetector.detect_source(referrer)
-        
-        # Get page title
-        page_title = TRACKED_PAGES.get(request.path, '')
-        
-        # Handle blog posts dynamically
-        if request.path.startswith('/blog/') and not page_title:
-            try:
-                resolved = resolve(request.path)
-                if hasattr(resolved, 'kwargs') and 'slug' in resolved.kwargs:
-                    page_title = f"Blog: {resolved.kwargs['slug'].replace('-', ' ').title()}"
-                else:
-                    page_title = 'Blog Post'
-            except:
-                page_title = 'Blog'
-        
-        # Skip if page not in tracking list and not a blog post
+        # Only routes listed in TRACKED_ROUTES have a title; admin, static,
+        # media and API URLs never do
+        page_title = TrackedPageResolver.get_title(request)
         if not page_title:
             return
-        
-        PageView.objects.create(
+
+        # Bots, prefetches and floods never reach the buffer
+        if should_drop(request):
+            return
+
+        referrer = request.META.get('HTTP_REFERER', '')
+        traffic_source = TrafficSourceDetector.detect_source(referrer)
+
+        now = timezone.now()
+        self.record_page_view(
             page_url=request.path,
             page_title=page_title,
             traffic_source=traffic_source,
             referrer=referrer if referrer else None,
             ip_address=self.get_client_ip(request),
-            user_agent=request.META.get('HTTP_USER_AGENT', '')[:500]
+            user_agent=request.META.get('HTTP_USER_AGENT', '')[:500],
+            date=now.date(),
+            timestamp=now,
         )
+
+    def record_page_view(self, **fields):
+        incr('recorded')
+        if self.use_buffer:
+            self.buffer.add(**fields)
+        else:
+            PageView.objects.create(**link_agents([fields])[0])
     
     def get_client_ip(self, request):
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            return x_forwarded_for.split(',')[0].strip()
-        return request.META.get('REMOTE_ADDR', '127.0.0.1')
\ No newline at end of file
+        return get_client_ip(request)
\ No newline at end of file
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.3 on 2026-10-17 16:13
+
+import analytics.models
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_pageview_city_pageview_country_pageview_region'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pageview',
+            name='date',
+            field=models.DateField(default=analytics.models.today),
+        ),
+        migrations.AlterField(
+            model_name='pageview',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.3 on 2026-10-17 16:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0003_alter_pageview_date_alter_pageview_timestamp'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('built_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyLocationStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('country', models.CharField(blank=True, max_length=100)),
+                ('region', models.CharField(blank=True, max_length=100)),
+                ('city', models.CharField(blank=True, max_length=100)),
+                ('views', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('date', 'country', 'region', 'city')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyPageStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('page_url', models.CharField(max_length=255)),
+                ('page_title', models.CharField(blank=True, max_length=255)),
+                ('traffic_source', models.CharField(choices=[('direct', 'Direct'), ('social', 'Social'), ('search', 'Search Engine'), ('referral', 'Referral')], default='direct', max_length=20)),
+                ('views', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date', 'traffic_source'], name='analytics_d_date_18110d_idx')],
+                'unique_together': {('date', 'page_url', 'page_title', 'traffic_source')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-17 16:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0004_rollupday_dailylocationstat_dailypagestat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rollupday',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
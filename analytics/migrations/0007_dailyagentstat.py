@@ -0,0 +1,47 @@
+# Generated by Django 5.2.3 on 2026-10-17 17:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_agent_stats(apps, schema_editor):
+    # Archived days have no raw rows left; restore_day and build_rollups
+    # fill theirs in
+    PageView = apps.get_model('analytics', 'PageView')
+    RollupDay = apps.get_model('analytics', 'RollupDay')
+    DailyAgentStat = apps.get_model('analytics', 'DailyAgentStat')
+    days = RollupDay.objects.filter(archived_at__isnull=True).values('date')
+    rows = (
+        PageView.objects.filter(date__in=days, agent__isnull=False)
+        .values('date', 'agent')
+        .annotate(views=Count('id'))
+        .order_by()
+    )
+    DailyAgentStat.objects.bulk_create(
+        (DailyAgentStat(date=row['date'], agent_id=row['agent'], views=row['views']) for row in rows.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0006_useragent_alter_pageview_user_agent_pageview_agent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyAgentStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('agent', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='analytics.useragent')),
+            ],
+            options={
+                'unique_together': {('date', 'agent')},
+            },
+        ),
+        migrations.RunPython(fill_agent_stats, migrations.RunPython.noop),
+    ]
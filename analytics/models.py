@@ -3,6 +3,33 @@ from django.utils import timezone
 from django.db.models import Sum
 from datetime import timedelta
 
+
+def today():
+    return timezone.now().date()
+
+
+class UserAgent(models.Model):
+    """One row per distinct User-Agent string, shared by page views"""
+    DEVICE_TYPES = [
+        ('desktop', 'Desktop'),
+        ('mobile', 'Mobile'),
+        ('tablet', 'Tablet'),
+        ('bot', 'Bot'),
+        ('other', 'Other'),
+    ]
+
+    ua_hash = models.CharField(max_length=64, unique=True)  # sha256 of user_agent
+    user_agent = models.TextField()
+    device_type = models.CharField(max_length=20, choices=DEVICE_TYPES, default='other')
+    browser = models.CharField(max_length=50, blank=True)
+    os = models.CharField(max_length=50, blank=True)
+    is_bot = models.BooleanField(default=False)
+    first_seen = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.browser} on {self.os} ({self.device_type})"
+
+
 class PageView(models.Model):
     TRAFFIC_SOURCES = [
         ('direct', 'Direct'),
@@ -16,12 +43,18 @@ class PageView(models.Model):
     traffic_source = models.CharField(max_length=20, choices=TRAFFIC_SOURCES, default='direct')
     referrer = models.URLField(blank=True, null=True)
     ip_address = models.GenericIPAddressField()
-    user_agent = models.TextField()
+    # Raw text is only kept until the row is linked to its UserAgent
+    user_agent = models.TextField(blank=True)
+    agent = models.ForeignKey(
+        UserAgent, on_delete=models.SET_NULL, null=True, blank=True, related_name='page_views'
+    )
     country = models.CharField(max_length=100, blank=True, null=True)
     city = models.CharField(max_length=100, blank=True, null=True)  
     region = models.CharField(max_length=100, blank=True, null=True)
-    date = models.DateField(auto_now_add=True)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Plain defaults rather than auto_now_add so buffered rows keep the
+    # time of the request instead of the time of the bulk insert.
+    date = models.DateField(default=today)
+    timestamp = models.DateTimeField(default=timezone.now)
     
     class Meta:
         indexes = [
@@ -73,3 +106,64 @@ class AnalyticsManager:
             filtered = queryset
             
         return filtered.values('traffic_source').annotate(count=models.Count('id'))
+
+
+class DailyPageStat(models.Model):
+    """Page views rolled up per day, page and traffic source"""
+    date = models.DateField()
+    page_url = models.CharField(max_length=255)
+    page_title = models.CharField(max_length=255, blank=True)
+    traffic_source = models.CharField(max_length=20, choices=PageView.TRAFFIC_SOURCES, default='direct')
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('date', 'page_url', 'page_title', 'traffic_source')
+        indexes = [
+            models.Index(fields=['date', 'traffic_source']),
+        ]
+
+    def __str__(self):
+        return f"{self.page_url} - {self.date}: {self.views} views"
+
+
+class DailyLocationStat(models.Model):
+    """Page views rolled up per day and location"""
+    date = models.DateField()
+    country = models.CharField(max_length=100, blank=True)
+    region = models.CharField(max_length=100, blank=True)
+    city = models.CharField(max_length=100, blank=True)
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('date', 'country', 'region', 'city')
+
+    def __str__(self):
+        return f"{self.country or 'Unknown'} - {self.date}: {self.views} views"
+
+
+class DailyAgentStat(models.Model):
+    """Page views rolled up per day and user agent"""
+    date = models.DateField()
+    agent = models.ForeignKey(UserAgent, on_delete=models.CASCADE, related_name='daily_stats')
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('date', 'agent')
+
+    def __str__(self):
+        return f"{self.agent} - {self.date}: {self.views} views"
+
+
+class RollupDay(models.Model):
+    """Marks a day whose raw page views have been rolled up"""
+    date = models.DateField(unique=True)
+    built_at = models.DateTimeField(auto_now=True)
+    # Set once the raw rows have been moved to an archive file; the
+    # rollups for this day can no longer be rebuilt from PageView
+    archived_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-date']
+
+    def __str__(self):
+        return f"Rollup {self.date}"
@@ -0,0 +1,101 @@
+# analytics/rollups.py
+from collections import Counter
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from .cache import bump_version
+from .models import PageView, DailyAgentStat, DailyPageStat, DailyLocationStat, RollupDay
+
+
+def build_rollups(day):
+    """(Re)build the rollup rows for a single closed day"""
+    if RollupDay.objects.filter(date=day, archived_at__isnull=False).exists():
+        raise ValueError(f'Page views for {day} are archived, restore them before rebuilding')
+
+    page_views = PageView.objects.filter(date=day)
+
+    page_stats = [
+        DailyPageStat(date=day, **row)
+        for row in page_views
+        .values('page_url', 'page_title', 'traffic_source')
+        .annotate(views=Count('id'))
+        .order_by()
+    ]
+
+    # NULL and '' both mean "unknown", fold them into one row
+    locations = Counter()
+    for row in (page_views
+                .values('country', 'region', 'city')
+                .annotate(views=Count('id'))
+                .order_by()):
+        locations[(row['country'] or '', row['region'] or '', row['city'] or '')] += row['views']
+    location_stats = [
+        DailyLocationStat(date=day, country=country, region=region, city=city, views=views)
+        for (country, region, city), views in locations.items()
+    ]
+
+    agent_stats = [
+        DailyAgentStat(date=day, **row)
+        for row in page_views
+        .filter(agent__isnull=False)
+        .values('agent_id')
+        .annotate(views=Count('id'))
+        .order_by()
+    ]
+
+    with transaction.atomic():
+        DailyPageStat.objects.filter(date=day).delete()
+        DailyLocationStat.objects.filter(date=day).delete()
+        DailyAgentStat.objects.filter(date=day).delete()
+        DailyPageStat.objects.bulk_create(page_stats)
+        DailyLocationStat.objects.bulk_create(location_stats)
+        DailyAgentStat.objects.bulk_create(agent_stats)
+        RollupDay.objects.update_or_create(date=day)
+
+    # Cached dashboard payloads may include this day
+    bump_version()
+    return len(page_stats)
+
+
+def build_pending_rollups():
+    """Roll up every closed day that hasn't been rolled up yet"""
+    yesterday = timezone.now().date() - timedelta(days=1)
+
+    last_built = RollupDay.objects.order_by('-date').values_list('date', flat=True).first()
+    if last_built:
+        day = last_built + timedelta(days=1)
+    else:
+        day = PageView.objects.aggregate(first=Min('date'))['first']
+        if day is None:
+            return []
+
+    built = []
+    while day <= yesterday:
+        build_rollups(day)
+        built.append(day)
+        day += timedelta(days=1)
+    return built
+
+
+def split_range(rollup_model, start, end):
+    """Split [start, end] into a rollup queryset and a raw PageView queryset
+
+    Every day is read from exactly one of them: days that have been rolled
+    up (archived or not) from `rollup_model`, all other days (today, days
+    not rolled up yet) from PageView. A missing rollup only sends that day
+    to the raw table, and archived days are always counted.
+    """
+    rolled = rollup_model.objects.filter(date__lte=end)
+    raw = PageView.objects.filter(date__lte=end)
+    rolled_days = RollupDay.objects.filter(date__lte=end)
+    if start is not None:
+        rolled = rolled.filter(date__gte=start)
+        raw = raw.filter(date__gte=start)
+        rolled_days = rolled_days.filter(date__gte=start)
+
+    # Rollup rows are written in the same transaction as their RollupDay,
+    # so only the raw side has to leave the rolled-up days out
+    return rolled, raw.exclude(date__in=rolled_days.values('date'))
@@ -1,159 +1,206 @@
 # analytics/services.py
-from django.db.models import Count
-from .models import PageView, AnalyticsManager
+from collections import Counter
+from datetime import timedelta
+
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from .models import DailyAgentStat, DailyPageStat, DailyLocationStat
+from .rollups import split_range
+from .timeseries import auto_bucket, page_view_series
 
 
 class AnalyticsService:
-    """Single service to handle all analytics data"""
-    
-    
+    """Single service to handle all analytics data
+
+    Rolled-up days are read from the daily rollup tables; only the days
+    that aren't rolled up yet (normally just today) hit PageView.
+    """
+
+
     @staticmethod
-    def get_dashboard_data(period='today'):
+    def get_dashboard_data(period='today', bucket=None):
         """Get all dashboard data in one call"""
-        page_views = PageView.objects.all()
-        chart_data_result = AnalyticsService.get_chart_data(period)
-        
+        chart_data_result = AnalyticsService.get_chart_data(period, bucket)
+
         return {
-            'total_views': AnalyticsManager.get_views_by_period(page_views, period),
-            'traffic_sources': list(AnalyticsManager.get_traffic_sources(page_views, period)),
+            'total_views': AnalyticsService.get_total_views(period),
+            'traffic_sources': AnalyticsService.get_traffic_sources(period),
             'top_pages': AnalyticsService.get_top_pages(period),
             'chart_data': [item['value'] for item in chart_data_result],
-            'labels': [item['label'] for item in chart_data_result],  
+            'labels': [item['label'] for item in chart_data_result],
         }
-    
+
     @staticmethod
-    def get_top_pages(period='today', limit=10):
+    def get_total_views(period='today', url_prefix=None):
+        """Total page views for the period"""
+        rolled, raw = AnalyticsService._page_sources(period, url_prefix)
+        return raw.count() + (rolled.aggregate(total=Sum('views'))['total'] or 0)
+
+    @staticmethod
+    def get_traffic_sources(period='today', url_prefix=None):
+        """Page views per traffic source for the period"""
+        rolled, raw = AnalyticsService._page_sources(period, url_prefix)
+        return AnalyticsService._grouped(rolled, raw, ['traffic_source'], 'count')
+
+    @staticmethod
+    def get_top_pages(period='today', limit=10, url_prefix=None):
         """Get top performing pages"""
-        page_views = PageView.objects.all()
-        
-        # Apply period filter
-        filtered_views = AnalyticsService._filter_by_period(page_views, period)
-        
-        return list(
-            filtered_views
-            .values('page_url', 'page_title')
-            .annotate(views=Count('id'))
-            .order_by('-views')[:limit]
+        rolled, raw = AnalyticsService._page_sources(period, url_prefix)
+        return AnalyticsService._grouped(
+            rolled, raw, ['page_url', 'page_title'], 'views', limit=limit
         )
-    
+
     @staticmethod
     def get_blog_analytics(period='today'):
         """Get blog-specific analytics"""
-        blog_views = PageView.objects.filter(page_url__startswith='/blog/')
-        
         return {
-            'total_blog_views': AnalyticsManager.get_views_by_period(blog_views, period),
-            'blog_traffic_sources': list(AnalyticsManager.get_traffic_sources(blog_views, period)),
-            'top_blog_posts': list(AnalyticsService._filter_by_period(blog_views, period)
-            .values('page_url', 'page_title')
-            .annotate(views=Count('id'))
-            .order_by('-views')[:5])
+            'total_blog_views': AnalyticsService.get_total_views(period, url_prefix='/blog/'),
+            'blog_traffic_sources': AnalyticsService.get_traffic_sources(period, url_prefix='/blog/'),
+            'top_blog_posts': AnalyticsService.get_top_pages(period, limit=5, url_prefix='/blog/'),
         }
-    
+
     @staticmethod
-    def _filter_by_period(queryset, period):
-        """Helper to filter queryset by period"""
-        from django.utils import timezone
-        from datetime import timedelta
-        
+    def _date_range(period):
+        """(start, end) dates of a period; start is None for all time
+
+        `period` is one of today/week/month/year or an explicit (start, end)
+        tuple for custom ranges.
+        """
+        if isinstance(period, (tuple, list)):
+            return tuple(period)
+
         today = timezone.now().date()
-        
+
         if period == 'today':
-            return queryset.filter(date=today)
+            return today, today
         elif period == 'week':
-            start_week = today - timedelta(days=today.weekday())
-            return queryset.filter(date__gte=start_week)
+            return today - timedelta(days=today.weekday()), today
         elif period == 'month':
-            start_month = today.replace(day=1)
-            return queryset.filter(date__gte=start_month)
+            return today.replace(day=1), today
         elif period == 'year':
-            start_year = today.replace(month=1, day=1)
-            return queryset.filter(date__gte=start_year)
-        
-        return queryset
-    
+            return today.replace(month=1, day=1), today
+
+        return None, today
+
+    @staticmethod
+    def _filter_by_period(queryset, period):
+        """Helper to filter queryset by period"""
+        start, end = AnalyticsService._date_range(period)
+
+        if start is None:
+            return queryset
+        return queryset.filter(date__range=(start, end))
+
     @staticmethod
-    def get_chart_data(period='week'):
+    def _split_period(rollup_model, period):
+        """Rollup queryset and raw PageView queryset for a period"""
+        return split_range(rollup_model, *AnalyticsService._date_range(period))
+
+    @staticmethod
+    def _page_sources(period, url_prefix=None):
+        rolled, raw = AnalyticsService._split_period(DailyPageStat, period)
+
+        if url_prefix:
+            raw = raw.filter(page_url__startswith=url_prefix)
+            rolled = rolled.filter(page_url__startswith=url_prefix)
+        return rolled, raw
+
+    @staticmethod
+    def _grouped(rolled, raw, fields, count_name, limit=None):
+        """GROUP BY `fields` over both sources and merge the counts"""
+        totals = Counter()
+
+        for row in raw.values(*fields).annotate(total=Count('id')).order_by():
+            totals[tuple(row[field] or '' for field in fields)] += row['total']
+        for row in rolled.values(*fields).annotate(total=Sum('views')).order_by():
+            totals[tuple(row[field] or '' for field in fields)] += row['total']
+
+        return [
+            {**dict(zip(fields, key)), count_name: count}
+            for key, count in totals.most_common(limit)
+        ]
+
+    @staticmethod
+    def get_chart_data(period='week', bucket=None):
         """Get chart data for visualization"""
-        from django.utils import timezone
-        from datetime import timedelta
-        from django.db.models import Count
-        
+        if isinstance(period, (tuple, list)):
+            start, end = period
+            return AnalyticsService.get_time_series(start, end, bucket or auto_bucket(start, end))
+
         today = timezone.now().date()
-        
+
         if period == 'today':
-        # Daily data for past 7 days
-            data = []
-            for i in range(7):
-                date = today - timedelta(days=6-i)
-                count = PageView.objects.filter(date=date).count()
-                data.append({'label': date.strftime('%b %d'), 'value': count})
-        elif period == 'week':
+            # Daily data for past 7 days
+            series = page_view_series(today - timedelta(days=6), today, 'day')
+            return [{'label': day.strftime('%b %d'), 'value': views} for day, views in series]
+        elif period in ('week', 'month'):
             # Weekly data for past 4 weeks
-            data = []
-            for i in range(4):
-                week_start = today - timedelta(days=today.weekday() + (3-i)*7)
-                week_end = week_start + timedelta(days=6)
-                count = PageView.objects.filter(date__range=[week_start, week_end]).count()
-                data.append({'label': f'Week {week_start.strftime("%b %d")}', 'value': count})
-        elif period == 'month':
-            # Weekly data for past 4 weeks
-            data = []
-            for i in range(4):
-                week_start = today - timedelta(days=today.weekday() + (3-i)*7)
-                week_end = week_start + timedelta(days=6)
-                count = PageView.objects.filter(date__range=[week_start, week_end]).count()
-                data.append({'label': f'Week {i+1}', 'value': count})
+            series = page_view_series(today - timedelta(days=today.weekday() + 21), today, 'week')
+            if period == 'week':
+                return [{'label': f'Week {day.strftime("%b %d")}', 'value': views} for day, views in series]
+            return [{'label': f'Week {i+1}', 'value': views} for i, (day, views) in enumerate(series)]
         else:  # year
             # Monthly data for past 12 months
-            data = []
-            for i in range(12):
-                month_date = (today.replace(day=1) - timedelta(days=32*i)).replace(day=1)
-                count = PageView.objects.filter(
-                    date__year=month_date.year, 
-                    date__month=month_date.month
-                ).count()
-                data.append({'label': month_date.strftime('%b'), 'value': count})
-            data.reverse()
-        
-        return data
-    
+            month_start = today.replace(day=1)
+            for _ in range(11):
+                month_start = (month_start - timedelta(days=1)).replace(day=1)
+            series = page_view_series(month_start, today, 'month')
+            return [{'label': day.strftime('%b'), 'value': views} for day, views in series]
+
+    @staticmethod
+    def get_time_series(start, end, bucket='day', url_prefix=None):
+        """Page views between start and end grouped into day/week/month buckets"""
+        label_formats = {'day': '%b %d', 'week': 'Week %b %d', 'month': '%b %Y'}
+        return [
+            {'label': day.strftime(label_formats[bucket]), 'value': views}
+            for day, views in page_view_series(start, end, bucket, url_prefix)
+        ]
+
     @staticmethod
     def get_location_data(location_type, period='week'):
         """Get location analytics data dynamically"""
-        page_views = PageView.objects.all()
-        
-        # Apply period filter
-        filtered_views = AnalyticsService._filter_by_period(page_views, period)
-        
+        rolled, raw = AnalyticsService._split_period(DailyLocationStat, period)
+
         if location_type == 'countries':
             # Group by country and count views
-            location_data = list(
-                filtered_views
-                .exclude(country__isnull=True)
-                .exclude(country='')
-                .values('country')
-                .annotate(count=Count('id'))
-                .order_by('-count')[:10]
-            )
+            raw = raw.exclude(country__isnull=True).exclude(country='')
+            rolled = rolled.exclude(country='')
+            location_data = AnalyticsService._grouped(rolled, raw, ['country'], 'count', limit=10)
             # Format for frontend
             return [{'name': item['country'], 'count': item['count']} for item in location_data]
-        
+
         else:  # regions/cities
             # Group by city/region and count views
-            location_data = list(
-                filtered_views
-                .exclude(city__isnull=True)
-                .exclude(city='')
-                .values('city', 'region')
-                .annotate(count=Count('id'))
-                .order_by('-count')[:10]
-            )
+            raw = raw.exclude(city__isnull=True).exclude(city='')
+            rolled = rolled.exclude(city='')
+            location_data = AnalyticsService._grouped(rolled, raw, ['city', 'region'], 'count', limit=10)
             # Format for frontend - show city, region format
             return [
                 {
                     'name': f"{item['city']}, {item['region']}" if item['region'] else item['city'],
                     'count': item['count']
-                } 
+                }
                 for item in location_data
-            ]
\ No newline at end of file
+            ]
+
+    @staticmethod
+    def get_device_data(period='week'):
+        """Page views per device type and browser, with bots counted apart"""
+        rolled, raw = AnalyticsService._split_period(DailyAgentStat, period)
+        raw = raw.filter(agent__isnull=False)
+        humans_rolled, humans_raw = rolled.filter(agent__is_bot=False), raw.filter(agent__is_bot=False)
+
+        def breakdown(field, limit=None):
+            rows = AnalyticsService._grouped(humans_rolled, humans_raw, [field], 'count', limit=limit)
+            return [{'name': row[field], 'count': row['count']} for row in rows]
+
+        return {
+            'devices': breakdown('agent__device_type'),
+            'browsers': breakdown('agent__browser', limit=10),
+            'operating_systems': breakdown('agent__os', limit=10),
+            'bot_views': (
+                raw.filter(agent__is_bot=True).count()
+                + (rolled.filter(agent__is_bot=True).aggregate(total=Sum('views'))['total'] or 0)
+            ),
+        }
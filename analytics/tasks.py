@@ -0,0 +1,30 @@
+from celery import shared_task
+from .archive import archive_old_page_views
+from .enrichment import enrich_locations
+from .geoip import get_database
+from .rollups import build_pending_rollups
+
+
+@shared_task
+def build_daily_rollups():
+    """Roll up closed days of PageView data for the dashboard"""
+    built = build_pending_rollups()
+    return f"Rolled up {len(built)} day(s)"
+
+
+@shared_task
+def archive_page_views():
+    """Move rolled-up page views past ANALYTICS_RETENTION_DAYS to archive files"""
+    archived = archive_old_page_views()
+    return f"Archived {sum(archived.values())} page views from {len(archived)} day(s)"
+
+
+@shared_task
+def enrich_page_view_locations(batch_size=1000, limit=50000):
+    """Resolve locations for new page views from the local GeoIP database"""
+    if get_database() is None:
+        return "No GeoIP database configured"
+
+    processed, elapsed = enrich_locations(batch_size, limit)
+    rate = processed / elapsed if elapsed else 0
+    return f"Enriched {processed} page views in {elapsed:.2f}s ({rate:.0f} rows/s)"
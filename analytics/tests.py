@@ -1,3 +1,82 @@
-from django.test import TestCase
+import tempfile
+from datetime import timedelta
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .archive import archive_day
+from .models import DailyPageStat, PageView, RollupDay, UserAgent
+from .rollups import build_pending_rollups, build_rollups, split_range
+from .services import AnalyticsService
+from .utils import TrafficSourceDetector
+
+
+class RollupSplitTests(TestCase):
+    def setUp(self):
+        self.today = timezone.now().date()
+        self.archive_root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.archive_root.cleanup)
+        self.browser = UserAgent.objects.create(ua_hash='a', user_agent='Firefox', device_type='desktop', browser='Firefox')
+        self.bot = UserAgent.objects.create(ua_hash='b', user_agent='Googlebot', device_type='bot', is_bot=True)
+
+    def view(self, days_ago, agent=None):
+        PageView.objects.create(
+            page_url='/blog/sleep/', page_title='Sleep', ip_address='10.0.0.1',
+            date=self.today - timedelta(days=days_ago), agent=agent or self.browser,
+        )
+
+    def test_days_without_rollups_are_read_raw(self):
+        for days_ago in (3, 2, 1, 0):
+            self.view(days_ago)
+        build_rollups(self.today - timedelta(days=3))
+        build_rollups(self.today - timedelta(days=1))
+
+        rolled, raw = split_range(DailyPageStat, None, self.today)
+
+        days_ago = lambda rows: sorted((self.today - day).days for day in rows.values_list('date', flat=True))
+        self.assertEqual(days_ago(rolled), [1, 3])
+        self.assertEqual(days_ago(raw), [0, 2])
+        self.assertEqual(AnalyticsService.get_total_views('all'), 4)
+
+    def test_archived_days_are_still_counted(self):
+        for days_ago in (40, 2, 0):
+            self.view(days_ago)
+        self.view(2, agent=self.bot)
+        self.assertEqual(len(build_pending_rollups()), 40)
+
+        with override_settings(ANALYTICS_ARCHIVE_ROOT=self.archive_root.name):
+            archive_day(self.today - timedelta(days=40))
+            archive_day(self.today - timedelta(days=2))
+
+        self.assertEqual(PageView.objects.count(), 1)
+        self.assertEqual(AnalyticsService.get_total_views('all'), 4)
+        devices = AnalyticsService.get_device_data('all')
+        self.assertEqual(devices['devices'], [{'name': 'desktop', 'count': 3}])
+        self.assertEqual(devices['bot_views'], 1)
+
+    def test_days_before_the_first_view_are_empty(self):
+        self.view(1)
+        build_pending_rollups()
+
+        self.assertEqual(RollupDay.objects.count(), 1)
+        with self.assertNumQueries(2):
+            self.assertEqual(AnalyticsService.get_total_views((self.today - timedelta(days=30), self.today)), 1)
+
+
+class TrafficSourceTests(TestCase):
+    def test_referrers_are_matched_on_label_boundaries(self):
+        sources = {
+            'https://www.google.com/search?q=sleep': 'search',
+            'https://news.google.com/': 'search',
+            'https://www.google.com.au/': 'search',
+            'https://google.com.br/url': 'search',
+            'https://m.facebook.com/': 'social',
+            'https://t.co/abc': 'social',
+            'https://notgoogle.com.evil.io/': 'referral',
+            'https://google.com.evil.io/': 'referral',
+            'https://example.org/': 'referral',
+            '': 'direct',
+        }
+        for referrer, source in sources.items():
+            with self.subTest(referrer=referrer):
+                self.assertEqual(TrafficSourceDetector.detect_source(referrer), source)
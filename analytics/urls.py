@@ -9,4 +9,7 @@ urlpatterns = [
     path('traffic-stats/', views.traffic_stats, name='traffic_stats'),
     path('traffic-data/', views.traffic_data, name='traffic_data'),
     path('location-data/', views.location_data, name='location_data'),
+    path('device-data/', views.device_data, name='device_data'),
+    path('cache-stats/', views.cache_stats, name='cache_stats'),
+    path('filter-stats/', views.filter_stats, name='filter_stats'),
 ]
\ No newline at end of file
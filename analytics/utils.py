@@ -1,53 +1,184 @@
 # analytics/utils.py
 import re
-from urllib.parse import urlparse
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+from django.conf import settings
+
+DEFAULT_SEARCH_ENGINES = [
+    'google.com', 'google.com.ng', 'google.co.uk', 'google.ca', 'google.co.za',
+    'bing.com', 'yahoo.com', 'duckduckgo.com', 'yandex.com', 'baidu.com',
+    'ask.com', 'ecosia.org',
+]
+
+DEFAULT_SOCIAL_PLATFORMS = [
+    'facebook.com', 'fb.com', 'twitter.com', 'x.com', 't.co', 'linkedin.com',
+    'lnkd.in', 'instagram.com', 'youtube.com', 'youtu.be', 'tiktok.com',
+    'pinterest.com', 'reddit.com', 'telegram.org', 't.me', 'whatsapp.com',
+    'medium.com', 'threads.com', 'threads.net',
+]
+
 
 class TrafficSourceDetector:
-    SEARCH_ENGINES = [
-        'google.com', 'bing.com', 'yahoo.com', 'duckduckgo.com',
-        'yandex.com', 'baidu.com', 'ask.com'
-    ]
-    
-    SOCIAL_PLATFORMS = [
-        'facebook.com', 'twitter.com', 'x.com', 'linkedin.com',
-        'instagram.com', 'youtube.com', 'tiktok.com', 'pinterest.com',
-        'reddit.com', 'telegram.org', 'whatsapp.com', 'medium.com', 'threads.com'
-    ]
-    
+    """Classifies referrers as direct, search, social or referral
+
+    Domains are matched on label boundaries: a referrer host matches a
+    listed domain if it is that domain or a subdomain of it, so
+    news.google.com is search but notgoogle.com.evil.io is not. A listed
+    domain followed by a country code counts too (google.com.au,
+    google.com.br), as it did when referrers were matched by substring.
+    Each host is checked against a dict once per suffix and the verdict is
+    kept in an LRU cache. The lists can be replaced with the
+    ANALYTICS_SEARCH_ENGINES / ANALYTICS_SOCIAL_PLATFORMS settings.
+    """
+    SEARCH_ENGINES = getattr(settings, 'ANALYTICS_SEARCH_ENGINES', DEFAULT_SEARCH_ENGINES)
+    SOCIAL_PLATFORMS = getattr(settings, 'ANALYTICS_SOCIAL_PLATFORMS', DEFAULT_SOCIAL_PLATFORMS)
+
+    _domains = None
+
+    @classmethod
+    def get_domains(cls):
+        """Registrable domain -> traffic source, built once"""
+        if cls._domains is None:
+            domains = {}
+            for source, listed in (('social', cls.SOCIAL_PLATFORMS), ('search', cls.SEARCH_ENGINES)):
+                for domain in listed:
+                    domains[domain.lower().strip('.').removeprefix('www.')] = source
+            cls._domains = domains
+        return cls._domains
+
     @classmethod
     def detect_source(cls, referrer):
         if not referrer:
             return 'direct'
-        
+
         try:
-            domain = urlparse(referrer).netloc.lower()
-            
-            # Remove www prefix
-            domain = re.sub(r'^www\.', '', domain)
-            
-            if any(search in domain for search in cls.SEARCH_ENGINES):
-                return 'search'
-            elif any(social in domain for social in cls.SOCIAL_PLATFORMS):
-                return 'social'
-            else:
-                return 'referral'
-        except:
+            host = urlsplit(referrer).hostname
+        except ValueError:
             return 'direct'
 
-# Page tracking configuration
-TRACKED_PAGES = {
+        return cls.classify_host(host or '')
+
+    @classmethod
+    @lru_cache(maxsize=getattr(settings, 'ANALYTICS_REFERRER_CACHE_SIZE', 2048))
+    def classify_host(cls, host):
+        domains = cls.get_domains()
+        labels = host.rstrip('.').split('.')
+        hosts = [labels]
+        if len(labels) > 2 and len(labels[-1]) == 2 and labels[-1].isalpha():
+            # A listed domain followed by a country code, e.g. google.com.au
+            hosts.append(labels[:-1])
+
+        # news.google.com -> news.google.com, google.com, com
+        for candidate in hosts:
+            for i in range(len(candidate)):
+                source = domains.get('.'.join(candidate[i:]))
+                if source:
+                    return source
+        return 'referral'
+
+
+def get_client_ip(request):
+    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+    if x_forwarded_for:
+        return x_forwarded_for.split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR', '127.0.0.1')
+
+
+class UserAgentParser:
+    """Rough device/browser/OS classification of User-Agent strings
+
+    Good enough for a dashboard breakdown; order matters because most
+    browsers claim to be several others (Edge says Chrome and Safari too).
+    """
+    BOT_PATTERN = re.compile(
+        r'bot|crawl|spider|slurp|fetch|preview|monitor|headless|lighthouse|'
+        r'curl|wget|python-requests|httpx|go-http-client|java/|okhttp',
+        re.IGNORECASE,
+    )
+    BROWSERS = [
+        ('Edge', re.compile(r'Edg(e|A|iOS)?/')),
+        ('Opera', re.compile(r'OPR/|Opera')),
+        ('Samsung Internet', re.compile(r'SamsungBrowser/')),
+        ('Firefox', re.compile(r'Firefox/|FxiOS/')),
+        ('Chrome', re.compile(r'Chrome/|CriOS/')),
+        ('Safari', re.compile(r'Safari/')),
+    ]
+    OPERATING_SYSTEMS = [
+        ('Android', re.compile(r'Android')),
+        ('iOS', re.compile(r'iPhone|iPad|iPod')),
+        ('Windows', re.compile(r'Windows')),
+        ('macOS', re.compile(r'Macintosh|Mac OS X')),
+        ('ChromeOS', re.compile(r'CrOS')),
+        ('Linux', re.compile(r'Linux')),
+    ]
+
+    @classmethod
+    def parse(cls, user_agent):
+        """Dict of device_type, browser, os and is_bot for a UA string"""
+        is_bot = not user_agent or bool(cls.BOT_PATTERN.search(user_agent))
+        browser = next((name for name, pattern in cls.BROWSERS if pattern.search(user_agent)), 'Other')
+        os_name = next((name for name, pattern in cls.OPERATING_SYSTEMS if pattern.search(user_agent)), 'Other')
+
+        if is_bot:
+            device_type = 'bot'
+        elif 'iPad' in user_agent or 'Tablet' in user_agent or (os_name == 'Android' and 'Mobile' not in user_agent):
+            device_type = 'tablet'
+        elif 'Mobi' in user_agent or os_name in ('Android', 'iOS'):
+            device_type = 'mobile'
+        elif os_name in ('Windows', 'macOS', 'ChromeOS', 'Linux'):
+            device_type = 'desktop'
+        else:
+            device_type = 'other'
+
+        return {'device_type': device_type, 'browser': browser, 'os': os_name, 'is_bot': is_bot}
+
+
+# Page tracking configuration: URL name -> page title. Keyed by route
+# rather than path so titles follow the URLconf when paths change;
+# {kwarg} placeholders are filled from the matched URL.
+TRACKED_ROUTES = {
     # Main app pages
-    '/': 'Homepage',
-    '/about/': 'About Us',
-    '/become-mentor/': 'Become a Mentor',
-    '/contact/': 'Contact Us',
-    '/book-gp/': 'Book GP',
-    '/survival-loan/': 'Survival Loan',
-    '/single-page/': 'Single Page',
-    '/mental-health/': 'Mental Health',
-    '/mentors/': 'Mentors Directory',
-    '/mentorship/': 'Mentorship Program',
-    
-    # Blog pages (dynamic, will be handled separately)
-    '/blog/': 'Blog',
-}
\ No newline at end of file
+    'homepage': 'Homepage',
+    'about': 'About Us',
+    'become_mentor': 'Become a Mentor',
+    'contact': 'Contact Us',
+    'book_gp': 'Book GP',
+    'survival_loan': 'Survival Loan',
+    'single_page': 'Page: {slug}',
+    'mental_health': 'Mental Health',
+    'mentors': 'Mentors Directory',
+    'mentorship': 'Mentorship Program',
+
+    # Blog pages
+    'blog': 'Blog',
+    'search': 'Blog Search',
+    'author_page': 'Blog Author: {username}',
+    'posts_by_category_or_post': 'Blog: {slug}',
+}
+
+
+class TrackedPageResolver:
+    """Page title for a request from the URL match Django already made
+
+    Untracked routes, and requests that didn't match a route at all
+    (static files, 404s), get ''. Titles are cached per route and kwargs.
+    The map can be replaced with the ANALYTICS_TRACKED_ROUTES setting.
+    """
+    ROUTES = getattr(settings, 'ANALYTICS_TRACKED_ROUTES', TRACKED_ROUTES)
+
+    @classmethod
+    def get_title(cls, request):
+        match = getattr(request, 'resolver_match', None)
+        if match is None or match.view_name not in cls.ROUTES:
+            return ''
+        return cls.title_for(match.view_name, tuple(sorted(match.kwargs.items())))
+
+    @classmethod
+    @lru_cache(maxsize=getattr(settings, 'ANALYTICS_TITLE_CACHE_SIZE', 2048))
+    def title_for(cls, view_name, kwargs):
+        kwargs = {name: str(value).replace('-', ' ').title() for name, value in kwargs}
+        try:
+            return cls.ROUTES[view_name].format(**kwargs)
+        except (KeyError, IndexError):
+            return cls.ROUTES[view_name]
@@ -1,9 +1,47 @@
 # analytics/views.py
+from datetime import timedelta
 from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_GET
 from django.shortcuts import render
+from .cache import cached_json_response, get_counters, get_version
+from .filters import get_filter_counters
 from .services import AnalyticsService
+from .timeseries import BUCKETS
+
+MAX_CUSTOM_RANGE_DAYS = 5 * 366
+
+
+def get_custom_range(request):
+    """(start, end) from ?days=N or ?start_date=&end_date=, None if not given"""
+    today = timezone.now().date()
+
+    days = request.GET.get('days')
+    if days:
+        try:
+            days = int(days)
+        except ValueError:
+            raise ValueError('days must be a number')
+        if not 1 <= days <= MAX_CUSTOM_RANGE_DAYS:
+            raise ValueError(f'days must be between 1 and {MAX_CUSTOM_RANGE_DAYS}')
+        return today - timedelta(days=days - 1), today
+
+    if request.GET.get('start_date') or request.GET.get('end_date'):
+        try:
+            start = parse_date(request.GET.get('start_date', ''))
+            end = parse_date(request.GET.get('end_date', ''))
+        except ValueError:
+            start = end = None
+        if not start or not end:
+            raise ValueError('start_date and end_date must be YYYY-MM-DD dates')
+        start, end = min(start, end), max(start, end)
+        if (end - start).days >= MAX_CUSTOM_RANGE_DAYS:
+            raise ValueError(f'Date range can span at most {MAX_CUSTOM_RANGE_DAYS} days')
+        return start, end
+
+    return None
 
 @login_required
 @require_GET
@@ -14,8 +52,10 @@ def dashboard_data(request):
     if period not in ['today', 'week', 'month', 'year']:
         period = 'week'
     
-    data = AnalyticsService.get_dashboard_data(period)
-    return JsonResponse(data)
+    return cached_json_response(
+        request, 'dashboard', period,
+        lambda: AnalyticsService.get_dashboard_data(period),
+    )
 
 @login_required
 def traffic_stats(request):
@@ -27,19 +67,37 @@ def traffic_stats(request):
 def traffic_data(request):
     """Detailed traffic analytics for stats page"""
     period = request.GET.get('period', 'week')
+    bucket = request.GET.get('bucket')
     
     if period not in ['today', 'week', 'month', 'year']:
         period = 'week'
+
+    if bucket and bucket not in BUCKETS:
+        return JsonResponse({'error': f'bucket must be one of {", ".join(BUCKETS)}'}, status=400)
+
+    # Custom windows, e.g. ?days=90&bucket=day or ?start_date=...&end_date=...
+    try:
+        custom_range = get_custom_range(request)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    if custom_range:
+        period = custom_range
     
-    dashboard_data = AnalyticsService.get_dashboard_data(period)
-    blog_data = AnalyticsService.get_blog_analytics(period)
-    chart_data = AnalyticsService.get_chart_data(period)
-    
-    return JsonResponse({
-        **dashboard_data,
-        'blog_analytics': blog_data,
-        'chart_data': chart_data
-    })
+    def build():
+        dashboard_data = AnalyticsService.get_dashboard_data(period, bucket)
+        blog_data = AnalyticsService.get_blog_analytics(period)
+        chart_data = [
+            {'label': label, 'value': value}
+            for label, value in zip(dashboard_data['labels'], dashboard_data['chart_data'])
+        ]
+        return {
+            **dashboard_data,
+            'blog_analytics': blog_data,
+            'chart_data': chart_data,
+            'views': dashboard_data['chart_data'],
+        }
+
+    return cached_json_response(request, 'traffic', period, build, bucket)
 
 @login_required
 @require_GET
@@ -54,9 +112,49 @@ def location_data(request):
     if period not in ['today', 'week', 'month', 'year']:
         period = 'week'
     
-    # Get location data from your service
-    location_data = AnalyticsService.get_location_data(location_type, period)
-    
+    return cached_json_response(
+        request, 'locations', period,
+        lambda: {'locations': AnalyticsService.get_location_data(location_type, period)},
+        location_type,
+    )
+
+@login_required
+@require_GET
+def device_data(request):
+    """Device, browser and OS breakdown"""
+    period = request.GET.get('period', 'week')
+
+    if period not in ['today', 'week', 'month', 'year']:
+        period = 'week'
+
+    return cached_json_response(
+        request, 'devices', period, lambda: AnalyticsService.get_device_data(period)
+    )
+
+@login_required
+@require_GET
+def cache_stats(request):
+    """Hit/miss counters for the analytics response cache"""
+    counters = get_counters('cache_hits', 'cache_misses')
+    lookups = counters['cache_hits'] + counters['cache_misses']
+
+    return JsonResponse({
+        'hits': counters['cache_hits'],
+        'misses': counters['cache_misses'],
+        'hit_ratio': round(counters['cache_hits'] / lookups, 3) if lookups else None,
+        'version': get_version(),
+    })
+
+@login_required
+@require_GET
+def filter_stats(request):
+    """Page views dropped by each ingestion filter"""
+    counters = get_filter_counters()
+    dropped = sum(counters['filtered'].values())
+    seen = counters['recorded'] + dropped
+
     return JsonResponse({
-        'locations': location_data
-    })
\ No newline at end of file
+        **counters,
+        'dropped': dropped,
+        'drop_ratio': round(dropped / seen, 3) if seen else None,
+    })
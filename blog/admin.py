@@ -4,6 +4,7 @@ from django.utils.html import format_html
 from django.urls import path, reverse
 from django.shortcuts import redirect
 from django.contrib import messages
+from .cache import comments_cache_tags, touch
 from .models import Post, Category, Comment, PostView, UserProfile, Page
 
 
@@ -199,7 +200,9 @@ class CommentAdmin(admin.ModelAdmin):
     actions = ['approve_comments']
 
     def approve_comments(self, request, queryset):
+        cache_tags = comments_cache_tags(queryset)
         queryset.update(approved=True)
+        touch(*cache_tags)
     approve_comments.short_description = "Approve selected comments"
 
 
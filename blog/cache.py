@@ -0,0 +1,213 @@
+# blog/cache.py
+import contextvars
+import hashlib
+import re
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+
+# Seconds a cached page is served as is, and how much longer a stale copy
+# may be served while one request rebuilds it
+DEFAULT_TTL = 300
+DEFAULT_STALE_TTL = 60 * 60
+# Longest a rebuild may take before another request is allowed to try
+REBUILD_LOCK_TIMEOUT = 30
+
+CSRF_PLACEHOLDER = '__blog_page_cache_csrf__'
+_csrf_input = re.compile(r'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+
+# The cookie banner depends on the visitor's consent (and embeds a CSRF
+# token), so it is cut out of stored pages and rendered per request
+COOKIE_BANNER_PLACEHOLDER = '__blog_page_cache_cookie_banner__'
+COOKIE_BANNER_TEMPLATE = 'partials/cookie_banner.html'
+_cookie_banner = re.compile(r'<!-- cookie-banner -->.*?<!-- /cookie-banner -->', re.S)
+
+# When the outermost build in progress started. A build nested in another
+# (the sidebar inside a page) registers its tags as of then, or the outer
+# entry would look older than its own tags and never be fresh.
+_build_started = contextvars.ContextVar('blog_cache_build_started', default=None)
+
+
+def _tag_key(tag):
+    return f'blog:cache-tag:{tag}'
+
+
+def touch(*tags):
+    """Mark everything cached from these tags as stale
+
+    A tag's value is the time it last changed. Entries remember when they
+    were built, so only entries that depend on one of `tags` and were
+    built before now are affected; nothing has to be deleted by key. The
+    change is recorded once the current transaction commits, so a rebuild
+    can't cache the old rows after the tag moved.
+    """
+    if tags:
+        transaction.on_commit(lambda: cache.set_many({_tag_key(tag): time.time() for tag in tags}, None))
+
+
+def changed_since(tags, built_at):
+    """True when any of `tags` changed after `built_at` (or is unknown)"""
+    keys = {_tag_key(tag): tag for tag in tags}
+    times = cache.get_many(keys)
+    missing = [key for key in keys if key not in times]
+    if missing:
+        # Evicted tags may have lost a change, so whatever used them is stale
+        cache.set_many({key: time.time() for key in missing}, None)
+        return True
+    return any(changed_at > built_at for changed_at in times.values())
+
+
+def _register_tags(tags, built_at):
+    # Tags that never changed count as changed when the first entry using
+    # them was built, so a missing tag always means an eviction
+    for tag in tags:
+        cache.add(_tag_key(tag), built_at, None)
+
+
+def get_or_build(key, build, ttl=None, stale_ttl=None):
+    """Cached value of `build()`, which returns (value, tags)
+
+    A fresh entry is returned as is. A stale one (past `ttl` or built
+    before one of its tags changed) is rebuilt by the first request only;
+    everyone else keeps getting the stale copy until the rebuild lands,
+    so publishing a post doesn't send every reader to the database.
+    """
+    ttl = ttl or getattr(settings, 'BLOG_PAGE_CACHE_TTL', DEFAULT_TTL)
+    stale_ttl = stale_ttl or getattr(settings, 'BLOG_PAGE_CACHE_STALE_TTL', DEFAULT_STALE_TTL)
+
+    entry = cache.get(key)
+    if entry is not None:
+        fresh = time.time() < entry['fresh_until'] and not changed_since(entry['tags'], entry['built_at'])
+        if fresh or not cache.add(f'{key}:lock', 1, REBUILD_LOCK_TIMEOUT):
+            return entry['value']
+
+    built_at = time.time()
+    registered_at = _build_started.get() or built_at
+    token = _build_started.set(registered_at)
+    try:
+        value, tags = build()
+        if value is not None:
+            _register_tags(tags, registered_at)
+            cache.set(key, {
+                'value': value,
+                'tags': sorted(tags),
+                'built_at': built_at,
+                'fresh_until': built_at + ttl,
+            }, ttl + stale_ttl)
+        return value
+    finally:
+        _build_started.reset(token)
+        if entry is not None:
+            cache.delete(f'{key}:lock')
+
+
+def post_tags(post_id, author_id=None, category_ids=()):
+    """Tags of everything showing a post: listings, its page, its author and categories"""
+    tags = ['posts', f'post:{post_id}', *(f'category:{category_id}' for category_id in category_ids)]
+    if author_id:
+        tags.append(f'author:{author_id}')
+    return tags
+
+
+def posts_cache_tags(posts):
+    """Tags of the pages showing any of `posts` (a Post queryset)
+
+    For bulk update() and delete(), which skip the signals: collect the
+    tags first and touch() them once the rows have changed.
+    """
+    tags = set()
+    for post_id, author_id, category_id in posts.values_list('id', 'author_id', 'category__id'):
+        tags.update(post_tags(post_id, author_id, [category_id] if category_id else []))
+    return tags
+
+
+def comments_cache_tags(comments):
+    """Tags of the pages of the posts `comments` (a Comment queryset) belong to"""
+    return {f'post:{post_id}' for post_id in comments.values_list('post_id', flat=True)}
+
+
+def is_cacheable(request):
+    """Only anonymous GETs without pending flash messages share cached pages"""
+    return (
+        request.method in ('GET', 'HEAD')
+        and not request.user.is_authenticated
+        and not len(get_messages(request))
+    )
+
+
+def add_cache_tags(request, *tags):
+    """Declare what the page being rendered depends on"""
+    if hasattr(request, 'page_cache_tags'):
+        request.page_cache_tags.update(tags)
+
+
+def set_cache_meta(request, **meta):
+    """Data handed to `on_hit` when this page is later served from the cache"""
+    if hasattr(request, 'page_cache_meta'):
+        request.page_cache_meta.update(meta)
+
+
+def render_cookie_banner(request):
+    """The cookie banner as this visitor should see it"""
+    from main.context_processors import cookie_consent
+
+    context = {**cookie_consent(request), 'csrf_token': get_token(request)}
+    return render_to_string(COOKIE_BANNER_TEMPLATE, context)
+
+
+def cache_public_page(*params, on_hit=None):
+    """Cache a public view for anonymous readers
+
+    The key is the view, its URL arguments and the query `params` that
+    change the page. While rendering, the view names its dependencies
+    with add_cache_tags(); see touch() for how they are invalidated.
+    CSRF tokens and the cookie banner are taken out of the stored HTML
+    and filled in per request. `on_hit(request, **meta)` runs for every
+    response served from the cache, for work the view can't skip (e.g.
+    view counts).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not is_cacheable(request):
+                return view(request, *args, **kwargs)
+
+            parts = [view.__name__, *args, *sorted(kwargs.items()), *(request.GET.get(param) for param in params)]
+            key = 'blog:page:' + hashlib.md5(repr(parts).encode()).hexdigest()
+            rendered = []
+
+            def build():
+                request.page_cache_tags = set()
+                request.page_cache_meta = {}
+                response = view(request, *args, **kwargs)
+                rendered.append(response)
+                if response.status_code != 200 or response.streaming or not request.page_cache_tags:
+                    return None, ()
+                content = _cookie_banner.sub(COOKIE_BANNER_PLACEHOLDER, response.content.decode(), count=1)
+                return {
+                    'content': _csrf_input.sub(rf'\g<1>{CSRF_PLACEHOLDER}\g<2>', content),
+                    'content_type': response['Content-Type'],
+                    'meta': request.page_cache_meta,
+                }, request.page_cache_tags
+
+            page = get_or_build(key, build)
+            if rendered:
+                return rendered[0]
+
+            if on_hit:
+                on_hit(request, **page['meta'])
+            content = page['content']
+            if CSRF_PLACEHOLDER in content:
+                content = content.replace(CSRF_PLACEHOLDER, get_token(request))
+            if COOKIE_BANNER_PLACEHOLDER in content:
+                content = content.replace(COOKIE_BANNER_PLACEHOLDER, render_cookie_banner(request))
+            return HttpResponse(content, content_type=page['content_type'])
+        return wrapper
+    return decorator
@@ -1,12 +1,18 @@
+from .cache import get_or_build
 from .models import Category
 from django.db.models import Count, Q
 
-def get_categories(request):
+def _build_categories():
     categories = list(
         Category.objects.annotate(
             posts_count=Count('posts', filter=Q(posts__status='published'))
         ).order_by('id') 
     )
+    return categories, ('categories', 'posts')
+
+def get_categories(request):
+    # Shared by every page, so built once and kept until a category or post changes
+    categories = get_or_build('blog:categories', _build_categories)
     main_categories = categories[:5]    
     dropdown_categories = categories[5:] 
 
@@ -0,0 +1,202 @@
+# blog/counters.py
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+
+from .models import Post, PostView
+
+logger = logging.getLogger(__name__)
+
+
+def period_starts(day):
+    """First day of the week (Monday) and of the year containing `day`"""
+    return day - timedelta(days=day.weekday()), day.replace(month=1, day=1)
+
+
+class PostViewCounter:
+    """Coalesces post views in memory and writes them as F() increments.
+
+    A read only bumps a Counter keyed by (post id, day). A daemon thread
+    flushes every `interval` seconds: one upsert per PostView row and one
+    page_views increment per post, however many reads came in, so a viral
+    post never has every request queueing on its row. At most `max_keys`
+    post/day pairs are held; past that views are dropped and counted.
+    """
+
+    def __init__(self, interval=None, max_keys=None):
+        self.interval = interval or getattr(settings, 'BLOG_VIEW_FLUSH_INTERVAL', 10)
+        self.max_keys = max_keys or getattr(settings, 'BLOG_VIEW_MAX_PENDING', 10000)
+        self.dropped = 0
+        self._counts = Counter()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def add(self, post_id, day=None):
+        """Count one view of a post; never touches the database"""
+        key = (post_id, day or timezone.localdate())
+        with self._lock:
+            if key not in self._counts and len(self._counts) >= self.max_keys:
+                self.dropped += 1
+                return
+            self._counts[key] += 1
+        self._ensure_worker()
+
+    def pending(self, post_id, day):
+        """Views of a post on `day` counted by this process but not written yet"""
+        return self._counts.get((post_id, day), 0)
+
+    def flush(self):
+        """Write everything counted so far, returns the number of views"""
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+        if not counts:
+            return 0
+
+        try:
+            # Views of posts deleted since are dropped; foreign keys are only
+            # checked at commit, so one of them would fail the whole batch
+            existing = set(
+                Post.all_objects.filter(id__in={post_id for post_id, _ in counts})
+                .values_list('id', flat=True)
+            )
+            with transaction.atomic():
+                per_post = Counter()
+                # Rows are always locked in the same order, so concurrent
+                # flushes from several workers can't deadlock
+                for (post_id, day), count in sorted(counts.items()):
+                    if post_id in existing and upsert_post_view(post_id, day, count):
+                        per_post[post_id] += count
+                for post_id, count in sorted(per_post.items()):
+                    Post.all_objects.filter(id=post_id).update(page_views=F('page_views') + count)
+        except Exception:
+            # Merge the batch back so a short database outage loses nothing
+            with self._lock:
+                self._counts.update(counts)
+            raise
+
+        for (post_id, day), count in counts.items():
+            add_to_cached_totals(post_id, day, count)
+        return sum(counts.values())
+
+    def __len__(self):
+        return sum(self._counts.values())
+
+    def _ensure_worker(self):
+        # Forked workers (gunicorn/celery prefork) need their own thread
+        if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name='post-view-counter', daemon=True
+            )
+            self._thread.start()
+        atexit.register(self._flush_quietly)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self._flush_quietly()
+
+    def _flush_quietly(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Failed to flush %d buffered post views', len(self))
+        finally:
+            close_old_connections()
+
+
+def upsert_post_view(post_id, day, count):
+    """Add `count` to the PostView row of (post, day), creating it if needed
+
+    Returns False if the row could not be written.
+    """
+    rows = PostView.objects.filter(post_id=post_id, date=day)
+    if rows.update(count=F('count') + count):
+        return True
+    try:
+        with transaction.atomic():
+            PostView.objects.create(post_id=post_id, date=day, count=count)
+        return True
+    except IntegrityError:
+        # Another process created the row first
+        return bool(rows.update(count=F('count') + count))
+
+
+def _totals_keys(post_id, day):
+    """Cache key of the day, week and year totals that `day` counts towards"""
+    start_week, start_year = period_starts(day)
+    return {
+        'today': f'blog:post-views:{post_id}:day:{day.isoformat()}',
+        'week': f'blog:post-views:{post_id}:week:{start_week.isoformat()}',
+        'year': f'blog:post-views:{post_id}:year:{start_year.isoformat()}',
+    }
+
+
+def get_view_totals(post_id):
+    """{'today', 'week', 'year'} view counts of a post
+
+    Each period is its own counter in the shared cache, keyed by the day
+    it starts. Missing ones are computed with one query and then kept
+    current by every flush, so reading them is normally a single
+    get_many.
+    """
+    today = timezone.localdate()
+    keys = _totals_keys(post_id, today)
+    cached = cache.get_many(keys.values())
+    totals = {period: cached.get(key) for period, key in keys.items()}
+    if None in totals.values():
+        start_week, start_year = period_starts(today)
+        counted = PostView.objects.filter(
+            post_id=post_id, date__gte=min(start_week, start_year), date__lte=today,
+        ).aggregate(
+            today=Sum('count', filter=Q(date=today), default=0),
+            week=Sum('count', filter=Q(date__gte=start_week), default=0),
+            year=Sum('count', filter=Q(date__gte=start_year), default=0),
+        )
+        timeout = getattr(settings, 'BLOG_VIEW_TOTALS_TTL', 300)
+        for period, key in keys.items():
+            if totals[period] is None:
+                # add, not set: never overwrite a counter a flush has moved on
+                cache.add(key, counted[period], timeout)
+                totals[period] = counted[period]
+
+    pending = post_view_counter.pending(post_id, today)
+    if pending:
+        totals = {period: count + pending for period, count in totals.items()}
+    return totals
+
+
+def add_to_cached_totals(post_id, day, count):
+    """Add flushed views to the cached counters of the periods containing `day`
+
+    Only counters that are already cached are incremented, atomically, so
+    concurrent flushes from several workers never lose each other's
+    views. A missing counter is left alone: the next read computes it from
+    the rows just written. A read that fills a counter between a flush's
+    commit and its increment counts that batch twice; the counters expire
+    after BLOG_VIEW_TOTALS_TTL, which bounds the error.
+    """
+    for key in _totals_keys(post_id, day).values():
+        try:
+            cache.incr(key, count)
+        except ValueError:
+            pass
+
+
+post_view_counter = PostViewCounter()
+
@@ -0,0 +1,99 @@
+# blog/loaders.py
+from django.core.paginator import Paginator
+from django.db.models import Q
+
+from media_manager.renditions import prefetch_srcsets
+
+from .models import Post
+
+# Top-level comments (threads) per page of comments
+COMMENTS_PER_PAGE = 10
+RECENT_POSTS = 5
+
+
+def _with_cards(posts):
+    """Everything a post card renders: author and categories"""
+    return posts.select_related('author').prefetch_related('category')
+
+
+def get_single_post(slug):
+    """The published post with its author, author profile and categories (2 queries)"""
+    return (
+        _with_cards(Post.objects.published())
+        .select_related('author__profile')
+        .filter(slug=slug)
+        .first()
+    )
+
+
+def build_comment_tree(comments):
+    """Top-level comments with `thread_replies` set on every comment
+
+    `comments` is one flat list (e.g. all approved comments of a post);
+    replies whose parent isn't in it are left out, like the template
+    used to hide replies of unapproved comments.
+    """
+    by_id = {}
+    for comment in comments:
+        comment.thread_replies = []
+        by_id[comment.id] = comment
+
+    top_level = []
+    for comment in comments:
+        if comment.parent_id is None:
+            top_level.append(comment)
+        elif comment.parent_id in by_id:
+            by_id[comment.parent_id].thread_replies.append(comment)
+    return top_level
+
+
+def load_comment_threads(post, page=None, per_page=COMMENTS_PER_PAGE):
+    """One page of approved comment threads of a post, newest thread first
+
+    Pages are counted in top-level comments. The threads on the page are
+    then loaded whole with one prefix match on Comment.path, however deep
+    they go. Returns (threads, comment_page), three queries in all.
+    """
+    roots = post.comments.filter(approved=True, parent=None).order_by('-created_on', '-id')
+    comment_page = Paginator(roots.values_list('path', flat=True), per_page).get_page(page)
+    root_paths = [path for path in comment_page.object_list if path]
+    if not root_paths:
+        return [], comment_page
+
+    in_threads = Q()
+    for path in root_paths:
+        in_threads |= Q(path__startswith=path)
+    # Descending path puts newer replies first, as the model ordering did
+    comments = list(post.comments.filter(in_threads, approved=True).order_by('-path'))
+
+    position = {path: index for index, path in enumerate(root_paths)}
+    threads = sorted(build_comment_tree(comments), key=lambda comment: position[comment.path])
+    return threads, comment_page
+
+
+def load_post_page(post, comments_page=None):
+    """Context for single_blog.html in a fixed number of queries
+
+    Comment threads are loaded by materialized path and threaded in
+    Python, so the cost doesn't grow with the number of comments or
+    how deep the replies go.
+    """
+    category_names = [category.category_name.lower() for category in post.category.all()]
+    threads, comment_page = load_comment_threads(post, comments_page)
+    featured_post = list(
+        _with_cards(Post.objects.filter(category__category_name="Featured")).order_by("-published_date")[:1]
+    )
+    posts = list(Post.objects.filter(is_featured=False, status='published')[:RECENT_POSTS])
+    # Sidebar cards render |srcset
+    prefetch_srcsets(card.featured_image for card in [*featured_post, *posts])
+
+    return {
+        'single_post': post,
+        'author': post.author,
+        'show_newsletter': any('house job content' in name for name in category_names),
+        'featured_post': featured_post,
+        'posts': posts,
+        'comments': threads,
+        'comment_page': comment_page,
+        'total_comments': comment_page.paginator.count,
+    }
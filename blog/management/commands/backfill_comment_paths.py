@@ -0,0 +1,53 @@
+# management/commands/backfill_comment_paths.py
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.models import Comment
+from blog.paths import comment_paths
+
+
+class Command(BaseCommand):
+    help = 'Fill in or repair the materialized path of every comment'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of comments updated per query',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count the comments whose path is wrong without changing them',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        # Two ints per comment, so the whole forest fits in memory
+        parents = {}
+        current = {}
+        for comment_id, parent_id, path in Comment.objects.values_list('id', 'parent_id', 'path').iterator():
+            parents[comment_id] = parent_id
+            current[comment_id] = path
+
+        paths = comment_paths(parents)
+        stale = [
+            Comment(id=comment_id, path=path)
+            for comment_id, path in paths.items()
+            if path != current[comment_id]
+        ]
+
+        if options['dry_run']:
+            self.stdout.write(
+                self.style.WARNING(f'DRY RUN: {len(stale)} of {len(parents)} comments need a new path.')
+            )
+            return
+
+        with transaction.atomic():
+            Comment.objects.bulk_update(stale, ['path'], batch_size=batch_size)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Updated the path of {len(stale)} of {len(parents)} comments.')
+        )
@@ -0,0 +1,111 @@
+# management/commands/benchmark_search.py
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+
+from blog.models import Post
+from blog.search import add_highlights, index_posts, search_posts, to_search_text
+
+WORDS = (
+    'health wellness diet sleep exercise heart blood pressure diabetes insulin vitamin mineral '
+    'protein fiber hydration stress anxiety immune infection vaccine fever cough allergy asthma '
+    'skin bone joint muscle brain memory focus nutrition calorie sugar cholesterol kidney liver '
+    'pregnancy child elderly therapy recovery symptom diagnosis treatment prevention clinic doctor'
+).split()
+SYLLABLES = 'ka lo mi ne ru ta vi so de pa li gu'.split()
+
+
+def vocabulary(rng, size=5000):
+    """The health words plus pseudo-words, weighted so word frequency is Zipf-like"""
+    words = list(WORDS)
+    while len(words) < size:
+        words.append(''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4))))
+    cum_weights = []
+    total = 0.0
+    for rank in range(len(words)):
+        total += 1.0 / (rank + 10)
+        cum_weights.append(total)
+    return words, cum_weights
+
+
+class Command(BaseCommand):
+    help = 'Compare the icontains search with the full-text index on a synthetic corpus (rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=50000, help='Number of synthetic posts')
+        parser.add_argument('--words', type=int, default=400, help='Words per post body')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per query')
+        parser.add_argument(
+            '--query',
+            action='append',
+            dest='queries',
+            help='Search to time (may be repeated); defaults to a few sample searches',
+        )
+
+    def handle(self, *args, **options):
+        queries = options['queries'] or ['insulin', 'blood pressure', 'vitamin deficiency']
+        rng = random.Random(0)
+
+        self.stdout.write(f'Database: {connection.vendor}')
+        with transaction.atomic():
+            started = time.perf_counter()
+            self.create_corpus(rng, options['posts'], options['words'])
+            index_posts()
+            self.stdout.write(f'Built and indexed {options["posts"]} posts in {time.perf_counter() - started:.1f}s')
+
+            for query in queries:
+                legacy, legacy_count = self.time(options['repeat'], lambda: self.legacy_page(query))
+                ranked, ranked_count = self.time(options['repeat'], lambda: self.ranked_page(query))
+                self.stdout.write(self.style.SUCCESS(f'"{query}"'))
+                self.stdout.write(f'  icontains:  {legacy * 1000:8.1f} ms ({legacy_count} matches, unranked)')
+                self.stdout.write(f'  full-text:  {ranked * 1000:8.1f} ms ({ranked_count} matches, ranked + highlights)')
+
+            transaction.set_rollback(True)
+
+    def create_corpus(self, rng, total, words):
+        vocab, cum_weights = vocabulary(rng)
+
+        def text(count):
+            return ' '.join(rng.choices(vocab, cum_weights=cum_weights, k=count))
+
+        batch = []
+        for number in range(total):
+            content = ''.join('<p>' + text(words // 4) + '.</p>' for _ in range(4))
+            batch.append(Post(
+                title=text(6).capitalize(),
+                slug=f'benchmark-search-{number}',
+                excerpt=text(25),
+                content=content,
+                search_text=to_search_text(content),
+                status='published',
+            ))
+            if len(batch) == 1000:
+                Post.all_objects.bulk_create(batch)
+                batch = []
+        Post.all_objects.bulk_create(batch)
+
+    def time(self, repeat, run):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = run()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
+
+    def legacy_page(self, keyword):
+        # The search view before blog/search.py: three unindexed icontains scans
+        posts = Post.objects.filter(
+            Q(title__icontains=keyword) | Q(excerpt__icontains=keyword) | Q(content__icontains=keyword),
+            status='published'
+        )
+        list(posts[:6])
+        return posts.count()
+
+    def ranked_page(self, keyword):
+        posts = search_posts(keyword)
+        add_highlights(posts[:6], keyword)
+        return posts.count()
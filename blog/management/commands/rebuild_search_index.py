@@ -0,0 +1,42 @@
+# management/commands/rebuild_search_index.py
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.models import Post
+from blog.search import index_posts, to_search_text
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stripped search text of every post and rebuild the full-text index'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of posts whose search text is updated per query',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = 0
+        updated = 0
+
+        with transaction.atomic():
+            while True:
+                posts = list(
+                    Post.all_objects.filter(id__gt=last_id).order_by('id').only('id', 'content')[:batch_size]
+                )
+                if not posts:
+                    break
+                for post in posts:
+                    post.search_text = to_search_text(post.content)
+                Post.all_objects.bulk_update(posts, ['search_text'])
+                updated += len(posts)
+                last_id = posts[-1].id
+
+            indexed = index_posts()
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Updated search text of {updated} posts and indexed {indexed}.')
+        )
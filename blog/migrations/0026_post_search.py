@@ -0,0 +1,75 @@
+# Generated by Django 5.2.3 on 2026-10-17 17:27
+
+import html
+import re
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations, models
+from django.utils.html import strip_tags
+
+from utils.migrations import AddPostgresIndex
+
+
+def create_fts_table(apps, schema_editor):
+    # PostgreSQL uses the search_vector column; SQLite gets an FTS5 table instead
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE IF NOT EXISTS blog_post_fts USING fts5(title, excerpt, body)'
+        )
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS blog_post_fts')
+
+
+def index_existing_posts(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    posts = list(Post.objects.only('id', 'content'))
+    for post in posts:
+        post.search_text = re.sub(r'\s+', ' ', html.unescape(strip_tags(post.content or ''))).strip()
+    Post.objects.bulk_update(posts, ['search_text'], batch_size=500)
+
+    if schema_editor.connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchVector
+        Post.objects.update(search_vector=(
+            SearchVector('title', weight='A', config='english')
+            + SearchVector('excerpt', weight='B', config='english')
+            + SearchVector('search_text', weight='C', config='english')
+        ))
+    elif schema_editor.connection.vendor == 'sqlite':
+        rows = Post.objects.values_list('id', 'title', 'excerpt', 'search_text')
+        with schema_editor.connection.cursor() as cursor:
+            cursor.executemany(
+                'INSERT INTO blog_post_fts (rowid, title, excerpt, body) VALUES (%s, %s, %s, %s)',
+                [(post_id, title, excerpt or '', body) for post_id, title, excerpt, body in rows],
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0025_alter_post_category'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='search_text',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        AddPostgresIndex(
+            model_name='post',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='post_search_vector_idx'),
+        ),
+        migrations.RunPython(create_fts_table, drop_fts_table),
+        migrations.RunPython(index_existing_posts, migrations.RunPython.noop),
+    ]
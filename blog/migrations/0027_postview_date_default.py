@@ -0,0 +1,19 @@
+# Generated by Django 5.2.3 on 2026-10-17 17:38
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0026_post_search'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='postview',
+            name='date',
+            field=models.DateField(default=django.utils.timezone.localdate),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.3 on 2026-10-17 17:44
+
+from django.db import migrations, models
+
+from blog.paths import comment_paths
+
+
+def fill_comment_paths(apps, schema_editor):
+    Comment = apps.get_model('blog', 'Comment')
+    paths = comment_paths(dict(Comment.objects.values_list('id', 'parent_id')))
+    comments = [Comment(id=comment_id, path=path) for comment_id, path in paths.items()]
+    Comment.objects.bulk_update(comments, ['path'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0027_postview_date_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['path'], name='comment_path_idx', opclasses=['text_pattern_ops']),
+        ),
+        migrations.RunPython(fill_comment_paths, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,13 @@
 import math
-from datetime import timedelta
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models import Value
+from django.db.models.functions import Concat, Substr
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.template.defaultfilters import slugify
 from django.utils.html import strip_tags
-from django.db.models import Sum
 from django_ckeditor_5.fields import CKEditor5Field
 
 
@@ -103,13 +105,33 @@ class Post(BaseContent):
     
     read_time = models.PositiveIntegerField(default=0, help_text="Estimated reading time in minutes.")
     page_views = models.PositiveIntegerField(default=0)
+    # Plain text of content for the search index, kept current by blog.signals
+    search_text = models.TextField(blank=True, editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         ordering = ['-published_date']
+        indexes = [
+            GinIndex(fields=['search_vector'], name='post_search_vector_idx'),
+        ]
 
     def __str__(self):
         return self.title    
 
+    # View counts come from blog.counters: PostView rows written in batches,
+    # with the per-period totals cached
+    def views_today(self):
+        from .counters import get_view_totals
+        return get_view_totals(self.pk)['today']
+
+    def views_this_week(self):
+        from .counters import get_view_totals
+        return get_view_totals(self.pk)['week']
+
+    def views_this_year(self):
+        from .counters import get_view_totals
+        return get_view_totals(self.pk)['year']
+
 class Page(BaseContent):
     is_in_menu = models.BooleanField(default=False, help_text="Show in navigation menu")
     menu_order = models.PositiveIntegerField(default=0, help_text="Order in menu (lower numbers first)")
@@ -141,17 +163,6 @@ class Page(BaseContent):
 
 
 
-    def views_today(self):
-        return self.views.filter(date=timezone.now().date()).aggregate(Sum('count'))['count__sum'] or 0
-
-    def views_this_week(self):
-        start_week = timezone.now().date() - timedelta(days=timezone.now().weekday())
-        return self.views.filter(date__gte=start_week).aggregate(Sum('count'))['count__sum'] or 0
-
-    def views_this_year(self):
-        start_year = timezone.now().date().replace(month=1, day=1)
-        return self.views.filter(date__gte=start_year).aggregate(Sum('count'))['count__sum'] or 0
-
     def __str__(self):
         return self.title
 
@@ -179,16 +190,48 @@ class Comment(models.Model):
     body = models.TextField()
     created_on = models.DateTimeField(auto_now_add=True)
     approved = models.BooleanField(default=False)
+    # Materialized path: zero-padded ids from the thread's root down to this
+    # comment, e.g. "0000000012/0000000015/". A thread is one prefix match.
+    # Unbounded, so reply chains of any depth fit
+    path = models.TextField(blank=True, editable=False)
+
+    PATH_STEP = 11  # 10 digits and a slash per level
 
     class Meta:
         ordering = ['-created_on']
+        indexes = [
+            # text_pattern_ops lets PostgreSQL use the index for LIKE 'prefix%'
+            models.Index(fields=['path'], name='comment_path_idx', opclasses=['text_pattern_ops']),
+        ]
 
     def __str__(self):
         return f'Comment by {self.name} on {self.post}'
 
+    def build_path(self):
+        parent_path = ''
+        if self.parent_id:
+            parent_path = self.parent.path or self.parent.build_path()
+        return f'{parent_path}{self.pk:010d}/'
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+
+        # The id is only known after the insert, so the path is a second write
+        path = self.build_path()
+        if path != self.path:
+            old_path = self.path
+            Comment.objects.filter(pk=self.pk).update(path=path)
+            if old_path:
+                # Moved to another parent: the whole subtree moves with it
+                Comment.objects.filter(path__startswith=old_path).exclude(pk=self.pk).update(
+                    path=Concat(Value(path), Substr('path', len(old_path) + 1))
+                )
+            self.path = path
+
 class PostView(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='views')
-    date = models.DateField(auto_now_add=True)
+    # Set explicitly by blog.counters, which may flush a view after midnight
+    date = models.DateField(default=timezone.localdate)
     count = models.PositiveIntegerField(default=1)
 
     class Meta:
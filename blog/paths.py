@@ -0,0 +1,20 @@
+# blog/paths.py
+
+
+def comment_paths(parents):
+    """{comment id: materialized path} from {comment id: parent id} (see Comment.path)
+
+    Each comment's ancestors are walked iteratively and every path is
+    computed once, so threads of any depth can't hit the recursion limit.
+    """
+    paths = {}
+    for comment_id in parents:
+        chain = []
+        while comment_id is not None and comment_id not in paths:
+            chain.append(comment_id)
+            comment_id = parents[comment_id]
+        prefix = paths[comment_id] if comment_id is not None else ''
+        for ancestor_id in reversed(chain):
+            prefix = f'{prefix}{ancestor_id:010d}/'
+            paths[ancestor_id] = prefix
+    return paths
@@ -0,0 +1,148 @@
+# blog/search.py
+import html
+import re
+
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import F
+from django.utils.html import strip_tags
+
+from .models import Post
+
+# Relative weight of title, excerpt and body matches
+FTS5_WEIGHTS = (10.0, 4.0, 1.0)
+HIGHLIGHT_START = '<mark>'
+HIGHLIGHT_STOP = '</mark>'
+
+# Bodies are a few hundred words of CKEditor HTML; the index only wants the words
+_whitespace = re.compile(r'\s+')
+
+
+def to_search_text(content):
+    """Plain text of a CKEditor body: no tags, entities decoded, whitespace collapsed"""
+    return _whitespace.sub(' ', html.unescape(strip_tags(content or ''))).strip()
+
+
+def is_postgres():
+    return connection.vendor == 'postgresql'
+
+
+def search_vector():
+    return (
+        SearchVector('title', weight='A', config='english')
+        + SearchVector('excerpt', weight='B', config='english')
+        + SearchVector('search_text', weight='C', config='english')
+    )
+
+
+def index_posts(post_ids=None):
+    """Bring the search index up to date for the given posts (all when None)
+
+    PostgreSQL gets search_vector recomputed in one UPDATE; SQLite gets
+    the matching rows of the blog_post_fts FTS5 table replaced.
+    """
+    posts = Post.all_objects.all()
+    if post_ids is not None:
+        posts = posts.filter(id__in=post_ids)
+
+    if is_postgres():
+        return posts.update(search_vector=search_vector())
+
+    rows = list(posts.values_list('id', 'title', 'excerpt', 'search_text'))
+    with connection.cursor() as cursor:
+        if post_ids is None:
+            cursor.execute('DELETE FROM blog_post_fts')
+        else:
+            cursor.executemany('DELETE FROM blog_post_fts WHERE rowid = %s', [(row[0],) for row in rows])
+        cursor.executemany(
+            'INSERT INTO blog_post_fts (rowid, title, excerpt, body) VALUES (%s, %s, %s, %s)',
+            [(post_id, title, excerpt or '', body) for post_id, title, excerpt, body in rows],
+        )
+    return len(rows)
+
+
+def unindex_post(post_id):
+    if not is_postgres():
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM blog_post_fts WHERE rowid = %s', [post_id])
+
+
+def _fts5_query(keyword):
+    # Every word is quoted so FTS5 operators in user input are taken literally
+    return ' '.join('"{}"'.format(word.replace('"', '""')) for word in keyword.split())
+
+
+def search_posts(keyword, queryset=None):
+    """Published posts matching `keyword`, best match first
+
+    On PostgreSQL this is a ranked tsvector match served by the GIN index
+    on search_vector. On SQLite the FTS5 table is joined in,
+    matched and ranked with bm25(), so pagination still slices in SQL.
+    """
+    queryset = Post.objects.published() if queryset is None else queryset
+    if not keyword or not keyword.split():
+        return queryset.none()
+
+    if is_postgres():
+        query = SearchQuery(keyword, search_type='websearch', config='english')
+        return (
+            queryset.filter(search_vector=query)
+            .annotate(rank=SearchRank(F('search_vector'), query))
+            .order_by('-rank', '-published_date')
+        )
+
+    # Joining the FTS5 table lets SQLite run MATCH and bm25() once over the
+    # matching rows; bm25() is lower for better matches
+    return queryset.extra(
+        tables=['blog_post_fts'],
+        where=['blog_post_fts.rowid = blog_post.id', 'blog_post_fts MATCH %s'],
+        params=[_fts5_query(keyword)],
+        select={'rank': 'bm25(blog_post_fts, %s, %s, %s)'},
+        select_params=FTS5_WEIGHTS,
+        order_by=['rank', '-published_date'],
+    )
+
+
+def add_highlights(posts, keyword, max_words=35):
+    """Set `post.headline` to a snippet of the body with matches wrapped in <mark>
+
+    Meant for one page of results, so headlines are only built for the
+    posts being shown. Text is escaped before the marks are added.
+    """
+    posts = list(posts)
+    if not posts:
+        return posts
+    ids = [post.id for post in posts]
+
+    if is_postgres():
+        query = SearchQuery(keyword, search_type='websearch', config='english')
+        headlines = dict(
+            Post.all_objects.filter(id__in=ids).annotate(
+                headline=SearchHeadline(
+                    'search_text', query, config='english',
+                    start_sel=HIGHLIGHT_START, stop_sel=HIGHLIGHT_STOP,
+                    max_words=max_words, min_words=max_words // 2,
+                )
+            ).values_list('id', 'headline')
+        )
+    else:
+        placeholders = ', '.join(['%s'] * len(ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, snippet(blog_post_fts, 2, %s, %s, '…', %s) FROM blog_post_fts "
+                f"WHERE blog_post_fts MATCH %s AND rowid IN ({placeholders})",
+                [HIGHLIGHT_START, HIGHLIGHT_STOP, min(max_words, 64), _fts5_query(keyword), *ids],
+            )
+            headlines = dict(cursor.fetchall())
+
+    for post in posts:
+        post.headline = _escape_headline(headlines.get(post.id, ''))
+    return posts
+
+
+def _escape_headline(headline):
+    # search_text is plain text that may contain <, & etc.; escape it but keep our marks
+    escaped = html.escape(headline, quote=False)
+    return escaped.replace(html.escape(HIGHLIGHT_START), HIGHLIGHT_START).replace(
+        html.escape(HIGHLIGHT_STOP), HIGHLIGHT_STOP
+    )
@@ -1,6 +1,9 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
-from .models import UserProfile, User
+from .cache import post_tags, touch
+from .models import Category, Comment, Post, UserProfile, User
+from .search import index_posts, to_search_text, unindex_post
 
 @receiver(post_save, sender=User)
 def create_or_update_user_profile(sender, instance, created, **kwargs):
@@ -8,3 +11,60 @@ def create_or_update_user_profile(sender, instance, created, **kwargs):
         UserProfile.objects.create(user=instance)
     else:
         instance.profile.save()
+
+@receiver(pre_save, sender=Post)
+def update_post_search_text(sender, instance, **kwargs):
+    instance.search_text = to_search_text(instance.content)
+
+@receiver(post_save, sender=Post)
+def update_post_search_index(sender, instance, **kwargs):
+    # Index after commit so a rolled back save never reaches the index
+    transaction.on_commit(lambda: index_posts([instance.pk]))
+
+@receiver(post_delete, sender=Post)
+def remove_post_from_search_index(sender, instance, **kwargs):
+    unindex_post(instance.pk)
+
+# Page cache invalidation, see blog/cache.py
+
+def _touch_post(post):
+    category_ids = post.category.values_list('id', flat=True) if post.pk else []
+    touch(*post_tags(post.pk, post.author_id, category_ids))
+
+@receiver(post_save, sender=Post)
+def invalidate_post_pages(sender, instance, **kwargs):
+    _touch_post(instance)
+
+@receiver(pre_delete, sender=Post)
+def invalidate_deleted_post_pages(sender, instance, **kwargs):
+    # Before the delete, while its categories are still linked
+    _touch_post(instance)
+
+@receiver(m2m_changed, sender=Post.category.through)
+def invalidate_post_category_pages(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        # Clears don't pass pk_set, so collect what is about to be unlinked
+        related = instance.posts if reverse else instance.category
+        pk_set = set(related.values_list('id', flat=True))
+    elif action not in ('post_add', 'post_remove'):
+        return
+
+    if reverse:
+        post_ids, category_ids = pk_set, [instance.pk]
+    else:
+        post_ids, category_ids = [instance.pk], pk_set
+    touch('posts', *(f'post:{pk}' for pk in post_ids), *(f'category:{pk}' for pk in category_ids))
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_pages(sender, instance, **kwargs):
+    touch(f'post:{instance.post_id}')
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_pages(sender, instance, **kwargs):
+    touch('categories', f'category:{instance.pk}')
+
+@receiver(post_save, sender=UserProfile)
+def invalidate_author_pages(sender, instance, **kwargs):
+    touch(f'author:{instance.user_id}')
@@ -1,3 +1,378 @@
-from django.test import TestCase
+import shutil
+import sys
+import tempfile
+from importlib import import_module
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import OperationalError
+from django.db.models import QuerySet
+from django.test import Client, TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+
+from .cache import get_or_build, touch
+from .counters import PostViewCounter, _totals_keys, post_view_counter, get_view_totals, upsert_post_view
+from .loaders import get_single_post, load_comment_threads, load_post_page
+from .models import Category, Comment, Post, PostView
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+class PostPageQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', first_name='Ada', last_name='Lovelace')
+        health = Category.objects.create(category_name='House Job Content', slug='house-job')
+        featured = Category.objects.create(category_name='Featured', slug='featured')
+
+        cls.post = Post.objects.create(
+            title='Sleep', slug='sleep', content='<p>Sleep well</p>', status='published', author=cls.author,
+        )
+        cls.post.category.add(health)
+        other = Post.objects.create(
+            title='Diet', slug='diet', content='<p>Eat well</p>', status='published', author=cls.author,
+        )
+        other.category.add(featured)
+
+    def add_threads(self, count, replies=2):
+        for number in range(count):
+            comment = Comment.objects.create(
+                post=self.post, name=f'Reader {number}', email='reader@example.com', body='Nice', approved=True,
+            )
+            for _ in range(replies):
+                Comment.objects.create(
+                    post=self.post, parent=comment, name='Reply', email='reply@example.com', body='Thanks', approved=True,
+                )
+
+    def render_data(self, context):
+        """Touch everything single_blog.html reads from the context"""
+        post = context['single_post']
+        values = [post.author.profile.bio, [c.category_name for c in post.category.all()]]
+        for featured in context['featured_post']:
+            values += [str(featured.author), [c.slug for c in featured.category.all()]]
+        values += [p.title for p in context['posts']]
+        for comment in context['comments']:
+            values += [comment.body, [reply.body for reply in comment.thread_replies]]
+        return values
+
+    def test_post_page_query_budget(self):
+        self.add_threads(3)
+        # Post with author and profile, categories
+        with self.assertNumQueries(2):
+            post = get_single_post('sleep')
+        # Thread count and page, the threads, featured post and its categories, recent posts
+        with self.assertNumQueries(6):
+            context = load_post_page(post)
+            self.render_data(context)
+
+        self.assertTrue(context['show_newsletter'])
+        self.assertEqual(context['total_comments'], 3)
+        self.assertEqual([len(c.thread_replies) for c in context['comments']], [2, 2, 2])
+
+    def test_query_count_does_not_grow_with_comments(self):
+        self.add_threads(15, replies=4)
+        post = get_single_post('sleep')
+        with self.assertNumQueries(6):
+            context = load_post_page(post, comments_page=2)
+            self.render_data(context)
+
+        self.assertEqual(context['total_comments'], 15)
+        self.assertEqual(len(context['comments']), 5)
+        self.assertEqual(len(load_post_page(post)['comments']), 10)
+
+    def test_unapproved_comments_are_left_out(self):
+        hidden = Comment.objects.create(post=self.post, name='Spam', email='spam@example.com', body='Buy', approved=False)
+        Comment.objects.create(post=self.post, parent=hidden, name='Reply', email='r@example.com', body='Hi', approved=True)
+        shown = Comment.objects.create(post=self.post, name='Reader', email='r@example.com', body='Hi', approved=True)
+        Comment.objects.create(post=self.post, parent=shown, name='Reply', email='r@example.com', body='No', approved=False)
+
+        context = load_post_page(get_single_post('sleep'))
+
+        self.assertEqual(context['comments'], [shown])
+        self.assertEqual(context['comments'][0].thread_replies, [])
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class PostPageViewQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        image = BytesIO()
+        Image.new('RGB', (40, 30), 'red').save(image, 'PNG')
+        cls.image = image.getvalue()
+
+        author = User.objects.create_user('author')
+        author.profile.profile_image = SimpleUploadedFile('author.png', cls.image)
+        author.profile.save()
+        featured = Category.objects.create(category_name='Featured', slug='featured')
+        for number in range(4):
+            post = cls.add_post(number, author)
+            post.category.add(featured)
+            Comment.objects.create(post=post, name='Reader', email='reader@example.com', body='Nice', approved=True)
+
+    @classmethod
+    def add_post(cls, number, author):
+        return Post.objects.create(
+            title=f'Post {number}', slug=f'post-{number}', content='<p>Text</p>', status='published',
+            author=author, featured_image=SimpleUploadedFile(f'post-{number}.png', cls.image),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        # Views are only counted in memory; no background flushes
+        patcher = mock.patch.object(PostViewCounter, '_ensure_worker')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(post_view_counter._counts.clear)
+        # A returning visitor, whose session already exists
+        self.client.get('/blog/post-0/')
+        cache.clear()
+
+    def test_post_page_query_budget(self):
+        # Session, category lookup, post, its categories, thread count, page
+        # and threads, featured posts and their categories, recent posts,
+        # WebP and AVIF srcsets, then the context processors: cookie
+        # consent, sidebar categories, pending comment count
+        with self.assertNumQueries(15):
+            response = self.client.get('/blog/post-0/')
+        self.assertContains(response, 'Post 0')
+
+        # Served from the page cache: session and cookie consent
+        with self.assertNumQueries(2):
+            self.client.get('/blog/post-0/')
+
+    def test_query_count_does_not_grow_with_posts_or_comments(self):
+        post = Post.objects.get(slug='post-0')
+        for number in range(4, 10):
+            self.add_post(number, post.author)
+        for _ in range(5):
+            parent = Comment.objects.create(post=post, name='Reader', email='r@example.com', body='Hi', approved=True)
+            Comment.objects.create(post=post, parent=parent, name='Reply', email='r@example.com', body='Hi', approved=True)
+
+        with self.assertNumQueries(15):
+            self.client.get('/blog/post-0/')
+
+
+class CommentPathTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.post = Post.objects.create(title='Sleep', slug='sleep', content='<p>Sleep well</p>', status='published')
+
+    def comment(self, parent=None, **fields):
+        return Comment.objects.create(
+            post=self.post, parent=parent, name='Reader', email='reader@example.com', body='Hi', approved=True,
+            **fields,
+        )
+
+    def test_path_is_kept_on_save(self):
+        root = self.comment()
+        reply = self.comment(parent=root)
+        nested = self.comment(parent=reply)
+
+        self.assertEqual(root.path, f'{root.pk:010d}/')
+        self.assertEqual(nested.path, f'{root.pk:010d}/{reply.pk:010d}/{nested.pk:010d}/')
+        self.assertEqual(Comment.objects.get(pk=nested.pk).path, nested.path)
+
+    def test_moving_a_reply_moves_its_subtree(self):
+        first, second = self.comment(), self.comment()
+        reply = self.comment(parent=first)
+        nested = self.comment(parent=reply)
+
+        reply.parent = second
+        reply.save()
+
+        nested.refresh_from_db()
+        self.assertEqual(nested.path, f'{second.pk:010d}/{reply.pk:010d}/{nested.pk:010d}/')
+
+    def test_deep_threads_load_in_one_query(self):
+        root = self.comment()
+        parent = root
+        # Deeper than a 255 character path would allow
+        for _ in range(30):
+            parent = self.comment(parent=parent)
+        self.assertEqual(len(Comment.objects.get(pk=parent.pk).path), 31 * Comment.PATH_STEP)
+
+        with self.assertNumQueries(3):
+            threads, _ = load_comment_threads(self.post)
+            depth, node = 0, threads[0]
+            while node.thread_replies:
+                depth, node = depth + 1, node.thread_replies[0]
+        self.assertEqual(depth, 30)
+
+    def test_migration_fills_threads_deeper_than_the_recursion_limit(self):
+        depth = sys.getrecursionlimit() + 100
+        ids = range(1, depth + 1)
+        Comment.objects.bulk_create([
+            Comment(id=id, parent_id=id - 1 or None, post=self.post, name='Reader', email='r@example.com', body='Hi')
+            for id in ids
+        ])
+
+        import_module('blog.migrations.0028_comment_path').fill_comment_paths(apps, None)
+
+        self.assertEqual(Comment.objects.get(pk=depth).path, ''.join(f'{id:010d}/' for id in ids))
+
+    def test_backfill_command(self):
+        root = self.comment()
+        reply = self.comment(parent=root)
+        Comment.objects.update(path='')
+
+        call_command('backfill_comment_paths', stdout=StringIO())
+
+        reply.refresh_from_db()
+        self.assertEqual(reply.path, f'{root.pk:010d}/{reply.pk:010d}/')
+
+
+class PostViewCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user('author')
+        cls.post = Post.objects.create(title='Sleep', slug='sleep', content='x', status='published', author=author)
+
+    def setUp(self):
+        cache.clear()
+        self.today = timezone.localdate()
+        # Flushed by hand; no background thread
+        patcher = mock.patch.object(PostViewCounter, '_ensure_worker')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.counter = PostViewCounter()
+
+    def test_flush_writes_views_in_one_row_per_day(self):
+        for _ in range(3):
+            self.counter.add(self.post.id)
+
+        self.assertEqual(self.counter.flush(), 3)
+
+        self.assertEqual(PostView.objects.get(post=self.post, date=self.today).count, 3)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.page_views, 3)
+        self.assertEqual(len(self.counter), 0)
+
+    def test_failed_flush_keeps_the_views(self):
+        self.counter.add(self.post.id)
+        self.counter.add(self.post.id)
+
+        with mock.patch('blog.counters.upsert_post_view', side_effect=OperationalError):
+            with self.assertRaises(OperationalError):
+                self.counter.flush()
+        self.assertEqual(len(self.counter), 2)
+
+        self.counter.flush()
+        self.assertEqual(PostView.objects.get(post=self.post, date=self.today).count, 2)
+
+    def test_upsert_adds_to_a_row_created_concurrently(self):
+        update = QuerySet.update
+        calls = []
+
+        def update_then_lose_the_race(queryset, **kwargs):
+            result = update(queryset, **kwargs)
+            if not calls:
+                # Another process creates the row right after our update missed it
+                PostView.objects.bulk_create([PostView(post=self.post, date=self.today, count=5)])
+            calls.append(result)
+            return result
+
+        with mock.patch.object(QuerySet, 'update', update_then_lose_the_race):
+            self.assertTrue(upsert_post_view(self.post.id, self.today, 2))
+
+        self.assertEqual(calls, [0, 1])
+        self.assertEqual(PostView.objects.get(post=self.post, date=self.today).count, 7)
+
+    def test_flushes_increment_cached_totals(self):
+        self.counter.add(self.post.id)
+        self.counter.flush()
+        self.assertEqual(get_view_totals(self.post.id), {'today': 1, 'week': 1, 'year': 1})
+
+        self.counter.add(self.post.id)
+        self.counter.add(self.post.id)
+        self.counter.flush()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_view_totals(self.post.id), {'today': 3, 'week': 3, 'year': 3})
+
+    def test_flush_does_not_fill_missing_totals(self):
+        self.counter.add(self.post.id)
+        self.counter.flush()
+
+        self.assertEqual(cache.get_many(_totals_keys(self.post.id, self.today).values()), {})
+        self.assertEqual(get_view_totals(self.post.id)['today'], 1)
+
+
+class PublicPageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_cookie_banner_follows_each_visitors_consent(self):
+        self.assertContains(self.client.get('/blog/'), 'id="cookie-banner"')
+
+        self.client.post('/set-cookie-consent', '{"analytics": true}', content_type='application/json')
+        self.assertNotContains(self.client.get('/blog/'), 'id="cookie-banner"')
+
+        newcomer = Client()
+        self.assertContains(newcomer.get('/blog/'), 'id="cookie-banner"')
+
+
+class TaggedCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.now = 1000.0
+        patcher = mock.patch('blog.cache.time', mock.Mock(time=lambda: self.now))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, value, *tags):
+        return get_or_build('page', lambda: (value, tags), ttl=60, stale_ttl=600)
+
+    def test_touching_a_tag_rebuilds_what_used_it(self):
+        self.assertEqual(self.get('v1', 'posts', 'post:1'), 'v1')
+        self.assertEqual(self.get('v2', 'posts', 'post:1'), 'v1')
+
+        self.now += 1
+        with self.captureOnCommitCallbacks(execute=True):
+            touch('post:1')
+        self.assertEqual(self.get('v2', 'posts', 'post:1'), 'v2')
+
+    def test_other_tags_leave_the_entry_fresh(self):
+        self.get('v1', 'post:1')
+        self.now += 1
+        with self.captureOnCommitCallbacks(execute=True):
+            touch('post:2')
+
+        self.assertEqual(self.get('v2', 'post:1'), 'v1')
+
+    def test_evicted_tag_counts_as_changed(self):
+        self.get('v1', 'post:1')
+        cache.delete('blog:cache-tag:post:1')
+
+        self.assertEqual(self.get('v2', 'post:1'), 'v2')
+
+    def test_nested_build_leaves_the_outer_entry_fresh(self):
+        def build_page():
+            self.now += 1
+            sidebar = get_or_build('sidebar', lambda: ('categories', ('categories',)))
+            return f'page with {sidebar}', ('posts', 'categories')
+
+        get_or_build('page', build_page)
+
+        self.assertEqual(self.get('v2', 'posts', 'categories'), 'page with categories')
+
+    def test_stale_entry_is_served_while_another_request_rebuilds(self):
+        self.get('v1', 'posts')
+        self.now += 61
+        # Another request holds the rebuild lock
+        cache.add('page:lock', 1)
+
+        self.assertEqual(self.get('v2', 'posts'), 'v1')
+
+        cache.delete('page:lock')
+        self.assertEqual(self.get('v2', 'posts'), 'v2')
+        self.assertIsNone(cache.get('page:lock'))
@@ -5,12 +5,23 @@ from django.core.mail import send_mail
 from django.shortcuts import get_object_or_404, redirect, render
 import re
 from django.core.paginator import Paginator
+from blog.cache import add_cache_tags, cache_public_page, set_cache_meta
+from blog.counters import post_view_counter
 from blog.forms import CommentForm
+from blog.loaders import get_single_post, load_post_page
 from blog.models import Category, Comment, Post
-from django.db.models import Q
+from blog.search import add_highlights, search_posts
 from media_manager.models import User
+from media_manager.renditions import prefetch_srcsets
 
 
+def _count_post_view(request, post_id=None):
+    # Cached post pages skip the view, so their views are counted here
+    if post_id:
+        post_view_counter.add(post_id)
+
+
+@cache_public_page('page')
 def blog_main(request):
     featured_post = Post.objects.filter(category__category_name="Featured").order_by("-published_date")[:3]
     
@@ -19,22 +30,27 @@ def blog_main(request):
 
     page_number = request.GET.get("page")
     page_obj = paginator.get_page(page_number)
+    prefetch_srcsets(post.featured_image for post in [*featured_post, *page_obj])
 
     context = {
         'featured_post': featured_post,
         'page_obj': page_obj,
     }
+    add_cache_tags(request, 'posts', 'categories')
     return render(request, 'blog/blog.html', context)
 
 
+@cache_public_page('page', 'comments_page', on_hit=_count_post_view)
 def posts_by_category_or_post(request, slug):
     
     category = Category.objects.filter(slug=slug).first()
     if category:
+        add_cache_tags(request, 'categories', f'category:{category.id}')
         posts = Post.objects.filter(status='published', category=category)
         paginator = Paginator(posts, 6)  
         page_number = request.GET.get("page")
         page_obj = paginator.get_page(page_number)
+        prefetch_srcsets(post.featured_image for post in page_obj)
 
         context = {
             'page_obj': page_obj,
@@ -42,19 +58,13 @@ def posts_by_category_or_post(request, slug):
         }
         return render(request, 'blog/posts_by_category.html', context)
 
-    single_post = Post.objects.filter(slug=slug, status='published').first()
-
-    show_newsletter = False
-    if single_post:
-        show_newsletter = single_post.category.filter(category_name__icontains='House Job Content').exists()
-
-
-    featured_post = Post.objects.filter(category__category_name="Featured").order_by("-published_date")[:1]
-    posts = Post.objects.filter(is_featured=False, status='published')
-    
+    single_post = get_single_post(slug)
     
     if single_post:
         comment_form = CommentForm()
+        if request.method == 'GET':
+            # Counted in memory and written in batches by blog.counters
+            post_view_counter.add(single_post.pk)
     
         if request.method == 'POST':
             comment_form = CommentForm(request.POST)
@@ -86,14 +96,6 @@ def posts_by_category_or_post(request, slug):
     else:
         comment_form = CommentForm()
     
-    show_all = request.GET.get('show_all_comments')
-    if show_all:
-        comments = single_post.comments.filter(approved=True, parent=None).prefetch_related('replies')
-    else:
-        comments = single_post.comments.filter(approved=True, parent=None).prefetch_related('replies')[:10]
-
-    total_comments = single_post.comments.filter(approved=True, parent=None).count()
-
     storage = get_messages(request)
     view_messages = []
     for message in storage:
@@ -104,34 +106,28 @@ def posts_by_category_or_post(request, slug):
     if request.method == 'POST' and comment_form.is_valid():
         view_messages = [msg for msg in get_messages(request) if 'comment' in str(msg).lower()]
     
-    context = {
-        'single_post': single_post,
-        'author': single_post.author,
-        'featured_post': featured_post,
-        'posts': posts,
+    add_cache_tags(request, 'posts', 'categories', f'post:{single_post.id}', f'author:{single_post.author_id}')
+    set_cache_meta(request, post_id=single_post.id)
+    # Post, author, categories, sidebar and threaded comments, see blog/loaders.py
+    context = load_post_page(single_post, comments_page=request.GET.get('comments_page'))
+    context.update({
         'comment_form': comment_form,
-        'comments': comments,
-        'total_comments': total_comments,
-        'show_all': show_all,
         'view_messages': view_messages,
-        'show_newsletter': show_newsletter,
-    }
+    })
     return render(request, 'blog/single_blog.html', context)
 
 def search(request):
     keyword = request.GET.get('keyword')
     
-    if keyword:
-        posts = Post.objects.filter(
-            Q(title__icontains=keyword) | Q(excerpt__icontains=keyword) | Q(content__icontains=keyword), 
-            status='published'
-        )
-    else:
-        posts = Post.objects.none()
+    # Ranked full-text search (title > excerpt > body), see blog/search.py
+    posts = search_posts(keyword).prefetch_related('category')
     
     paginator = Paginator(posts, 6)
     page_number = request.GET.get("page")
     page_obj = paginator.get_page(page_number)
+    # Highlighted snippets only for the posts on this page
+    page_obj.object_list = add_highlights(page_obj.object_list, keyword)
+    prefetch_srcsets(post.featured_image for post in page_obj)
     
     context = {
         'page_obj': page_obj,
@@ -139,6 +135,7 @@ def search(request):
     }
     return render(request, 'blog/search.html', context)
 
+@cache_public_page('page')
 def author_page(request, username):
     author = get_object_or_404(User, username=username)
     posts = Post.objects.published().filter(author=author)
@@ -146,10 +143,12 @@ def author_page(request, username):
     paginator = Paginator(posts, 10)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
+    prefetch_srcsets(post.featured_image for post in page_obj)
 
     context = {
         'author': author,
         'page_obj': page_obj,
     }
+    add_cache_tags(request, 'categories', f'author:{author.id}')
     return render(request, 'blog/author_page.html', context)
 
@@ -41,11 +41,13 @@ urlpatterns = [
 
     # Media management URLs
     path('media/', views.media_library, name='media_library'),
+    path('media/api/', views.media_list_api, name='media_list_api'),
     path('media/add-media/', views.add_media, name='add_media'),
     path('media/<int:media_id>/', views.media_detail, name='media_detail'),
     path('media/<int:media_id>/update/', views.update_media, name='update_media'),
     path('media/<int:media_id>/delete/', views.delete_media, name='delete_media'),
     path('media/bulk-delete/', views.bulk_delete_media, name='bulk_delete_media'),
+    path('media/bulk-delete/<str:job_id>/', views.bulk_delete_media_progress, name='bulk_delete_media_progress'),
     # Media management URLs
 
     # Mentors Application
@@ -14,12 +14,16 @@ from django.core.paginator import Paginator
 from django.db.models import Q, Count
 from django.utils import timezone
 from django.contrib import messages
+from blog.cache import comments_cache_tags, posts_cache_tags, touch
 from blog.models import Post, Category, Comment, Page
 from django.utils.text import slugify
 from .forms import PostForm, PageForm
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from media_manager.models import MediaFile
+from media_manager.dedup import get_or_create_media_file, release_file
+from media_manager.deletion import delete_media_files, get_delete_progress
+from media_manager.listing import filter_media, get_category_counts, paginate, serialize_media
 from django.http import JsonResponse, QueryDict
 from django.urls import reverse
 from main.models import MentorApplication, MentorshipApplication, Testimonial
@@ -193,6 +197,8 @@ def bulk_action(request):
             return redirect(f'posts?status={status_filter}&category={category_filter}&date={date_filter}&search={search_query}&page={page}')
         
         posts_to_update = Post.objects.filter(id__in=post_ids)
+        # update() skips the signals that invalidate cached blog pages
+        cache_tags = posts_cache_tags(posts_to_update)
         
         if action == 'trash':
             posts_to_update.update(
@@ -225,6 +231,8 @@ def bulk_action(request):
             posts_to_update.update(status='draft')
             messages.success(request, f'{len(post_ids)} posts moved to draft.')
         
+        touch(*cache_tags)
+        
         # Build redirect URL with preserved parameters
         redirect_url = reverse('posts') + f'?status={status_filter}&category={category_filter}&date={date_filter}&search={search_query}&page={page}'
         return redirect(redirect_url)
@@ -606,12 +614,11 @@ def remove_featured_image(request):
         post = get_object_or_404(Post, pk=post_id, author=request.user)
         
         if post.featured_image:
-            # Remove file from storage
-            if os.path.exists(post.featured_image.path):
-                os.remove(post.featured_image.path)
-            
+            image_name = post.featured_image.name
             post.featured_image = None
             post.save()
+            # Only removed from storage if no other post, page or profile uses it
+            release_file(image_name, holder=post)
         
         return JsonResponse({'success': True, 'message': 'Featured image removed successfully'})
         
@@ -856,6 +863,7 @@ def bulk_comment_action(request):
         
         if comment_ids:
             comments = Comment.objects.filter(id__in=comment_ids)
+            cache_tags = comments_cache_tags(comments)
             
             if action == 'approve':
                 comments.update(approved=True)
@@ -863,6 +871,7 @@ def bulk_comment_action(request):
                 comments.update(approved=False)
             elif action == 'delete':
                 comments.delete()
+            touch(*cache_tags)
     
     return redirect('comments')
 
@@ -912,104 +921,46 @@ def comment_reply(request, comment_id):
             )
     return redirect('comments')
 
+def _media_page(request):
+    """Filtered page of media for the library grid, its AJAX loads and the post editor"""
+    media_files = filter_media(
+        MediaFile.objects.prefetch_related('renditions'),
+        media_type=request.GET.get('type', 'all'),
+        search=request.GET.get('search', ''),
+        date_filter=request.GET.get('date', 'all'),
+    )
+    return paginate(media_files, request.GET.get('cursor'))
+
+
+@login_required(login_url='login')
+def media_list_api(request):
+    """JSON listing of the media library with cursor pagination"""
+    media_files, next_cursor = _media_page(request)
+    return JsonResponse({
+        'media_files': [serialize_media(media) for media in media_files],
+        'has_next': next_cursor is not None,
+        'next_cursor': next_cursor,
+    })
+
+
 @login_required(login_url='login')
 def media_library(request):
     """Main media library view with filtering and pagination"""
     
-    # Get filter parameters
-    media_type = request.GET.get('type', 'all')
-    search_query = request.GET.get('search', '')
-    date_filter = request.GET.get('date', 'all')
-    
-    # Base queryset
-    media_files = MediaFile.objects.all()
-    
-    # Apply filters
-    if media_type != 'all':
-        media_files = media_files.filter(category=media_type)
-    
-    if search_query:
-        media_files = media_files.filter(
-            Q(file__icontains=search_query) |
-            Q(alt_text__icontains=search_query) |
-            Q(description__icontains=search_query)
-        )
-    
-    # Date filtering (simplified)
-    if date_filter != 'all':
-        # You can expand this based on your needs
-        pass
-    
-    # Pagination (12 items per page for grid layout)
-    paginator = Paginator(media_files, 20)
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
-    
-    # AJAX request for load more
+    # AJAX requests (load more, post editor modal) get the JSON listing
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-        # Check if this is NOT a request from the post editor
-        if 'post-editor' in request.GET:
-            # Return JSON for post editor modal
-            media_data = []
-            for media in page_obj:
-                media_data.append({
-                    'id': media.id,
-                    'url': media.file.url,
-                    'name': os.path.basename(media.file.name),
-                    'type': media.file_type,
-                    'size': media.file_size,
-                    'alt_text': media.alt_text,
-                    'description': media.description,
-                    'created_at': media.created_at.strftime('%B %d, %Y'),
-                    'file_extension': media.file_extension,
-                    'thumbnail_url': media.get_thumbnail_url(),
-                })
-            
-            return JsonResponse({
-                'media_files': media_data,
-                'has_next': page_obj.has_next(),
-                'next_page_number': page_obj.next_page_number() if page_obj.has_next() else None,
-            })
-        elif request.GET.get('page'):  # This handles the load more button
-            media_data = []
-            for media in page_obj:
-                media_data.append({
-                    'id': media.id,
-                    'url': media.file.url,
-                    'name': os.path.basename(media.file.name),
-                    'type': media.file_type,
-                    'size': media.file_size,
-                    'alt_text': media.alt_text,
-                    'description': media.description,
-                    'created_at': media.created_at.strftime('%B %d, %Y'),
-                    'file_extension': media.file_extension,
-                    'thumbnail_url': media.get_thumbnail_url(),
-                })
-            
-            return JsonResponse({
-                'media_files': media_data,
-                'has_next': page_obj.has_next(),
-                'next_page_number': page_obj.next_page_number() if page_obj.has_next() else None,
-            })
+        return media_list_api(request)
     
-    # Get media type counts for filter buttons
-    media_counts = {
-        'all': MediaFile.objects.count(),
-        'image': MediaFile.objects.filter(category='image').count(),
-        'document': MediaFile.objects.filter(category='document').count(),
-        'video': MediaFile.objects.filter(category='video').count(),
-        'audio': MediaFile.objects.filter(category='audio').count(),
-        'other': MediaFile.objects.filter(category='other').count(),
-    }
+    media_files, next_cursor = _media_page(request)
     
     context = {
-        'media_files': page_obj,
-        'media_type': media_type,
-        'search_query': search_query,
-        'date_filter': date_filter,
-        'media_counts': media_counts,
-        'has_next': page_obj.has_next(),
-        'next_page_number': page_obj.next_page_number() if page_obj.has_next() else None,
+        'media_files': media_files,
+        'media_type': request.GET.get('type', 'all'),
+        'search_query': request.GET.get('search', ''),
+        'date_filter': request.GET.get('date', 'all'),
+        'media_counts': get_category_counts(),
+        'has_next': next_cursor is not None,
+        'next_cursor': next_cursor,
     }
     
     return render(request, 'dashboard/media_library.html', context)
@@ -1022,13 +973,11 @@ def add_media(request):
         uploaded_files = []
         
         for file in files:
-            # Create MediaFile instance
-            media_file = MediaFile(file=file)
-            
-            # Set alt_text to filename without extension
-            media_file.alt_text = os.path.splitext(file.name)[0]
-            
-            media_file.save()
+            # Reuse the library copy when the same bytes were uploaded before;
+            # alt_text defaults to the filename without extension
+            media_file, _ = get_or_create_media_file(
+                file, alt_text=os.path.splitext(file.name)[0]
+            )
             uploaded_files.append(media_file)
         
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
@@ -1068,19 +1017,7 @@ def media_detail(request, media_id):
     media_file = get_object_or_404(MediaFile, id=media_id)
     
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-        data = {
-            'id': media_file.id,
-            'url': media_file.file.url,
-            'name': os.path.basename(media_file.file.name),
-            'type': media_file.file_type,
-            'size': media_file.file_size,
-            'alt_text': media_file.alt_text,
-            'description': media_file.description,
-            'created_at': media_file.created_at.strftime('%B %d, %Y'),
-            'file_extension': media_file.file_extension,
-            'thumbnail_url': media_file.get_thumbnail_url(),
-            'dimensions': getattr(media_file, 'dimensions', None),  
-        }
+        data = serialize_media(media_file)
         return JsonResponse(data)
     
     return JsonResponse({'error': 'Invalid request'}, status=400)
@@ -1125,29 +1062,33 @@ def delete_media(request, media_id):
 
 @require_http_methods(["POST"])
 def bulk_delete_media(request):
-    """Bulk delete media files"""
+    """Bulk delete media files; their files are removed in the background"""
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
         data = json.loads(request.body)
         media_ids = data.get('media_ids', [])
         
         if media_ids:
-            deleted_count = 0
-            for media_id in media_ids:
-                try:
-                    media_file = MediaFile.objects.get(id=media_id)
-                    media_file.delete()
-                    deleted_count += 1
-                except MediaFile.DoesNotExist:
-                    continue
+            deleted_count, job_id = delete_media_files(media_ids)
             
             return JsonResponse({
                 'success': True,
-                'message': f'Successfully deleted {deleted_count} file(s)'
+                'message': f'Successfully deleted {deleted_count} file(s)',
+                'job_id': job_id,
+                'progress_url': reverse('bulk_delete_media_progress', args=[job_id]) if job_id else None,
             })
     
     return JsonResponse({'error': 'Invalid request'}, status=400)
 
 
+@login_required(login_url='login')
+def bulk_delete_media_progress(request, job_id):
+    """Progress of the background file removal started by bulk_delete_media"""
+    progress = get_delete_progress(job_id)
+    if progress is None:
+        return JsonResponse({'error': 'Unknown job'}, status=404)
+    return JsonResponse(progress)
+
+
 @administrator_required
 @login_required(login_url='login')
 def mentor_applications_dashboard(request):
@@ -1950,19 +1891,11 @@ def remove_page_featured_image(request):
         page = get_object_or_404(Page, id=page_id, author=request.user)
         
         if page.featured_image:
-            # Store the path before clearing
-            image_path = page.featured_image.path if hasattr(page.featured_image, 'path') else None
-            
-            # Clear the featured image
+            image_name = page.featured_image.name
             page.featured_image = None
             page.save()
-            
-            # Remove file from storage if it exists
-            if image_path and os.path.exists(image_path):
-                try:
-                    os.remove(image_path)
-                except OSError:
-                    pass  # File might be in use or already deleted
+            # Only removed from storage if nothing else uses it
+            release_file(image_name, holder=page)
         
         return JsonResponse({'success': True, 'message': 'Featured image removed successfully'})
         
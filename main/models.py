@@ -4,7 +4,6 @@ from django.core.validators import RegexValidator
 from django.conf import settings
 from django.db.models.signals import post_delete
 from django.dispatch import receiver
-import os
 from django.contrib.sessions.models import Session
 
 class CookieConsent(models.Model):
@@ -136,12 +135,11 @@ class MentorApplication(models.Model):
 # To delete cv, certificates and profile photos
 @receiver(post_delete, sender=MentorApplication)
 def delete_files_on_application_delete(sender, instance, **kwargs):
-    if instance.professional_picture and os.path.isfile(instance.professional_picture.path):
-        os.remove(instance.professional_picture.path)
-    if instance.cv and os.path.isfile(instance.cv.path):
-        os.remove(instance.cv.path)
-    if instance.certificate and os.path.isfile(instance.certificate.path):
-        os.remove(instance.certificate.path)
+    # Uploads are deduplicated, so the same file may be used elsewhere
+    from media_manager.dedup import release_file
+
+    for field_file in (instance.professional_picture, instance.cv, instance.certificate):
+        release_file(field_file.name, holder=instance)
 
 
 class MentorshipApplication(models.Model):
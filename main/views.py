@@ -12,6 +12,7 @@ from django.views import View
 import requests
 
 from blog.models import Page, Post
+from media_manager.renditions import prefetch_srcsets
 from .forms import ContactForm, MentorApplicationForm, MentorshipApplicationForm, NewsletterForm
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
@@ -24,7 +25,9 @@ from django.views.generic import TemplateView
 
 def homepage(request):
     testimonials = Testimonial.objects.all().order_by('-created_at')
-    posts = Post.objects.filter(status='published')
+    # The template shows the first four posts
+    posts = list(Post.objects.filter(status='published')[:4])
+    prefetch_srcsets(post.featured_image for post in posts)
     context = {
         'testimonials': testimonials,
         'posts': posts,
@@ -5,6 +5,7 @@ from django.urls import path
 from django.template.response import TemplateResponse
 from django.contrib.admin.views.main import ChangeList
 from django.contrib import messages
+from .deletion import delete_media_files
 from .models import MediaFile
 
 
@@ -41,8 +42,8 @@ class MediaTypeListFilter(admin.SimpleListFilter):
 
 @admin.register(MediaFile)
 class MediaFileAdmin(admin.ModelAdmin):
-    list_display = ('file_preview', 'file_name', 'file_type_display', 'file_size_display', 'created_at')
-    list_filter = (MediaTypeListFilter, 'created_at')
+    list_display = ('file_preview', 'file_name', 'file_type_display', 'file_size_display', 'reference_count', 'created_at')
+    list_filter = (MediaTypeListFilter, 'is_missing', 'created_at')
     search_fields = ('file', 'alt_text', 'description')
     list_per_page = 20
     actions = ['bulk_delete_files', 'bulk_download_files', 'bulk_change_category']
@@ -63,6 +64,10 @@ class MediaFileAdmin(admin.ModelAdmin):
         })
     )
 
+    def get_queryset(self, request):
+        # Keep records flagged by the reconciler visible here so they can be cleaned up
+        return MediaFile.objects.all_including_missing()
+
     def get_urls(self):
         urls = super().get_urls()
         custom_urls = [
@@ -144,9 +149,10 @@ class MediaFileAdmin(admin.ModelAdmin):
 
     # Bulk Actions
     def bulk_delete_files(self, request, queryset):
-        """Bulk delete selected files"""
-        count = queryset.count()
-        for obj in queryset:
-            obj.delete()
-        messages.success(request, f'Successfully deleted {count} files.')
+        """Bulk delete selected files; the files are removed in the background"""
+        count, job_id = delete_media_files(list(queryset.values_list('id', flat=True)))
+        message = f'Successfully deleted {count} files.'
+        if job_id:
+            message += f' Removing them from storage (job {job_id}).'
+        messages.success(request, message)
     bulk_delete_files.short_description = "Delete selected files"
\ No newline at end of file
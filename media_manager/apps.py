@@ -6,4 +6,6 @@ class MediaManagerConfig(AppConfig):
     name = 'media_manager'
 
     def ready(self):
-        import media_manager.signals
\ No newline at end of file
+        import media_manager.signals
+        from .registry import connect_sources
+        connect_sources(media_manager.signals.media_post_save)
\ No newline at end of file
@@ -0,0 +1,112 @@
+# media_manager/batch.py
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.apps import apps
+from django.core.files.images import get_image_dimensions
+from django.core.files.storage import default_storage
+from django.db import connections
+
+# No models at module scope: with the spawn start method (Windows, macOS)
+# workers import this module before Django is set up
+from .compression import MediaCompressor, file_sha256
+
+logger = logging.getLogger(__name__)
+
+SKIPPED = 'skipped'
+COMPRESSED = 'compressed'
+FAILED = 'failed'
+
+
+def init_worker():
+    """Pool initializer: spawned workers start a fresh interpreter without Django set up"""
+    if not apps.ready:
+        django.setup()
+
+
+def compress_one(job):
+    """Compress a single image in a worker process
+
+    `job` is (id, file name, compressed_hash). Workers only touch storage;
+    the parent records results, so no database connection crosses the
+    fork. A file whose current hash matches compressed_hash was written
+    by the compressor already and is skipped.
+    Returns (id, status, bytes before, bytes after, new hash, (width, height)).
+    """
+    media_id, name, compressed_hash = job
+    try:
+        before = default_storage.size(name)
+        if compressed_hash and file_sha256(name) == compressed_hash:
+            return media_id, SKIPPED, before, before, compressed_hash, None
+        if not MediaCompressor.compress_image(name):
+            return media_id, FAILED, before, before, '', None
+        with default_storage.open(name, 'rb') as f:
+            dimensions = get_image_dimensions(f)
+        return media_id, COMPRESSED, before, default_storage.size(name), file_sha256(name), dimensions
+    except Exception:
+        logger.exception('Image compression failed for %s', name)
+        return media_id, FAILED, 0, 0, '', None
+
+
+def compress_images(queryset, workers, chunk_size=100, limit=None, progress=None):
+    """Compress the images in `queryset` with a pool of `workers` processes
+
+    Ids are read in keyset pages of `chunk_size` and each page is fanned
+    out to the pool. compressed_hash and the new size and dimensions are
+    saved after every page, so an interrupted run picks up where it
+    stopped. Renditions of the compressed images are then regenerated
+    here, as the Celery task does after compressing. `progress` is called
+    with the running totals after each page. Returns the totals dict.
+    """
+    from .models import MediaFile
+    from .renditions import generate_renditions
+
+    totals = {COMPRESSED: 0, SKIPPED: 0, FAILED: 0, 'bytes_before': 0, 'bytes_after': 0}
+    started = time.perf_counter()
+    last_id = 0
+    seen = 0
+
+    # Forked workers must not inherit open database connections
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+        while limit is None or seen < limit:
+            size = chunk_size if limit is None else min(chunk_size, limit - seen)
+            jobs = list(
+                queryset.filter(id__gt=last_id)
+                .order_by('id')
+                .values_list('id', 'file', 'compressed_hash')[:size]
+            )
+            if not jobs:
+                break
+
+            compressed = []
+            chunksize = max(1, len(jobs) // (workers * 4))
+            results = pool.map(compress_one, jobs, chunksize=chunksize)
+            for media_id, status, before, after, new_hash, dimensions in results:
+                totals[status] += 1
+                if status == COMPRESSED:
+                    totals['bytes_before'] += before
+                    totals['bytes_after'] += after
+                    width, height = dimensions
+                    compressed.append(MediaFile(
+                        id=media_id, compressed_hash=new_hash, size=after, width=width, height=height,
+                    ))
+
+            if compressed:
+                MediaFile.objects.bulk_update(compressed, ['compressed_hash', 'size', 'width', 'height'])
+                for media_file in MediaFile.objects.filter(id__in=[row.id for row in compressed]):
+                    try:
+                        generate_renditions(media_file)
+                    except Exception:
+                        logger.exception('Rendition generation failed for %s', media_file.file.name)
+
+            seen += len(jobs)
+            last_id = jobs[-1][0]
+            totals['elapsed'] = time.perf_counter() - started
+            if progress:
+                progress(totals)
+
+    totals['elapsed'] = time.perf_counter() - started
+    return totals
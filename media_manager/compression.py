@@ -1,9 +1,60 @@
+import logging
 import os
+import shutil
+import tempfile
+from contextlib import contextmanager
 from PIL import Image, ImageOps
-from django.core.files.base import ContentFile
-from django.core.files.storage import default_storage
-import PyPDF2
-from io import BytesIO
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, default_storage
+import hashlib
+from django.conf import settings
+from .pdf import PdfOptimizer
+
+logger = logging.getLogger(__name__)
+
+# Encoded output bigger than this spills from memory to a temp file
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+
+def file_sha256(file_path, chunk_size=64 * 1024):
+    """SHA-256 hex digest of a stored file, read in chunks"""
+    digest = hashlib.sha256()
+    with default_storage.open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@contextmanager
+def replace_stored_file(file_path, storage=None):
+    """Yield a file to write new content for `file_path` into
+
+    The original is only replaced once the block finishes without an
+    error. On FileSystemStorage the output is a temp file in the same
+    directory that is renamed over the original, so a crash leaves either
+    the old or the new file. Other storages get a spooled temp file that
+    is uploaded after the original is deleted.
+    """
+    storage = storage or default_storage
+    if isinstance(storage, FileSystemStorage):
+        path = storage.path(file_path)
+        fd, tmp_path = tempfile.mkstemp(prefix='.compress-', suffix='.tmp', dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'w+b') as output:
+                yield output
+            if storage.file_permissions_mode is not None:
+                os.chmod(tmp_path, storage.file_permissions_mode)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    else:
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as output:
+            yield output
+            output.seek(0)
+            storage.delete(file_path)
+            storage.save(file_path, File(output, name=os.path.basename(file_path)))
+
 
 class MediaCompressor:
     # Image settings
@@ -14,8 +65,13 @@ class MediaCompressor:
     def compress_image(file_path):
         """Compress image files"""
         try:
-            with default_storage.open(file_path, 'rb') as f:
-                image = Image.open(f)
+            with replace_stored_file(file_path) as output:
+                with default_storage.open(file_path, 'rb') as f:
+                    image = Image.open(f)
+                    # Let the JPEG decoder scale down while reading, so huge
+                    # photos are never fully decoded at their original size
+                    image.draft('RGB', MediaCompressor.MAX_IMAGE_SIZE)
+                    image.load()
                 
                 # Convert RGBA to RGB if needed
                 if image.mode in ('RGBA', 'LA', 'P'):
@@ -31,42 +87,48 @@ class MediaCompressor:
                 # Resize if too large
                 image.thumbnail(MediaCompressor.MAX_IMAGE_SIZE, Image.Resampling.LANCZOS)
                 
-                # Save compressed
-                output = BytesIO()
+                # Encode straight into the replacement file
                 image.save(output, format='JPEG', quality=MediaCompressor.IMAGE_QUALITY, optimize=True)
-                output.seek(0)
-                
-                # Replace original file
-                default_storage.delete(file_path)
-                default_storage.save(file_path, ContentFile(output.read()))
                 
-                return True
+            return True
         except Exception as e:
             print(f"Image compression failed for {file_path}: {e}")
             return False
     
+    @staticmethod
+    def optimize_pdf(file_path, dry_run=False):
+        """Run PdfOptimizer on a stored PDF and keep the result only if it is smaller
+
+        Returns a stats dict with the sizes before and after, whether the
+        optimized copy was kept, and the optimizer's own counters.
+        """
+        optimizer = PdfOptimizer(
+            target_dpi=getattr(settings, 'MEDIA_PDF_TARGET_DPI', 150),
+            jpeg_quality=getattr(settings, 'MEDIA_PDF_JPEG_QUALITY', 75),
+        )
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as optimized:
+            with default_storage.open(file_path, 'rb') as f:
+                stats = optimizer.optimize(f, optimized)
+                stats['bytes_before'] = f.size
+
+            stats['bytes_after'] = optimized.tell()
+            stats['kept'] = stats['bytes_after'] < stats['bytes_before']
+            if stats['kept'] and not dry_run:
+                optimized.seek(0)
+                with replace_stored_file(file_path) as output:
+                    shutil.copyfileobj(optimized, output)
+        return stats
+
     @staticmethod
     def compress_pdf(file_path):
-        """Basic PDF compression by removing metadata"""
+        """Optimize a PDF in place, leaving it untouched if that wouldn't shrink it"""
         try:
-            with default_storage.open(file_path, 'rb') as f:
-                reader = PyPDF2.PdfReader(f)
-                writer = PyPDF2.PdfWriter()
-                
-                for page in reader.pages:
-                    writer.add_page(page)
-                
-                # Remove metadata
-                writer.add_metadata({})
-                
-                output = BytesIO()
-                writer.write(output)
-                output.seek(0)
-                
-                # Replace original
-                default_storage.delete(file_path)
-                default_storage.save(file_path, ContentFile(output.read()))
-                
-                return True
+            stats = MediaCompressor.optimize_pdf(file_path)
+            if stats['kept']:
+                logger.info(
+                    'Optimized %s: %d -> %d bytes', file_path, stats['bytes_before'], stats['bytes_after']
+                )
+            return True
         except Exception as e:
-            print(f"PDF compression failed for {file_path}: {e}")
\ No newline at end of file
+            print(f"PDF compression failed for {file_path}: {e}")
+            return False
@@ -0,0 +1,239 @@
+# media_manager/dedup.py
+import hashlib
+
+from django.apps import apps
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .compression import file_sha256
+from .models import MediaFile, MediaRendition
+from .registry import get_sources
+
+
+def hash_upload(uploaded_file):
+    """SHA-256 of an uploaded file, read chunk by chunk and rewound afterwards"""
+    digest = hashlib.sha256()
+    for chunk in uploaded_file.chunks():
+        digest.update(chunk)
+    uploaded_file.seek(0)
+    return digest.hexdigest()
+
+
+def add_reference(media_file):
+    MediaFile.objects.all_including_missing().filter(id=media_file.id).update(
+        reference_count=F('reference_count') + 1
+    )
+    media_file.reference_count += 1
+
+
+def find_by_content_hash(content_hash):
+    """The MediaFile holding these bytes, including rows flagged missing
+
+    The unique index on content_hash covers every row, so a lookup that
+    skipped missing ones would go on to insert a duplicate hash.
+    """
+    return MediaFile.objects.all_including_missing().filter(content_hash=content_hash).first()
+
+
+def restore_missing_file(media_file, content):
+    """Write `content` back as the stored file of a row flagged missing
+
+    The same bytes were uploaded again, so the row and every file field
+    still pointing at its name are served again.
+    """
+    name = media_file.file.name
+    if not default_storage.exists(name):
+        saved = default_storage.save(name, content)
+        if saved != name:
+            # Another upload took the name meanwhile; follow the new one
+            repoint_file_references(name, saved)
+            name = saved
+    MediaFile.objects.all_including_missing().filter(id=media_file.id).update(
+        file=name, is_missing=False, last_verified_at=timezone.now()
+    )
+    media_file.file.name, media_file.is_missing = name, False
+
+
+def share_existing(media_file, content):
+    """Add a reference to `media_file`, first restoring its file if it went missing"""
+    if media_file.is_missing:
+        restore_missing_file(media_file, content)
+    add_reference(media_file)
+
+
+def get_or_create_media_file(uploaded_file, **fields):
+    """Store an upload unless identical bytes are already in the library
+
+    Returns (media_file, created). When the content hash matches an
+    existing MediaFile its reference count goes up and nothing is
+    written to storage, unless the reconciler flagged that file missing:
+    then the upload is written back in its place. Two concurrent uploads
+    of the same bytes are settled by the unique index on content_hash.
+    """
+    content_hash = hash_upload(uploaded_file)
+    existing = find_by_content_hash(content_hash)
+    if existing is not None:
+        share_existing(existing, uploaded_file)
+        return existing, False
+
+    media_file = MediaFile(file=uploaded_file, content_hash=content_hash, **fields)
+    try:
+        with transaction.atomic():
+            media_file.save()
+    except IntegrityError:
+        # Lost the race: drop our copy of the blob and share the winner's
+        if media_file.file.name:
+            default_storage.delete(media_file.file.name)
+        existing = find_by_content_hash(content_hash)
+        share_existing(existing, uploaded_file)
+        return existing, False
+    return media_file, True
+
+
+def file_fields():
+    """(model, field name) for every file field outside the media library itself"""
+    for model in apps.get_models():
+        if model in (MediaFile, MediaRendition):
+            continue
+        for field in model._meta.concrete_fields:
+            if isinstance(field, models.FileField):
+                yield model, field.name
+
+
+def is_file_referenced(name, exclude=None):
+    """True if a file field outside the media library stores `name`
+
+    The row `exclude` (the one letting go of the file) doesn't count.
+    """
+    for model, field_name in file_fields():
+        rows = model._base_manager.filter(**{field_name: name})
+        if isinstance(exclude, model) and exclude.pk is not None:
+            rows = rows.exclude(pk=exclude.pk)
+        if rows.exists():
+            return True
+    return False
+
+
+def referenced_file_names(names):
+    """The subset of `names` stored by a file field outside the media library"""
+    names, found = set(names), set()
+    for model, field_name in file_fields():
+        remaining = names - found
+        if not remaining:
+            break
+        found.update(
+            model._base_manager.filter(**{f'{field_name}__in': remaining}).values_list(field_name, flat=True)
+        )
+    return found
+
+
+def release_file(name, holder=None):
+    """Let go of a stored file instead of deleting it outright
+
+    Deduplicated uploads share one blob, so a row that stops using a file
+    (it was deleted, or its field was cleared) must not remove it for the
+    others. `holder` is that row: if it is a registered source its
+    reference is dropped from the MediaFile's count. The file, with its
+    MediaFile and renditions, is only deleted once the count is 0 and no
+    other file field stores it. Returns True if it was deleted.
+    """
+    if not name:
+        return False
+
+    with transaction.atomic():
+        media_files = list(
+            MediaFile.objects.all_including_missing().select_for_update().filter(file=name).order_by('id')
+        )
+        counted = next((media_file for media_file in media_files if media_file.reference_count), None)
+        if counted is not None and holder is not None and type(holder) in get_sources():
+            MediaFile.objects.all_including_missing().filter(id=counted.id).update(
+                reference_count=F('reference_count') - 1
+            )
+            counted.reference_count -= 1
+
+        if any(media_file.reference_count for media_file in media_files) or is_file_referenced(name, holder):
+            return False
+        for media_file in media_files:
+            media_file.delete()
+
+    if not media_files and default_storage.exists(name):
+        default_storage.delete(name)
+    return True
+
+
+def repoint_file_references(old_name, new_name):
+    """Point every file field that stores `old_name` at `new_name`; returns rows changed"""
+    changed = 0
+    for model, field_name in file_fields():
+        changed += model._default_manager.filter(**{field_name: old_name}).update(**{field_name: new_name})
+    return changed
+
+
+def merge_into(keep, duplicate):
+    """Fold `duplicate` into `keep`: references move over, the duplicate blob goes"""
+    if duplicate.file.name != keep.file.name:
+        repoint_file_references(duplicate.file.name, keep.file.name)
+        MediaFile.objects.all_including_missing().filter(id=keep.id).update(
+            reference_count=F('reference_count') + duplicate.reference_count
+        )
+        duplicate.delete()
+    else:
+        # Two rows for one stored file; only the row is redundant
+        MediaFile.objects.all_including_missing().filter(id=duplicate.id).delete()
+
+
+def find_duplicates(batch_size=500, dry_run=False, stdout=None):
+    """Hash unhashed library files and merge any whose bytes are already present
+
+    Rows are visited oldest first, so the first upload of some content is
+    the one kept. Returns (rows hashed, duplicates merged, bytes freed).
+    """
+    hashed = merged = freed = 0
+    last_id = 0
+    # Content seen during a dry run, since nothing is written to the database
+    seen = {}
+
+    while True:
+        rows = list(
+            MediaFile.objects.all_including_missing()
+            .filter(content_hash__isnull=True, is_missing=False, id__gt=last_id)
+            .order_by('id')[:batch_size]
+        )
+        if not rows:
+            break
+
+        for media_file in rows:
+            try:
+                content_hash = file_sha256(media_file.file.name)
+            except (OSError, ValueError) as e:
+                if stdout:
+                    stdout.write(f'  ! {media_file.file.name}: {e}')
+                continue
+            hashed += 1
+
+            keep = seen.get(content_hash) or MediaFile.objects.all_including_missing().filter(
+                content_hash=content_hash
+            ).exclude(id=media_file.id).first()
+            if keep is None:
+                seen[content_hash] = media_file
+                if not dry_run:
+                    media_file.content_hash = content_hash
+                    media_file.save(update_fields=['content_hash'])
+                continue
+
+            if media_file.file.name != keep.file.name:
+                try:
+                    freed += media_file.file.size
+                except OSError:
+                    pass
+            merged += 1
+            if stdout:
+                stdout.write(f'  - {media_file.file.name} -> {keep.file.name}')
+            if not dry_run:
+                merge_into(keep, media_file)
+
+        last_id = rows[-1].id
+
+    return hashed, merged, freed
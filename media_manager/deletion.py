@@ -0,0 +1,61 @@
+# media_manager/deletion.py
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+from .dedup import referenced_file_names
+from .models import MediaDeleteJob, MediaFile, MediaRendition
+
+# Finished jobs are kept this long for the progress endpoint, then pruned
+PROGRESS_RETENTION = timedelta(days=1)
+
+PROGRESS_FIELDS = ('status', 'rows', 'total', 'removed', 'failed', 'kept')
+
+
+def get_delete_progress(job_id):
+    """Progress dict of a bulk delete job, or None if the id is unknown"""
+    try:
+        return MediaDeleteJob.objects.filter(pk=job_id).values(*PROGRESS_FIELDS).first()
+    except ValidationError:
+        # Not a UUID, so not a job id at all
+        return None
+
+
+def set_delete_progress(job_id, **values):
+    """Update a job's progress row; every web and worker process reads the same row"""
+    MediaDeleteJob.objects.filter(pk=job_id).update(updated_at=timezone.now(), **values)
+
+
+def files_in_use(names):
+    """The subset of `names` still stored by a MediaFile row or any other file field"""
+    in_use = set(MediaFile.objects.all_including_missing().filter(file__in=names).values_list('file', flat=True))
+    return in_use | referenced_file_names(set(names) - in_use)
+
+
+def delete_media_files(ids):
+    """Delete MediaFile rows in one go and queue their files for removal
+
+    Rows (and their renditions, by cascade) are deleted with a single
+    queryset delete; nothing is read from or removed in storage here.
+    Files still used by a remaining MediaFile row or by another model's
+    file field are kept. Returns (rows deleted, job id), the job id
+    being None when there were no files to remove.
+    """
+    from .tasks import remove_media_files
+
+    queryset = MediaFile.objects.all_including_missing().filter(id__in=ids)
+    names = set(queryset.values_list('file', flat=True))
+    names.update(MediaRendition.objects.filter(media_file__in=queryset).values_list('file', flat=True))
+
+    deleted = MediaFile.objects.all_including_missing().filter(id__in=ids).delete()[1].get(MediaFile._meta.label, 0)
+
+    names.discard('')
+    names -= files_in_use(names)
+    if not names:
+        return deleted, None
+
+    MediaDeleteJob.objects.filter(updated_at__lt=timezone.now() - PROGRESS_RETENTION).delete()
+    job = MediaDeleteJob.objects.create(rows=deleted, total=len(names))
+    remove_media_files.delay(job.id.hex, sorted(names))
+    return deleted, job.id.hex
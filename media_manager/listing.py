@@ -0,0 +1,106 @@
+# media_manager/listing.py
+import base64
+import os
+from datetime import datetime, timedelta
+
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import MediaFile
+
+PAGE_SIZE = 20
+
+
+def filter_media(queryset, media_type='all', search='', date_filter='all'):
+    """Apply the media library's type, search and date filters
+
+    The icontains lookups are served by the trigram indexes on file,
+    alt_text and description (see MediaFile.Meta.indexes).
+    """
+    if media_type and media_type != 'all':
+        queryset = queryset.filter(category=media_type)
+
+    if search:
+        queryset = queryset.filter(
+            Q(file__icontains=search) |
+            Q(alt_text__icontains=search) |
+            Q(description__icontains=search)
+        )
+
+    since = get_date_cutoff(date_filter)
+    if since is not None:
+        queryset = queryset.filter(created_at__gte=since)
+    return queryset
+
+
+def get_date_cutoff(date_filter):
+    """Start of 'today', 'week' (since Monday) or 'month'; None for anything else"""
+    today = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+    if date_filter == 'today':
+        return today
+    if date_filter == 'week':
+        return today - timedelta(days=today.weekday())
+    if date_filter == 'month':
+        return today.replace(day=1)
+    return None
+
+
+def encode_cursor(media_file):
+    value = f'{media_file.created_at.isoformat()}|{media_file.id}'
+    return base64.urlsafe_b64encode(value.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(created_at, id) from a cursor, or None if it is malformed"""
+    try:
+        value = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, media_id = value.split('|')
+        return datetime.fromisoformat(created_at), int(media_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def paginate(queryset, cursor=None, limit=PAGE_SIZE):
+    """One page of newest-first media after `cursor`; returns (items, next cursor or None)
+
+    Keyset pagination on (created_at, id): every page is an index range
+    scan however deep the user scrolls, unlike OFFSET.
+    """
+    queryset = queryset.order_by('-created_at', '-id')
+    position = decode_cursor(cursor) if cursor else None
+    if position is not None:
+        created_at, media_id = position
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=media_id)
+        )
+
+    items = list(queryset[:limit + 1])
+    if len(items) > limit:
+        return items[:limit], encode_cursor(items[limit - 1])
+    return items, None
+
+
+def get_category_counts():
+    """Number of media files overall and per category, in one query"""
+    aggregates = {'all': Count('id')}
+    for category, _ in MediaFile.MEDIA_TYPES:
+        aggregates[category] = Count('id', filter=Q(category=category))
+    return MediaFile.objects.aggregate(**aggregates)
+
+
+def serialize_media(media):
+    """The JSON shape the media grid and post editor expect for one file"""
+    return {
+        'id': media.id,
+        'url': media.file.url,
+        'name': os.path.basename(media.file.name),
+        'type': media.file_type,
+        'size': media.file_size,
+        'alt_text': media.alt_text,
+        'description': media.description,
+        'created_at': media.created_at.strftime('%B %d, %Y'),
+        'file_extension': media.file_extension,
+        'thumbnail_url': media.get_thumbnail_url(),
+        'dimensions': media.dimensions,
+        'mime_type': media.mime_type,
+    }
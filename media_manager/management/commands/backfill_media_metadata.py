@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+
+from media_manager.models import MediaFile
+
+
+class Command(BaseCommand):
+    help = 'Fill in cached size, dimensions, mime type and extension for existing media files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Rows read and updated per query',
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Re-read every file, not only rows without metadata',
+        )
+
+    def handle(self, *args, **options):
+        queryset = MediaFile.objects.all_including_missing().filter(is_missing=False)
+        if not options['all']:
+            queryset = queryset.filter(size__isnull=True)
+
+        fields = ['size', 'width', 'height', 'mime_type', 'extension']
+        updated = failed = 0
+        last_id = 0
+        while True:
+            batch = list(queryset.filter(id__gt=last_id).order_by('id')[:options['batch_size']])
+            if not batch:
+                break
+
+            changed = []
+            for media_file in batch:
+                try:
+                    media_file.read_metadata()
+                except OSError as e:
+                    failed += 1
+                    self.stdout.write(self.style.WARNING(f'  ! {media_file.file.name}: {e}'))
+                    continue
+                changed.append(media_file)
+
+            MediaFile.objects.bulk_update(changed, fields)
+            updated += len(changed)
+            last_id = batch[-1].id
+            self.stdout.write(f'  {updated} updated so far')
+
+        self.stdout.write(self.style.SUCCESS(f'Backfilled metadata for {updated} media files, {failed} unreadable'))
@@ -0,0 +1,123 @@
+import os
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+import PyPDF2
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import connections
+from PIL import Image, ImageOps
+
+from media_manager.compression import MediaCompressor
+
+
+def legacy_compress_image(file_path):
+    """The old path: BytesIO output, a second bytes copy, then delete + save"""
+    with default_storage.open(file_path, 'rb') as f:
+        image = Image.open(f)
+        image = ImageOps.exif_transpose(image.convert('RGB'))
+        image.thumbnail(MediaCompressor.MAX_IMAGE_SIZE, Image.Resampling.LANCZOS)
+        output = BytesIO()
+        image.save(output, format='JPEG', quality=MediaCompressor.IMAGE_QUALITY, optimize=True)
+        output.seek(0)
+        default_storage.delete(file_path)
+        default_storage.save(file_path, ContentFile(output.read()))
+    return True
+
+
+def legacy_compress_pdf(file_path):
+    with default_storage.open(file_path, 'rb') as f:
+        reader = PyPDF2.PdfReader(f)
+        writer = PyPDF2.PdfWriter()
+        for page in reader.pages:
+            writer.add_page(page)
+        writer.add_metadata({})
+        output = BytesIO()
+        writer.write(output)
+        output.seek(0)
+        default_storage.delete(file_path)
+        default_storage.save(file_path, ContentFile(output.read()))
+    return True
+
+
+MODES = {
+    ('image', 'legacy'): legacy_compress_image,
+    ('image', 'streaming'): MediaCompressor.compress_image,
+    ('pdf', 'legacy'): legacy_compress_pdf,
+    ('pdf', 'streaming'): MediaCompressor.compress_pdf,
+}
+
+
+def measure(kind, mode, file_path):
+    """Run one compression in a fresh worker; returns (seconds, peak RSS growth in bytes)"""
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    MODES[kind, mode](file_path)
+    elapsed = time.perf_counter() - started
+    # ru_maxrss is in KiB on Linux
+    return elapsed, (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline) * 1024
+
+
+class Command(BaseCommand):
+    help = 'Compare peak memory of in-memory and streaming compression on a large image and PDF'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--image-size',
+            type=int,
+            nargs=2,
+            default=[8000, 6000],
+            metavar=('WIDTH', 'HEIGHT'),
+            help='Size of the generated test image',
+        )
+        parser.add_argument(
+            '--pdf-pages',
+            type=int,
+            default=100,
+            help='Pages in the generated test PDF',
+        )
+
+    def handle(self, *args, **options):
+        samples = {
+            'image': self.make_image(*options['image_size']),
+            'pdf': self.make_pdf(options['pdf_pages']),
+        }
+        connections.close_all()
+        try:
+            for (kind, mode) in MODES:
+                name = default_storage.save(f'benchmarks/{mode}-{kind}', ContentFile(samples[kind]))
+                # A new process per run so one mode's peak can't hide the other's
+                with ProcessPoolExecutor(max_workers=1) as pool:
+                    elapsed, peak = pool.submit(measure, kind, mode, name).result()
+                self.stdout.write(
+                    f'{kind:5} {mode:9}: {elapsed:.2f}s, peak RSS +{peak / (1024 * 1024):.1f} MB '
+                    f'({len(samples[kind]) / (1024 * 1024):.1f} MB in, '
+                    f'{default_storage.size(name) / (1024 * 1024):.1f} MB out)'
+                )
+                default_storage.delete(name)
+        finally:
+            for mode in ('legacy', 'streaming'):
+                for kind in samples:
+                    if default_storage.exists(f'benchmarks/{mode}-{kind}'):
+                        default_storage.delete(f'benchmarks/{mode}-{kind}')
+
+    def make_image(self, width, height):
+        # Noise doesn't compress, so the source file is as large as a real photo can get
+        image = Image.frombytes('RGB', (width, height), os.urandom(width * height * 3))
+        output = BytesIO()
+        image.save(output, format='JPEG', quality=95)
+        return output.getvalue()
+
+    def make_pdf(self, pages):
+        # Scanned-document style: one full-page noise image per page
+        images = [
+            Image.frombytes('RGB', (1275, 1650), os.urandom(1275 * 1650 * 3))
+            for _ in range(min(pages, 10))
+        ]
+        images = [images[i % len(images)] for i in range(pages)]
+        output = BytesIO()
+        images[0].save(output, format='PDF', save_all=True, append_images=images[1:], resolution=150, quality=95)
+        return output.getvalue()
@@ -0,0 +1,60 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.utils import timezone
+
+from analytics.models import PageView
+from media_manager.models import MediaFile
+
+
+def legacy_media_post_save(sender, instance, **kwargs):
+    """The old receiver: runs for every model and queries once per file field"""
+    if sender.__name__ == 'MediaFile':
+        return
+    for field in instance._meta.get_fields():
+        if field.get_internal_type() in ['FileField', 'ImageField']:
+            file_field = getattr(instance, field.name, None)
+            if file_field and hasattr(file_field, 'name') and file_field.name:
+                MediaFile.objects.filter(file=file_field.name).exists()
+
+
+class Command(BaseCommand):
+    help = 'Measure what the global post_save media sync cost on PageView.save()'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--saves',
+            type=int,
+            default=2000,
+            help='Number of PageView rows saved per mode (rolled back afterwards)',
+        )
+
+    def handle(self, *args, **options):
+        total = options['saves']
+        registry = self.run(total)
+
+        post_save.connect(legacy_media_post_save, dispatch_uid='benchmark_legacy_media_sync')
+        try:
+            legacy = self.run(total)
+        finally:
+            post_save.disconnect(dispatch_uid='benchmark_legacy_media_sync')
+
+        for label, elapsed in (('global receiver', legacy), ('registry', registry)):
+            self.stdout.write(self.style.SUCCESS(label))
+            self.stdout.write(f'  {elapsed / total * 1e6:.1f} µs per save ({total / elapsed:.0f} saves/s)')
+        self.stdout.write(f'Removed overhead: {(legacy - registry) / total * 1e6:.1f} µs per save')
+
+    def run(self, total):
+        now = timezone.now()
+        with transaction.atomic():
+            started = time.perf_counter()
+            for _ in range(total):
+                PageView(
+                    page_url='/benchmark/', page_title='Benchmark', ip_address='127.0.0.1',
+                    timestamp=now, date=now.date(),
+                ).save()
+            elapsed = time.perf_counter() - started
+            transaction.set_rollback(True)
+        return elapsed
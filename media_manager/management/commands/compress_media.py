@@ -1,4 +1,5 @@
 from django.core.management.base import BaseCommand
+from media_manager.batch import compress_images
 from media_manager.models import MediaFile
 from media_manager.tasks import compress_media_file
 
@@ -14,8 +15,25 @@ class Command(BaseCommand):
         parser.add_argument(
             '--limit',
             type=int,
-            default=10,
-            help='Number of files to process at once',
+            default=None,
+            help='Number of files to process at once (default: 10 queued, or all with --workers)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=0,
+            help='Compress locally in this many processes instead of queueing Celery tasks',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=100,
+            help='Files read from the database and recorded per round with --workers',
+        )
+        parser.add_argument(
+            '--recheck',
+            action='store_true',
+            help='With --workers, also hash files already compressed and redo any that changed',
         )
 
     def handle(self, *args, **options):
@@ -27,7 +45,11 @@ class Command(BaseCommand):
                 category='image'
             ).exclude(file__endswith='.webp')
 
-        files = queryset[:options['limit']]
+        if options['workers']:
+            self.compress_locally(queryset, options)
+            return
+
+        files = queryset[:options['limit'] or 10]
         
         if not files:
             self.stdout.write(
@@ -45,4 +67,30 @@ class Command(BaseCommand):
             self.style.SUCCESS(
                 f'Queued {len(files)} files for compression'
             )
-        )
\ No newline at end of file
+        )
+
+    def compress_locally(self, queryset, options):
+        if not options['recheck']:
+            # Already compressed files are skipped in the query, so re-running resumes
+            queryset = queryset.filter(compressed_hash='')
+
+        self.stdout.write(f"Compressing up to {queryset.count()} images with {options['workers']} workers")
+        totals = compress_images(
+            queryset,
+            options['workers'],
+            chunk_size=options['chunk_size'],
+            limit=options['limit'],
+            progress=self.report,
+        )
+        self.report(totals, style=self.style.SUCCESS)
+
+    def report(self, totals, style=None):
+        processed = totals['compressed'] + totals['skipped'] + totals['failed']
+        rate = processed / totals['elapsed'] if totals['elapsed'] else 0
+        saved = (totals['bytes_before'] - totals['bytes_after']) / (1024 * 1024)
+        message = (
+            f"{processed} files in {totals['elapsed']:.1f}s ({rate:.1f} files/s): "
+            f"{totals['compressed']} compressed, {totals['skipped']} skipped, {totals['failed']} failed, "
+            f"{saved:.1f} MB saved"
+        )
+        self.stdout.write(style(message) if style else message)
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from media_manager.dedup import find_duplicates
+
+
+class Command(BaseCommand):
+    help = 'Hash existing media files and merge the ones with identical content'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Rows hashed per query',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='List the duplicates that would be merged without changing anything',
+        )
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('DRY RUN: nothing will be merged'))
+
+        hashed, merged, freed = find_duplicates(options['batch_size'], options['dry_run'], self.stdout)
+        self.stdout.write(self.style.SUCCESS(
+            f'Hashed {hashed} files, merged {merged} duplicates, {freed / (1024 * 1024):.1f} MB freed'
+        ))
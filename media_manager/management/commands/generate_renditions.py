@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from media_manager.models import MediaFile
+from media_manager.renditions import generate_missing_renditions, generate_renditions, get_formats, get_widths
+
+
+class Command(BaseCommand):
+    help = 'Generate responsive WebP/AVIF renditions for images in the media library'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Regenerate renditions for every image, not just those without any',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=None,
+            help='Number of images to process',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Widths: {get_widths()}, formats: {get_formats()}')
+
+        if not options['all']:
+            processed = generate_missing_renditions(options['limit'])
+            self.stdout.write(self.style.SUCCESS(f'Generated renditions for {processed} images'))
+            return
+
+        images = MediaFile.objects.filter(category='image')
+        if options['limit']:
+            images = images[:options['limit']]
+        processed = 0
+        for media_file in images:
+            try:
+                renditions = generate_renditions(media_file)
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'Failed: {media_file.file.name}: {e}'))
+                continue
+            processed += 1
+            self.stdout.write(f'  - {media_file.file.name}: {len(renditions)} renditions')
+        self.stdout.write(self.style.SUCCESS(f'Generated renditions for {processed} images'))
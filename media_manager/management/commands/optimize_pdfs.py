@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand
+
+from media_manager.compression import MediaCompressor
+from media_manager.models import MediaFile
+
+
+class Command(BaseCommand):
+    help = 'Optimize PDFs in the media library and report how much each one shrank'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=None,
+            help='Number of PDFs to process',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report the savings without replacing any files',
+        )
+
+    def handle(self, *args, **options):
+        pdfs = MediaFile.objects.filter(file__iendswith='.pdf').order_by('id')
+        if options['limit']:
+            pdfs = pdfs[:options['limit']]
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('DRY RUN: no files will be replaced'))
+
+        totals = {'files': 0, 'kept': 0, 'failed': 0, 'bytes_before': 0, 'bytes_after': 0}
+        for media_file in pdfs:
+            name = media_file.file.name
+            try:
+                stats = MediaCompressor.optimize_pdf(name, dry_run=options['dry_run'])
+            except Exception as e:
+                totals['failed'] += 1
+                self.stdout.write(self.style.ERROR(f'  ! {name}: {e}'))
+                continue
+
+            if stats['kept'] and not options['dry_run']:
+                media_file.size = stats['bytes_after']
+                media_file.save(update_fields=['size'])
+            after = stats['bytes_after'] if stats['kept'] else stats['bytes_before']
+            totals['files'] += 1
+            totals['kept'] += stats['kept']
+            totals['bytes_before'] += stats['bytes_before']
+            totals['bytes_after'] += after
+            self.stdout.write(
+                f"  - {name}: {self.format_size(stats['bytes_before'])} -> {self.format_size(after)} "
+                f"({self.percent(stats['bytes_before'], after)}), "
+                f"{stats['images_recompressed']} images recompressed, {stats['images_merged']} merged"
+                + ('' if stats['kept'] else ', kept original')
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{totals['files']} PDFs, {totals['kept']} optimized, {totals['failed']} failed: "
+            f"{self.format_size(totals['bytes_before'])} -> {self.format_size(totals['bytes_after'])} "
+            f"({self.percent(totals['bytes_before'], totals['bytes_after'])})"
+        ))
+
+    def format_size(self, size):
+        return f'{size / (1024 * 1024):.2f} MB'
+
+    def percent(self, before, after):
+        return f'-{(before - after) / before * 100:.1f}%' if before else '0.0%'
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from media_manager.models import MediaFile
+from media_manager.reconcile import purge_missing_media_files, reconcile_media_files
+
+
+class Command(BaseCommand):
+    help = 'Check media records against storage and flag the ones whose files are missing'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Rows checked per batch',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=None,
+            help='Stop after this many rows (default: the whole library)',
+        )
+        parser.add_argument(
+            '--purge',
+            action='store_true',
+            help='Delete records flagged as missing after checking',
+        )
+
+    def handle(self, *args, **options):
+        checked, missing, elapsed = reconcile_media_files(options['batch_size'], options['limit'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Checked {checked} media files in {elapsed:.2f}s, {missing} missing')
+        )
+
+        if options['purge']:
+            purged = purge_missing_media_files()
+            self.stdout.write(self.style.SUCCESS(f'Deleted {purged} missing media records'))
+        else:
+            flagged = MediaFile.objects.all_including_missing().filter(is_missing=True).count()
+            if flagged:
+                self.stdout.write(
+                    self.style.WARNING(f'{flagged} records are flagged as missing; run with --purge to delete them')
+                )
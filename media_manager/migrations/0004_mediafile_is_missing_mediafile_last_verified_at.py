@@ -0,0 +1,23 @@
+# Generated by Django 5.2.3 on 2026-10-17 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('media_manager', '0003_alter_mediafile_options_remove_mediafile_title_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediafile',
+            name='is_missing',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+        migrations.AddField(
+            model_name='mediafile',
+            name='last_verified_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
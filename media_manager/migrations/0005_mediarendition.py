@@ -0,0 +1,30 @@
+# Generated by Django 5.2.3 on 2026-10-17 16:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('media_manager', '0004_mediafile_is_missing_mediafile_last_verified_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaRendition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file', models.FileField(max_length=255, upload_to='')),
+                ('format', models.CharField(choices=[('webp', 'WebP'), ('avif', 'AVIF')], max_length=10)),
+                ('width', models.PositiveIntegerField()),
+                ('height', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('media_file', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='renditions', to='media_manager.mediafile')),
+            ],
+            options={
+                'ordering': ['media_file', 'format', 'width'],
+                'constraints': [models.UniqueConstraint(fields=('media_file', 'format', 'width'), name='unique_media_rendition')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-17 17:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('media_manager', '0005_mediarendition'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediafile',
+            name='compressed_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
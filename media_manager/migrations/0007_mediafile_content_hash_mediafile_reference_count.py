@@ -0,0 +1,23 @@
+# Generated by Django 5.2.3 on 2026-10-17 17:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('media_manager', '0006_mediafile_compressed_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediafile',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='mediafile',
+            name='reference_count',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.3 on 2026-10-17 17:25
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+from utils.migrations import AddPostgresIndex
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('media_manager', '0008_mediafile_extension_mediafile_height_and_more'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='mediafile',
+            index=models.Index(fields=['-created_at', '-id'], name='media_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mediafile',
+            index=models.Index(fields=['category', '-created_at', '-id'], name='media_category_created_idx'),
+        ),
+        AddPostgresIndex(
+            model_name='mediafile',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['file'], name='media_file_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        AddPostgresIndex(
+            model_name='mediafile',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['alt_text'], name='media_alt_text_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        AddPostgresIndex(
+            model_name='mediafile',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['description'], name='media_description_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
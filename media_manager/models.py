@@ -1,26 +1,34 @@
 # models.py
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
 import os
+import mimetypes
+import uuid
+from django.core.files.images import get_image_dimensions
 from django.utils.html import format_html
 
 User = get_user_model()
 
+# Lower-case extension -> MediaFile.file_type
+FILE_TYPES = {
+    **dict.fromkeys(('jpg', 'jpeg', 'png', 'gif', 'webp', 'svg', 'bmp'), 'image'),
+    **dict.fromkeys(('mp4', 'mov', 'avi', 'mkv', 'wmv', 'flv'), 'video'),
+    **dict.fromkeys(('mp3', 'wav', 'ogg', 'm4a', 'flac'), 'audio'),
+    **dict.fromkeys(('pdf', 'docx', 'pptx', 'doc', 'txt', 'rtf'), 'document'),
+    **dict.fromkeys(('xlsx', 'xls', 'csv', 'ods'), 'spreadsheet'),
+}
+
 class MediaFileManager(models.Manager):
-    """Custom manager to exclude missing files automatically"""
-    
+    """Custom manager to exclude missing files automatically
+
+    Relies on the is_missing flag kept up to date by
+    media_manager.reconcile rather than checking storage on every query.
+    """
+
     def get_queryset(self):
-        queryset = super().get_queryset()
-        # Filter out records where files don't exist
-        existing_files = []
-        for obj in queryset:
-            if obj.file and obj.file.storage.exists(obj.file.name):
-                existing_files.append(obj.id)
-            else:
-                # Silently delete orphaned records
-                obj.delete()
-        return super().get_queryset().filter(id__in=existing_files)
-    
+        return super().get_queryset().filter(is_missing=False)
+
     def all_including_missing(self):
         """Method to get all records including missing files (for admin cleanup)"""
         return super().get_queryset()
@@ -42,6 +50,19 @@ class MediaFile(models.Model):
     category = models.CharField(max_length=50, choices=MEDIA_TYPES, default='other')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    is_missing = models.BooleanField(default=False, db_index=True)
+    last_verified_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    # SHA-256 of the file as written by the compressor; '' means not compressed yet
+    compressed_hash = models.CharField(max_length=64, blank=True, default='')
+    # SHA-256 of the bytes as uploaded, before compression; NULL until hashed
+    content_hash = models.CharField(max_length=64, null=True, blank=True, unique=True, editable=False)
+    reference_count = models.PositiveIntegerField(default=1, editable=False)
+    # Cached file metadata, filled in on upload and after compression
+    size = models.PositiveBigIntegerField(null=True, blank=True, editable=False)
+    width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    mime_type = models.CharField(max_length=100, blank=True, editable=False)
+    extension = models.CharField(max_length=10, blank=True, editable=False)
     
     objects = MediaFileManager()
 
@@ -49,67 +70,112 @@ class MediaFile(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Media File'
         verbose_name_plural = 'Media Library'
+        indexes = [
+            # Keyset pagination of the library, overall and per category
+            models.Index(fields=['-created_at', '-id'], name='media_created_id_idx'),
+            models.Index(fields=['category', '-created_at', '-id'], name='media_category_created_idx'),
+            # Trigram indexes let icontains searches use an index (needs pg_trgm)
+            GinIndex(fields=['file'], name='media_file_trgm_idx', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['alt_text'], name='media_alt_text_trgm_idx', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['description'], name='media_description_trgm_idx', opclasses=['gin_trgm_ops']),
+        ]
 
     def __str__(self):
         return os.path.basename(self.file.name) if self.file else 'File'
 
     def delete(self, *args, **kwargs):
-        # Delete the file from storage
-        if self.file and self.file.storage.exists(self.file.name):
-            self.file.delete(save=False)
-        super().delete(*args, **kwargs)
+        # Renditions belong to this row. The file itself may be shared with
+        # other models' file fields (see dedup.release_file), so it is only
+        # removed when nothing else stores it.
+        from .dedup import is_file_referenced
+
+        for rendition in self.renditions.all():
+            rendition.file.delete(save=False)
+        name, storage = self.file.name, self.file.storage
+        result = super().delete(*args, **kwargs)
+        if (
+            name
+            and not is_file_referenced(name)
+            and not MediaFile.objects.all_including_missing().filter(file=name).exists()
+        ):
+            transaction.on_commit(lambda: storage.delete(name))
+        return result
 
     @property
     def file_type(self):
         """Auto-detect file type based on extension"""
         if not self.file:
             return 'other'
-        
-        name = self.file.name.lower()
-        if name.endswith(('.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.bmp')):
-            return 'image'
-        elif name.endswith(('.mp4', '.mov', '.avi', '.mkv', '.wmv', '.flv')):
-            return 'video'
-        elif name.endswith(('.mp3', '.wav', '.ogg', '.m4a', '.flac')):
-            return 'audio'
-        elif name.endswith(('.pdf', '.docx', '.pptx', '.doc', '.txt', '.rtf')):
-            return 'document'
-        elif name.endswith(('.xlsx', '.xls', '.csv', '.ods')):
-            return 'spreadsheet'
-        return 'other'
+        extension = self.extension or os.path.splitext(self.file.name)[1].lstrip('.')
+        return FILE_TYPES.get(extension.lower(), 'other')
 
     @property
     def file_size(self):
         """Get file size in human readable format"""
         if not self.file:
             return "0 bytes"
-        
-        try:
-            size = self.file.size
-            for unit in ['bytes', 'KB', 'MB', 'GB']:
-                if size < 1024.0:
-                    return f"{size:.1f} {unit}"
-                size /= 1024.0
-            return f"{size:.1f} TB"
-        except:
+        if self.size is None:
             return "Unknown size"
+        
+        size = self.size
+        for unit in ['bytes', 'KB', 'MB', 'GB']:
+            if size < 1024.0:
+                return f"{size:.1f} {unit}"
+            size /= 1024.0
+        return f"{size:.1f} TB"
 
     @property
     def file_extension(self):
         """Get file extension"""
         if not self.file:
             return ""
-        return os.path.splitext(self.file.name)[1].upper().lstrip('.')
+        return (self.extension or os.path.splitext(self.file.name)[1].lstrip('.')).upper()
+
+    @property
+    def dimensions(self):
+        """'WIDTHxHEIGHT' for images, None otherwise"""
+        if self.width and self.height:
+            return f"{self.width}x{self.height}"
+        return None
+
+    def read_metadata(self):
+        """Read size, dimensions, mime type and extension from the file into the columns
+
+        Works on a fresh upload (nothing is read from storage) and on a
+        stored file, where it costs one stat plus an image header read.
+        """
+        self.extension = os.path.splitext(self.file.name)[1].lstrip('.').lower()[:10]
+        self.mime_type = mimetypes.guess_type(self.file.name)[0] or ''
+        self.size = self.file.size
+        self.width = self.height = None
+        if FILE_TYPES.get(self.extension) == 'image' and self.extension != 'svg':
+            self.width, self.height = get_image_dimensions(self.file)
+            if self.file._committed:
+                # Reading the header opened the stored file; an upload stays open to be saved
+                self.file.close()
+
+    def refresh_metadata(self):
+        """Re-read the metadata of the stored file (e.g. after compression) and save it"""
+        self.read_metadata()
+        MediaFile.objects.all_including_missing().filter(pk=self.pk).update(
+            size=self.size, width=self.width, height=self.height,
+            mime_type=self.mime_type, extension=self.extension,
+        )
 
     def save(self, *args, **kwargs):
+        if self.file and self.size is None:
+            self.read_metadata()
         # Auto-set category based on file type if not already set
         if not self.category or self.category == 'other':
             self.category = self.file_type
         super().save(*args, **kwargs)
 
     def get_thumbnail_url(self):
-        """Return thumbnail URL for images"""
+        """Return thumbnail URL for images, preferring the smallest rendition"""
         if self.file_type == 'image':
+            renditions = self.get_rendition_urls()
+            if renditions:
+                return renditions[0][1]
             return self.file.url
         return None
 
@@ -124,4 +190,61 @@ class MediaFile(models.Model):
             return format_html(
                 '<div style="width: 100px; height: 100px; background: #f0f0f0; display: flex; align-items: center; justify-content: center; font-size: 24px;">{}</div>',
                 self.file_extension or '📄'
-            )
\ No newline at end of file
+            )
+
+    def get_rendition_urls(self, format='webp'):
+        """(width, url) pairs of this image's renditions, smallest first"""
+        # Iterates renditions.all() so prefetch_related('renditions') is honoured
+        renditions = [r for r in self.renditions.all() if r.format == format]
+        return [(r.width, r.file.url) for r in sorted(renditions, key=lambda r: r.width)]
+
+    def get_srcset(self, format='webp'):
+        """srcset attribute value for this image's renditions"""
+        return ', '.join(f'{url} {width}w' for width, url in self.get_rendition_urls(format))
+
+
+class MediaRendition(models.Model):
+    """A resized copy of an image MediaFile in a web format"""
+    FORMATS = [
+        ('webp', 'WebP'),
+        ('avif', 'AVIF'),
+    ]
+
+    media_file = models.ForeignKey(MediaFile, on_delete=models.CASCADE, related_name='renditions')
+    file = models.FileField(max_length=255)
+    format = models.CharField(max_length=10, choices=FORMATS)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['media_file', 'format', 'width']
+        constraints = [
+            models.UniqueConstraint(fields=['media_file', 'format', 'width'], name='unique_media_rendition'),
+        ]
+
+    def __str__(self):
+        return f'{self.media_file} ({self.width}w {self.format})'
+
+
+class MediaDeleteJob(models.Model):
+    """Progress of the background file removal started by a bulk delete (see deletion.py)"""
+    STATUSES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    status = models.CharField(max_length=10, choices=STATUSES, default='queued')
+    rows = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    removed = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    # Files left in place because another row took them up meanwhile
+    kept = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'Delete job {self.id.hex} ({self.status})'
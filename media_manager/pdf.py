@@ -0,0 +1,181 @@
+# media_manager/pdf.py
+import io
+
+import PyPDF2
+from PIL import Image
+from PyPDF2.generic import DecodedStreamObject, NameObject, NumberObject
+
+# Decoded colour spaces Pillow can rebuild an image from
+COLOR_MODES = {'/DeviceRGB': ('RGB', 3), '/DeviceGray': ('L', 1)}
+# Image codecs PyPDF2 hands back still encoded instead of as pixels
+PASSTHROUGH_FILTERS = {'/DCTDecode', '/JPXDecode', '/CCITTFaxDecode', '/JBIG2Decode'}
+
+
+class PdfOptimizer:
+    """Shrink a PDF using PyPDF2 and Pillow
+
+    - Raster images are downsampled so they have at most `target_dpi`
+      pixels per inch when drawn across the whole page, and re-encoded as
+      JPEG when that makes them smaller.
+    - Uncompressed page content streams are Flate-compressed.
+    - Byte-identical image objects are merged so each is written once.
+
+    Work happens on the reader's objects before pages are copied into the
+    writer; objects a page no longer references are then never copied.
+    """
+
+    def __init__(self, target_dpi=150, jpeg_quality=75):
+        self.target_dpi = target_dpi
+        self.jpeg_quality = jpeg_quality
+
+    def optimize(self, source, output):
+        """Write an optimized copy of `source` to `output`; returns a stats dict"""
+        stats = {'images_recompressed': 0, 'images_merged': 0, 'streams_compressed': 0}
+        reader = PyPDF2.PdfReader(source)
+        writer = PyPDF2.PdfWriter()
+        # Resolved image object id -> done, content key -> first reference
+        recompressed = set()
+        seen = {}
+
+        for page in reader.pages:
+            max_size = (
+                int(float(page.mediabox.width) / 72 * self.target_dpi),
+                int(float(page.mediabox.height) / 72 * self.target_dpi),
+            )
+            self._optimize_images(page, max_size, recompressed, seen, stats)
+            if self._has_raw_content(page):
+                page.compress_content_streams()
+                stats['streams_compressed'] += 1
+            writer.add_page(page)
+
+        writer.add_metadata({})
+        writer.write(output)
+        return stats
+
+    def _optimize_images(self, page, max_size, recompressed, seen, stats):
+        resources = page.get('/Resources')
+        if resources is None:
+            return
+        xobjects = resources.get_object().get('/XObject')
+        if xobjects is None:
+            return
+        xobjects = xobjects.get_object()
+
+        for name in list(xobjects.keys()):
+            reference = xobjects.raw_get(name)
+            image = reference.get_object()
+            if image.get('/Subtype') != '/Image':
+                continue
+
+            if id(image) not in recompressed:
+                recompressed.add(id(image))
+                if self._recompress(image, max_size):
+                    stats['images_recompressed'] += 1
+
+            if not hasattr(reference, 'idnum'):
+                continue
+            key = self._content_key(image)
+            first = seen.setdefault(key, reference)
+            if first.idnum != reference.idnum:
+                xobjects[NameObject(name)] = first
+                stats['images_merged'] += 1
+
+    def _recompress(self, image, max_size):
+        """Downsample and JPEG-encode an image XObject in place if that shrinks it"""
+        if image.get('/ImageMask') or '/Mask' in image:
+            # Stencil masks and colour-key masking don't survive lossy encoding
+            return False
+
+        try:
+            pil_image = self._to_pillow(image)
+        except Exception:
+            return False
+        if pil_image is None:
+            return False
+
+        if pil_image.width > max_size[0] or pil_image.height > max_size[1]:
+            pil_image.thumbnail(max_size, Image.Resampling.LANCZOS)
+
+        encoded = io.BytesIO()
+        pil_image.save(encoded, format='JPEG', quality=self.jpeg_quality, optimize=True)
+        data = encoded.getvalue()
+        if len(data) >= _stored_size(image):
+            return False
+
+        _set_stored_data(image, data)
+        image[NameObject('/Filter')] = NameObject('/DCTDecode')
+        image[NameObject('/Width')] = NumberObject(pil_image.width)
+        image[NameObject('/Height')] = NumberObject(pil_image.height)
+        image[NameObject('/BitsPerComponent')] = NumberObject(8)
+        image[NameObject('/ColorSpace')] = NameObject('/DeviceGray' if pil_image.mode == 'L' else '/DeviceRGB')
+        for key in ('/DecodeParms', '/Decode'):
+            if key in image:
+                del image[key]
+        return True
+
+    def _to_pillow(self, image):
+        """Pillow image for a JPEG or 8-bit RGB/gray XObject, else None
+
+        get_data() undoes every filter in a chain except DCTDecode, which
+        it passes through, so [/ASCII85Decode /FlateDecode] (as written by
+        reportlab) yields pixels and [/ASCII85Decode /DCTDecode] the JPEG.
+        """
+        if '/Decode' in image:
+            return None
+        filters = image.get('/Filter')
+        filters = list(filters) if isinstance(filters, list) else [filters] if filters else []
+        if any(name in PASSTHROUGH_FILTERS for name in filters[:-1]):
+            # Only the last filter may leave encoded image data behind
+            return None
+        last = filters[-1] if filters else None
+
+        if last == '/DCTDecode':
+            pil_image = Image.open(io.BytesIO(image.get_data()))
+            if pil_image.mode not in ('RGB', 'L'):
+                # CMYK JPEGs are often stored inverted; leave them alone
+                return None
+            pil_image.load()
+            return pil_image
+
+        color_space = image.get('/ColorSpace')
+        if last not in PASSTHROUGH_FILTERS and color_space in COLOR_MODES and image.get('/BitsPerComponent') == 8:
+            mode, channels = COLOR_MODES[color_space]
+            size = (int(image['/Width']), int(image['/Height']))
+            data = image.get_data()
+            if len(data) != size[0] * size[1] * channels:
+                return None
+            return Image.frombytes(mode, size, data)
+        return None
+
+    def _has_raw_content(self, page):
+        contents = page.get('/Contents')
+        if contents is None:
+            return False
+        contents = contents.get_object()
+        streams = contents if isinstance(contents, list) else [contents]
+        return any('/Filter' not in stream.get_object() for stream in streams)
+
+    def _content_key(self, image):
+        # Dictionary and stored bytes, as PyPDF2 hashes them
+        return image.hash_value()
+
+
+def _stored_size(stream):
+    """Bytes a stream object takes in the file, dictionary included"""
+    output = io.BytesIO()
+    stream.write_to_stream(output, None)
+    return output.tell()
+
+
+def _set_stored_data(stream, data):
+    """Replace the bytes written for a stream, which must match its /Filter
+
+    PyPDF2 3.0 has no public setter for encoded streams
+    (EncodedStreamObject.set_data raises), so this is the one place that
+    writes the stream internals.
+    """
+    if isinstance(stream, DecodedStreamObject):
+        stream.set_data(data)
+    else:
+        stream._data = data
+    stream.decoded_self = None
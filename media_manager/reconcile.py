@@ -0,0 +1,60 @@
+# media_manager/reconcile.py
+import time
+
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import MediaFile
+
+
+def reconcile_media_files(batch_size=500, limit=None):
+    """Check MediaFile rows against storage and update their is_missing flag
+
+    Rows are visited least recently verified first (never verified rows
+    before everything else), `batch_size` at a time, so repeated runs with
+    a `limit` walk the whole library incrementally. Each batch costs one
+    storage.exists() per row and at most two UPDATEs. Files that come back
+    are un-flagged. Returns (rows checked, rows missing, seconds taken).
+    """
+    started_at = timezone.now()
+    started = time.perf_counter()
+    checked = 0
+    missing = 0
+
+    pending = MediaFile.objects.all_including_missing().filter(
+        Q(last_verified_at__isnull=True) | Q(last_verified_at__lt=started_at)
+    ).order_by(F('last_verified_at').asc(nulls_first=True), 'id')
+
+    while limit is None or checked < limit:
+        size = batch_size if limit is None else min(batch_size, limit - checked)
+        rows = list(pending.values_list('id', 'file')[:size])
+        if not rows:
+            break
+
+        storage = MediaFile._meta.get_field('file').storage
+        present_ids, missing_ids = [], []
+        for media_id, name in rows:
+            if name and storage.exists(name):
+                present_ids.append(media_id)
+            else:
+                missing_ids.append(media_id)
+
+        now = timezone.now()
+        if present_ids:
+            MediaFile.objects.all_including_missing().filter(id__in=present_ids).update(
+                is_missing=False, last_verified_at=now
+            )
+        if missing_ids:
+            MediaFile.objects.all_including_missing().filter(id__in=missing_ids).update(
+                is_missing=True, last_verified_at=now
+            )
+
+        checked += len(rows)
+        missing += len(missing_ids)
+
+    return checked, missing, time.perf_counter() - started
+
+
+def purge_missing_media_files():
+    """Delete the rows currently flagged as missing; returns how many"""
+    return MediaFile.objects.all_including_missing().filter(is_missing=True).delete()[0]
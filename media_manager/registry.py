@@ -0,0 +1,75 @@
+# media_manager/registry.py
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models
+from django.db.models.signals import post_init, post_save
+
+# Model label -> file fields whose uploads are added to the media library
+DEFAULT_SOURCES = {
+    'blog.Post': ['featured_image'],
+    'blog.Page': ['featured_image'],
+    'blog.UserProfile': ['profile_image'],
+    'main.MentorApplication': ['professional_picture', 'cv', 'certificate'],
+}
+
+# Model class -> tuple of field names, filled in by connect_sources()
+_sources = {}
+
+
+def get_sources():
+    return _sources
+
+
+def resolve_sources(config=None):
+    """Turn MEDIA_LIBRARY_SOURCES into {model: (field names)}, checking each field"""
+    if config is None:
+        config = getattr(settings, 'MEDIA_LIBRARY_SOURCES', DEFAULT_SOURCES)
+    resolved = {}
+    for label, field_names in config.items():
+        model = apps.get_model(label)
+        for name in field_names:
+            if not isinstance(model._meta.get_field(name), models.FileField):
+                raise ImproperlyConfigured(f'MEDIA_LIBRARY_SOURCES: {label}.{name} is not a file field')
+        resolved[model] = tuple(field_names)
+    return resolved
+
+
+def remember_file_names(sender, instance, **kwargs):
+    """Snapshot the file names an instance was loaded with
+
+    Deferred fields (.only()/.defer()) are skipped: reading them here
+    would cost a query per row.
+    """
+    deferred = instance.get_deferred_fields()
+    instance._media_file_names = {
+        name: getattr(instance, name).name or '' for name in _sources[sender] if name not in deferred
+    }
+
+
+def changed_file_names(instance):
+    """{field name: file name} for registered fields whose file changed since load
+
+    A field that is still deferred can't have been assigned, so it is
+    left alone. One that was deferred at load and read later has no
+    snapshot and counts as changed, which at worst adds a reference.
+    """
+    original = getattr(instance, '_media_file_names', {})
+    deferred = instance.get_deferred_fields()
+    changed = {}
+    for name in _sources[type(instance)]:
+        if name in deferred:
+            continue
+        current = getattr(instance, name).name or ''
+        if current and current != original.get(name):
+            changed[name] = current
+    return changed
+
+
+def connect_sources(handler):
+    """Connect `handler` to post_save of every registered model; called from AppConfig.ready()"""
+    _sources.clear()
+    _sources.update(resolve_sources())
+    for model in _sources:
+        post_init.connect(remember_file_names, sender=model, dispatch_uid=f'media_sources_init_{model._meta.label}')
+        post_save.connect(handler, sender=model, dispatch_uid=f'media_sources_save_{model._meta.label}')
@@ -0,0 +1,171 @@
+# media_manager/renditions.py
+import logging
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from .models import MediaFile, MediaRendition
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WIDTHS = [320, 640, 960, 1280, 1920]
+DEFAULT_FORMATS = ['avif', 'webp']
+DEFAULT_SRCSET_TTL = 60 * 60 * 24
+DEFAULT_EMPTY_SRCSET_TTL = 60
+QUALITY = {'webp': 80, 'avif': 60}
+
+# Vector images scale on their own and Pillow can't open them anyway
+SKIP_EXTENSIONS = ('.svg',)
+
+
+def get_widths():
+    return sorted(getattr(settings, 'MEDIA_RENDITION_WIDTHS', DEFAULT_WIDTHS))
+
+
+def get_formats():
+    """Configured rendition formats this Pillow build can write"""
+    Image.init()
+    formats = getattr(settings, 'MEDIA_RENDITION_FORMATS', DEFAULT_FORMATS)
+    return [fmt for fmt in formats if fmt.upper() in Image.SAVE]
+
+
+def rendition_name(name, width, fmt):
+    """uploads/2025/07/18/photo.jpg -> uploads/2025/07/18/renditions/photo-640w.webp"""
+    directory, filename = os.path.split(name)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(directory, 'renditions', f'{stem}-{width}w.{fmt}')
+
+
+def _srcset_cache_key(name, fmt):
+    return f'media:srcset:{fmt}:{name}'
+
+
+def generate_renditions(media_file):
+    """Write resized WebP/AVIF copies of an image next to the original
+
+    The original is decoded once; each configured width narrower than it
+    (plus the original width, unless it is wider than all of them) is written
+    in every supported format. Existing renditions are replaced. Returns
+    the MediaRendition rows created.
+    """
+    name = media_file.file.name
+    if media_file.file_type != 'image' or name.lower().endswith(SKIP_EXTENSIONS):
+        return []
+
+    with default_storage.open(name, 'rb') as f:
+        image = Image.open(f)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+
+    # Never upscale: the widest rendition is the original width or the widest configured one
+    widths = [width for width in get_widths() if width < image.width]
+    if image.width <= get_widths()[-1]:
+        widths.append(image.width)
+
+    remove_renditions(media_file)
+
+    renditions = []
+    for width in widths:
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.Resampling.LANCZOS)
+        for fmt in get_formats():
+            output = BytesIO()
+            resized.save(output, format=fmt.upper(), quality=QUALITY.get(fmt, 80))
+            saved_name = default_storage.save(rendition_name(name, width, fmt), ContentFile(output.getvalue()))
+            renditions.append(MediaRendition(
+                media_file=media_file, file=saved_name, format=fmt, width=width, height=height,
+            ))
+
+    MediaRendition.objects.bulk_create(renditions)
+    cache.delete_many([_srcset_cache_key(name, fmt) for fmt in get_formats()])
+    return renditions
+
+
+def remove_renditions(media_file):
+    """Delete a MediaFile's rendition files and rows"""
+    for rendition in media_file.renditions.all():
+        rendition.file.delete(save=False)
+    media_file.renditions.all().delete()
+    cache.delete_many([_srcset_cache_key(media_file.file.name, fmt) for fmt, _ in MediaRendition.FORMATS])
+
+
+def get_srcsets_for_names(names, fmt='webp'):
+    """{name: srcset} for the MediaFiles stored at `names`, '' without renditions
+
+    Used for image fields on other models (Post.featured_image etc.) that
+    point at the same file as a MediaFile. One cache round trip, plus one
+    query for the names missing from it. Found srcsets are cached for
+    MEDIA_SRCSET_CACHE_TTL; an empty result only briefly, since the
+    renditions of a new upload are still being generated in Celery.
+    """
+    keys = {_srcset_cache_key(name, fmt): name for name in set(names) if name}
+    found = cache.get_many(keys)
+    srcsets = {keys[key]: srcset for key, srcset in found.items()}
+
+    missing = [name for key, name in keys.items() if key not in found]
+    if missing:
+        built = {name: [] for name in missing}
+        renditions = MediaRendition.objects.filter(
+            media_file__file__in=missing, format=fmt
+        ).order_by('width').values_list('media_file__file', 'file', 'width')
+        for name, file, width in renditions:
+            built[name].append(f'{default_storage.url(file)} {width}w')
+        built = {name: ', '.join(entries) for name, entries in built.items()}
+        srcsets.update(built)
+
+        ttl = getattr(settings, 'MEDIA_SRCSET_CACHE_TTL', DEFAULT_SRCSET_TTL)
+        empty_ttl = getattr(settings, 'MEDIA_SRCSET_EMPTY_CACHE_TTL', DEFAULT_EMPTY_SRCSET_TTL)
+        cache.set_many({_srcset_cache_key(name, fmt): srcset for name, srcset in built.items() if srcset}, ttl)
+        cache.set_many({_srcset_cache_key(name, fmt): '' for name, srcset in built.items() if not srcset}, empty_ttl)
+    return srcsets
+
+
+def get_srcset_for_name(name, fmt='webp'):
+    """srcset for the MediaFile stored at `name`, '' if it has no renditions"""
+    return get_srcsets_for_names([name], fmt).get(name, '')
+
+
+def prefetch_srcsets(files):
+    """Look up the srcsets of many image field files (e.g. a page of post cards) at once
+
+    The results are kept on the files, so rendering a list of cards costs
+    one cache round trip and at most one query per format instead of one
+    per card.
+    """
+    files = [file for file in files if file]
+    for fmt in get_formats():
+        srcsets = get_srcsets_for_names([file.name for file in files], fmt)
+        for file in files:
+            file.__dict__.setdefault('_prefetched_srcsets', {})[fmt] = srcsets.get(file.name, '')
+
+
+def get_srcset_for_file(file, fmt='webp'):
+    """srcset for an image field file, from prefetch_srcsets() when it ran"""
+    prefetched = getattr(file, '_prefetched_srcsets', {})
+    if fmt in prefetched:
+        return prefetched[fmt]
+    return get_srcset_for_name(file.name, fmt)
+
+
+def generate_missing_renditions(limit=None):
+    """Generate renditions for images that have none yet; returns how many were processed"""
+    pending = MediaFile.objects.filter(category='image', renditions__isnull=True).distinct()
+    if limit:
+        pending = pending[:limit]
+    processed = 0
+    for media_file in pending:
+        try:
+            generate_renditions(media_file)
+        except Exception:
+            logger.exception('Rendition generation failed for %s', media_file.file.name)
+            continue
+        processed += 1
+    return processed
@@ -1,23 +1,58 @@
 import platform
+from django.db.models import F
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.core.files.storage import default_storage
 from media_manager.models import MediaFile
+from .compression import file_sha256
+from .dedup import find_by_content_hash, share_existing
+from .registry import changed_file_names, remember_file_names
 from .tasks import compress_media_file
 
 def sync_to_media_manager(instance):
-    """Syncs all file and image fields from any model to MediaFile."""
-    for field in instance._meta.get_fields():
-        if field.get_internal_type() in ['FileField', 'ImageField']:
-            file_field = getattr(instance, field.name, None)
-            if file_field and hasattr(file_field, 'name') and file_field.name:
-                relative_path = file_field.name
-                if not MediaFile.objects.filter(file=relative_path).exists():
-                    media_file = MediaFile.objects.create(file=relative_path)
-                    
-                    # Auto-compress only on Linux (production)
-                    if platform.system() != 'Windows':
-                        compress_media_file.delay(media_file.id)
+    """Adds files saved on a registered model (see registry.py) to MediaFile."""
+    changed = changed_file_names(instance)
+    if not changed:
+        return
+
+    # One query for every changed field instead of one per field
+    known = dict(
+        MediaFile.objects.all_including_missing()
+        .filter(file__in=changed.values())
+        .values_list('file', 'id')
+    )
+    for field_name, relative_path in changed.items():
+        if relative_path in known:
+            # Picked from the library: this row now shares the file too, and
+            # it was just written there, so it is no longer missing
+            MediaFile.objects.all_including_missing().filter(id=known[relative_path]).update(
+                reference_count=F('reference_count') + 1, is_missing=False
+            )
+            continue
+
+        content_hash = file_sha256(relative_path)
+        existing = find_by_content_hash(content_hash)
+        if existing is not None:
+            # Same bytes are already in the library: share that file, writing
+            # this copy back in its place if the reconciler found it missing
+            with default_storage.open(relative_path) as content:
+                share_existing(existing, content)
+            type(instance)._default_manager.filter(pk=instance.pk).update(
+                **{field_name: existing.file.name}
+            )
+            setattr(instance, field_name, existing.file.name)
+            default_storage.delete(relative_path)
+            continue
+
+        media_file = MediaFile.objects.create(file=relative_path, content_hash=content_hash)
+        known[relative_path] = media_file.id
+
+        # Auto-compress only on Linux (production)
+        if platform.system() != 'Windows':
+            compress_media_file.delay(media_file.id)
+
+    # The saved names are the new baseline for the next save of this instance
+    remember_file_names(type(instance), instance)
 
 @receiver(post_save, sender=MediaFile)
 def compress_new_media(sender, instance, created, **kwargs):
@@ -25,9 +60,6 @@ def compress_new_media(sender, instance, created, **kwargs):
     if created and instance.file and platform.system() != 'Windows':
         compress_media_file.delay(instance.id)
 
-@receiver(post_save)
 def media_post_save(sender, instance, **kwargs):
-    """Global signal for syncing uploaded files."""
-    if sender.__name__ == 'MediaFile':
-        return
-    sync_to_media_manager(instance)
\ No newline at end of file
+    """Syncs uploaded files of the models in MEDIA_LIBRARY_SOURCES."""
+    sync_to_media_manager(instance)
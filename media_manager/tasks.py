@@ -1,6 +1,10 @@
 from celery import shared_task
+from django.core.files.storage import default_storage
 from .models import MediaFile
-from .compression import MediaCompressor
+from .compression import MediaCompressor, file_sha256
+from .deletion import files_in_use, set_delete_progress
+from .reconcile import reconcile_media_files
+from .renditions import generate_renditions
 
 @shared_task(bind=True, max_retries=3)
 def compress_media_file(self, media_file_id):
@@ -17,6 +21,10 @@ def compress_media_file(self, media_file_id):
             return f"No compression for file type: {media_file.file_type}"
         
         if success:
+            MediaFile.objects.filter(id=media_file.id).update(compressed_hash=file_sha256(file_path))
+            media_file.refresh_metadata()
+            if media_file.file_type == 'image':
+                generate_media_renditions.delay(media_file.id)
             return f"Compressed: {file_path}"
         else:
             raise Exception("Compression failed")
@@ -44,4 +52,49 @@ def compress_media_file(self, media_file_id):
             return 'document'
         elif name.endswith(('.xlsx', '.xls', '.csv', '.ods')):
             return 'spreadsheet'
-        return 'other'
\ No newline at end of file
+        return 'other'
+
+@shared_task
+def reconcile_media_library(batch_size=500, limit=5000):
+    """Flag media records whose files have gone missing from storage"""
+    checked, missing, elapsed = reconcile_media_files(batch_size, limit)
+    return f"Checked {checked} media files in {elapsed:.2f}s, {missing} missing"
+
+
+@shared_task(bind=True, max_retries=3)
+def generate_media_renditions(self, media_file_id):
+    """Write the responsive WebP/AVIF renditions of an uploaded image"""
+    try:
+        media_file = MediaFile.objects.get(id=media_file_id)
+        renditions = generate_renditions(media_file)
+        return f"Generated {len(renditions)} renditions for {media_file.file.name}"
+    except MediaFile.DoesNotExist:
+        return "Media file not found"
+    except Exception as e:
+        self.retry(countdown=30, exc=e)
+
+
+@shared_task
+def remove_media_files(job_id, names, batch_size=100):
+    """Remove the stored files of bulk-deleted media, recording progress per batch
+
+    Each batch is checked again just before removal, so a file that an
+    upload or another row took up after the job was queued is kept.
+    """
+    set_delete_progress(job_id, status='running')
+    removed = failed = kept = 0
+    for start in range(0, len(names), batch_size):
+        batch = names[start:start + batch_size]
+        in_use = files_in_use(batch)
+        kept += len(in_use)
+        for name in batch:
+            if name in in_use:
+                continue
+            try:
+                default_storage.delete(name)
+                removed += 1
+            except OSError:
+                failed += 1
+        set_delete_progress(job_id, removed=removed, failed=failed, kept=kept)
+    set_delete_progress(job_id, status='done')
+    return f"Removed {removed} files, {failed} failed, {kept} still in use"
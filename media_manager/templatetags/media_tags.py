@@ -0,0 +1,48 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from media_manager.models import MediaFile
+from media_manager.renditions import get_formats, get_srcset_for_file
+
+register = template.Library()
+
+MIME_TYPES = {'webp': 'image/webp', 'avif': 'image/avif'}
+
+
+def _srcsets(image):
+    """(format, srcset) pairs for a MediaFile or an image field file, best format first"""
+    srcsets = []
+    for fmt in get_formats():
+        if isinstance(image, MediaFile):
+            srcset = image.get_srcset(fmt)
+        else:
+            srcset = get_srcset_for_file(image, fmt)
+        if srcset:
+            srcsets.append((fmt, srcset))
+    return srcsets
+
+
+@register.filter
+def srcset(image, fmt='webp'):
+    """{{ post.featured_image|srcset }} -> "…-320w.webp 320w, …" ('' without renditions)"""
+    if not image:
+        return ''
+    if isinstance(image, MediaFile):
+        return image.get_srcset(fmt)
+    return get_srcset_for_file(image, fmt)
+
+
+@register.simple_tag
+def responsive_image(image, alt='', sizes='100vw', css_class='', loading='lazy'):
+    """<picture> with AVIF/WebP sources and the original file as the fallback <img>"""
+    if not image:
+        return ''
+    file = image.file if isinstance(image, MediaFile) else image
+    sources = format_html_join(
+        '', '<source type="{}" srcset="{}" sizes="{}">',
+        ((MIME_TYPES[fmt], value, sizes) for fmt, value in _srcsets(image)),
+    )
+    return format_html(
+        '<picture>{}<img src="{}" alt="{}" class="{}" loading="{}"></picture>',
+        sources, file.url, alt, css_class, loading,
+    )
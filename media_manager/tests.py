@@ -1,3 +1,204 @@
-from django.test import TestCase
+import io
+import json
+import shutil
+import tempfile
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from PIL import Image
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+from blog.models import Page, Post
+from main.models import MentorApplication
+
+from .batch import compress_images
+from .dedup import get_or_create_media_file
+from .deletion import delete_media_files, get_delete_progress
+from .models import MediaDeleteJob, MediaFile
+from .pdf import PdfOptimizer
+from .tasks import remove_media_files
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class MediaTestCase(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def upload(self, name='cv.txt', content=b'same bytes'):
+        return SimpleUploadedFile(name, content)
+
+    def application(self, number, **files):
+        files = {'cv': self.upload(), 'certificate': self.upload('cert.txt', b'certificate'), **files}
+        application = MentorApplication(
+            full_name=f'Mentor {number}', email=f'mentor{number}@example.com', phone_number=f'+23480000000{number}',
+            area_of_expertise='house_job', years_of_experience=5, bio='Bio', **files,
+        )
+        # MentorApplication.save() reads mentorship_programs, which only MentorshipApplication has
+        application.mentorship_programs = []
+        application.save()
+        return application
+
+
+class SharedFileDeleteTests(MediaTestCase):
+    def test_duplicate_upload_shares_the_file(self):
+        first, second = self.application(1), self.application(2)
+
+        self.assertEqual(first.cv.name, second.cv.name)
+        self.assertEqual(MediaFile.objects.get(file=first.cv.name).reference_count, 2)
+
+    def test_deleting_one_application_keeps_the_shared_file(self):
+        first, second = self.application(1), self.application(2)
+        name = second.cv.name
+
+        first.delete()
+
+        self.assertTrue(default_storage.exists(name))
+        self.assertEqual(MediaFile.objects.get(file=name).reference_count, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(MediaFile.objects.all_including_missing().filter(file=name).exists())
+
+    def test_removing_a_featured_image_keeps_it_for_other_posts(self):
+        author = User.objects.create_user('author', password='secret')
+        first = Post.objects.create(title='One', slug='one', content='x', author=author, featured_image=self.upload('a.txt'))
+        second = Post.objects.create(title='Two', slug='two', content='x', author=author, featured_image=self.upload('b.txt'))
+        name = second.featured_image.name
+        self.assertEqual(first.featured_image.name, name)
+
+        self.client.force_login(author)
+        response = self.client.post(
+            '/dashboard/remove-featured-image/', json.dumps({'post_id': first.id}), content_type='application/json',
+        )
+
+        self.assertTrue(response.json()['success'])
+        self.assertTrue(default_storage.exists(name))
+        self.assertEqual(MediaFile.objects.get(file=name).reference_count, 1)
+
+    def test_page_images_join_the_library(self):
+        post = Post.objects.create(title='One', slug='one', content='x', featured_image=self.upload('a.txt'))
+        page = Page.objects.create(title='About', slug='about', content='x', featured_image=self.upload('b.txt'))
+
+        self.assertEqual(page.featured_image.name, post.featured_image.name)
+        self.assertEqual(MediaFile.objects.get(file=page.featured_image.name).reference_count, 2)
+
+    def test_reupload_restores_a_missing_file(self):
+        first = self.application(1)
+        name = first.cv.name
+        MediaFile.objects.filter(file=name).update(is_missing=True)
+        default_storage.delete(name)
+
+        second = self.application(2)
+
+        self.assertEqual(second.cv.name, name)
+        self.assertTrue(default_storage.exists(name))
+        media_file = MediaFile.objects.get(file=name)
+        self.assertEqual(media_file.reference_count, 2)
+        self.assertEqual(MediaFile.objects.all_including_missing().filter(content_hash=media_file.content_hash).count(), 1)
+
+    def test_library_upload_restores_a_missing_file(self):
+        media_file, created = get_or_create_media_file(self.upload('photo.txt', b'photo'))
+        self.assertTrue(created)
+        MediaFile.objects.filter(id=media_file.id).update(is_missing=True)
+        default_storage.delete(media_file.file.name)
+
+        again, created = get_or_create_media_file(self.upload('photo-copy.txt', b'photo'))
+
+        self.assertFalse(created)
+        self.assertEqual(again.id, media_file.id)
+        self.assertTrue(default_storage.exists(media_file.file.name))
+        self.assertFalse(MediaFile.objects.all_including_missing().get(id=media_file.id).is_missing)
+
+    def test_library_delete_keeps_files_other_rows_use(self):
+        application = self.application(1)
+        media_file = MediaFile.objects.get(file=application.cv.name)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            media_file.delete()
+
+        self.assertTrue(default_storage.exists(application.cv.name))
+
+
+class BulkDeleteTests(MediaTestCase):
+    def test_unused_files_are_removed_with_progress(self):
+        media_file = MediaFile.objects.create(file=self.upload('unused.txt', b'unused'))
+        name = media_file.file.name
+
+        deleted, job_id = delete_media_files([media_file.id])
+
+        self.assertEqual(deleted, 1)
+        self.assertFalse(default_storage.exists(name))
+        self.assertEqual(
+            get_delete_progress(job_id),
+            {'status': 'done', 'rows': 1, 'total': 1, 'removed': 1, 'failed': 0, 'kept': 0},
+        )
+
+    def test_files_other_models_use_are_kept(self):
+        application = self.application(1)
+        media_file = MediaFile.objects.get(file=application.cv.name)
+
+        deleted, job_id = delete_media_files([media_file.id])
+
+        self.assertEqual(deleted, 1)
+        self.assertIsNone(job_id)
+        self.assertTrue(default_storage.exists(application.cv.name))
+
+    def test_files_taken_up_after_queueing_are_kept(self):
+        media_file = MediaFile.objects.create(file=self.upload('reused.txt', b'reused'))
+        job = MediaDeleteJob.objects.create(rows=1, total=1)
+
+        remove_media_files(job.id.hex, [media_file.file.name])
+
+        self.assertTrue(default_storage.exists(media_file.file.name))
+        self.assertEqual(get_delete_progress(job.id.hex)['kept'], 1)
+
+    def test_unknown_job_has_no_progress(self):
+        self.assertIsNone(get_delete_progress('not-a-job'))
+
+
+class CompressImagesTests(MediaTestCase):
+    def test_local_compression_regenerates_renditions(self):
+        image = io.BytesIO()
+        Image.effect_noise((400, 300), 40).convert('RGB').save(image, 'JPEG', quality=98)
+        media_file = MediaFile.objects.create(file=self.upload('photo.jpg', image.getvalue()))
+        media_file.renditions.all().delete()
+        MediaFile.objects.filter(id=media_file.id).update(compressed_hash='')
+
+        totals = compress_images(MediaFile.objects.filter(id=media_file.id), workers=1)
+
+        self.assertEqual(totals['compressed'], 1)
+        self.assertTrue(media_file.renditions.exists())
+        self.assertNotEqual(MediaFile.objects.get(id=media_file.id).compressed_hash, '')
+
+
+class PdfOptimizerTests(SimpleTestCase):
+    def reportlab_pdf(self, image_format):
+        # reportlab stores images as [/ASCII85Decode /FlateDecode] or [/ASCII85Decode /DCTDecode]
+        image = io.BytesIO()
+        Image.effect_noise((600, 600), 40).convert('RGB').save(image, image_format, quality=95)
+        image.seek(0)
+        pdf = io.BytesIO()
+        page = canvas.Canvas(pdf)
+        page.drawImage(ImageReader(image), 50, 50, 200, 200)
+        page.showPage()
+        page.save()
+        return pdf.getvalue()
+
+    def test_images_behind_filter_chains_are_recompressed(self):
+        for image_format in ('PNG', 'JPEG'):
+            with self.subTest(image_format=image_format):
+                source = self.reportlab_pdf(image_format)
+                output = io.BytesIO()
+
+                stats = PdfOptimizer().optimize(io.BytesIO(source), output)
+
+                self.assertEqual(stats['images_recompressed'], 1)
+                self.assertLess(len(output.getvalue()), len(source) / 2)
@@ -414,7 +414,7 @@ document.addEventListener('DOMContentLoaded', function () {
     url.searchParams.set('type', type);
     url.searchParams.set('date', date);
     url.searchParams.set('search', search);
-    url.searchParams.delete('page'); // Reset pagination
+    url.searchParams.delete('cursor'); // Reset pagination
 
     window.location.href = url.toString();
   }
@@ -432,9 +432,9 @@ document.addEventListener('DOMContentLoaded', function () {
   // Load more functionality
 if (loadMoreBtn) {
   loadMoreBtn.addEventListener('click', function () {
-    const nextPage = this.dataset.nextPage;
+    const nextCursor = this.dataset.nextCursor;
     const currentUrl = new URL(window.location);
-    currentUrl.searchParams.set('page', nextPage);
+    currentUrl.searchParams.set('cursor', nextCursor);
 
     fetch(currentUrl.toString(), {
       headers: {
@@ -449,7 +449,7 @@ if (loadMoreBtn) {
         });
 
         if (data.has_next) {
-          this.dataset.nextPage = data.next_page_number;
+          this.dataset.nextCursor = data.next_cursor;
         } else {
           this.style.display = 'none';
         }
@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+class AddPostgresIndex(migrations.AddIndex):
+    """AddIndex for PostgreSQL-only index types (GIN, trigram, tsvector)
+
+    The index is always part of the migration state, but it is only
+    created on PostgreSQL, so the same migrations run on the SQLite
+    databases used for local tests.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)